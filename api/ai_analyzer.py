@@ -7,6 +7,7 @@ Uses LOCAL Ollama models (DeepSeek, Llama, Llava) for analysis
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict, Optional
 from datetime import datetime
 
@@ -79,13 +80,20 @@ class AdIntelligence:
             "General Audience"
         ]
 
+        # Keep-alive session: Ollama calls and image downloads reuse pooled
+        # sockets instead of opening a new connection per ad
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
         # Test connection
         self._test_connection()
 
     def _test_connection(self):
         """Test if Ollama is running and models are available"""
         try:
-            response = requests.get(f"{self.ollama_host}/api/tags", timeout=2)
+            response = self._session.get(f"{self.ollama_host}/api/tags", timeout=2)
             if response.status_code == 200:
                 models = response.json().get('models', [])
                 available_models = [m['name'] for m in models]
@@ -245,7 +253,7 @@ class AdIntelligence:
             import base64
             from io import BytesIO
 
-            img_response = requests.get(image_url, timeout=10)
+            img_response = self._session.get(image_url, timeout=10)
             if img_response.status_code != 200:
                 raise Exception(f"Failed to download image: {img_response.status_code}")
 
@@ -309,7 +317,7 @@ OTHER: [List ALL other visible text including platform mentions, Arabic text, sl
                 }
             }
 
-            response = requests.post(
+            response = self._session.post(
                 self.api_url,
                 json=payload,
                 timeout=timeout
@@ -348,7 +356,7 @@ OTHER: [List ALL other visible text including platform mentions, Arabic text, sl
                 }
             }
 
-            response = requests.post(
+            response = self._session.post(
                 self.api_url,
                 json=payload,
                 timeout=timeout
@@ -7,12 +7,145 @@ Supports both SQLite (local) and PostgreSQL (production)
 import sqlite3
 import psycopg2
 import psycopg2.extras
+import hashlib
+import heapq
 import json
+import math
 import os
-from typing import List, Dict, Optional
+import queue
+import threading
+from array import array
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Dict, Iterator, Optional, Sequence
 from datetime import datetime, timedelta
 from pathlib import Path
 
+# Optional: sqlite-vec gives SQLite a vec0 virtual table for KNN search
+try:
+    import sqlite_vec
+except ImportError:
+    sqlite_vec = None
+
+# Optional: orjson parses/serializes the JSON columns 2-3x faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Bump when _init_schema gains a migration step (_migrate_to_vN). Stored in
+# PRAGMA user_version (SQLite) or the schema_version table (Postgres) so an
+# up-to-date database skips all DDL probes on startup
+SCHEMA_VERSION = 13
+
+# Rows pulled per fetchmany() round-trip when streaming ads
+FETCH_BATCH_SIZE = 1000
+
+# Columns returned for each ad by get_all_ads / get_ads_by_competitor
+# (internal keys like image_url_hash stay out of API payloads,
+# and the raw html_content blob is never read back by any caller)
+AD_COLUMNS = (
+    'id', 'advertiser_id', 'ad_text', 'image_url', 'regions',
+    'first_seen_date', 'last_seen_date', 'is_active', 'created_at',
+)
+AD_SELECT = ', '.join(f'a.{col}' for col in AD_COLUMNS)
+
+# Enrichment fields a user may correct by hand (see update_ad_enrichment)
+EDITABLE_ENRICHMENT_FIELDS = ('product_category', 'product_name')
+
+# Enrichment fields joined onto each streamed ad (messaging_themes comes from ad_themes)
+ENRICHMENT_COLUMNS = (
+    'product_category', 'product_name', 'primary_theme', 'audience_segment',
+    'offer_type', 'offer_details', 'confidence_score', 'brand', 'food_category',
+    'detected_region', 'rejected_wrong_region',
+)
+
+# Friendly labels for offer types (used by get_offers_breakdown)
+OFFER_LABELS = {
+    'percentage_discount': '% Off Discounts',
+    'fixed_discount': 'Fixed Amount Off',
+    'free_delivery': 'Free Delivery',
+    'bogo': 'Buy One Get One',
+    'limited_time': 'Limited Time Offer',
+    'new_product': 'New Product Launch'
+}
+
+
+# Per-connection SQLite tuning (journal_mode=WAL is persisted in the db file
+# by _init_schema; these settings must be reapplied on every connection)
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB; allocated lazily, so idle pooled readers stay small
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Re-ANALYZE ads/ad_enrichment after a save_ads batch this large, so the
+# planner's row estimates keep up with bulk loads
+ANALYZE_AFTER_ROWS = 500
+
+
+def _json_loads(value):
+    """Parse a JSON column (orjson when installed)"""
+    return orjson.loads(value) if orjson else json.loads(value)
+
+
+def _json_dumps(obj) -> str:
+    """Serialize a value for a JSON column (orjson when installed)"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode() if orjson else json.dumps(obj)
+
+
+def _url_hash(url: Optional[str]) -> int:
+    """Signed 64-bit hash of an image URL (fits SQLite INTEGER / Postgres BIGINT)"""
+    digest = hashlib.blake2b((url or '').encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True)
+
+
+def ad_signature(ad: Dict) -> str:
+    """
+    Identity signature of an ad ("ad_text||image_url") as mark_ads_inactive compares it
+    (a missing text or image URL counts as '' - save_ads stores it that way)
+    """
+    return f"{ad.get('ad_text') or ''}||{ad.get('image_url') or ''}"
+
+
+# Embedding size of mxbai-embed-large (the Ollama model used by api/rag_memory.py)
+EMBEDDING_DIM = 1024
+
+
+def _pack_embedding(vec) -> Optional[bytes]:
+    """Pack an embedding into a float32 BLOB (the format vec0 expects)"""
+    if not vec:
+        return None
+    return array('f', vec).tobytes()
+
+
+def _unpack_embedding(blob) -> array:
+    """Unpack a float32 BLOB (bytes or Postgres memoryview) into an array of floats"""
+    vec = array('f')
+    vec.frombytes(bytes(blob))
+    return vec
+
+
+# Insight roll-up tables and their columns (see AdDatabase._refresh_rollups)
+ROLLUP_TABLES = {
+    'mv_daily_velocity': ('ad_date', 'advertiser_id', 'ad_count'),
+    'mv_messaging_counts': ('advertiser_id', 'ad_date', 'primary_theme', 'ad_count'),
+    'mv_product_counts': ('advertiser_id', 'product_category', 'ad_count', 'unique_creatives', 'first_seen_date'),
+    'mv_offer_counts': ('advertiser_id', 'offer_type', 'ad_count', 'sample_offer'),
+    'mv_audience_counts': ('advertiser_id', 'audience_segment', 'ad_count'),
+    'mv_promo_counts': ('ad_date', 'advertiser_id', 'offer_type', 'ad_count'),
+    'mv_tag_counts': ('advertiser_id', 'product_category', 'brand', 'food_category', 'ad_count'),
+}
+
+
+@lru_cache(maxsize=256)
+def _category_label(key: str) -> str:
+    """Friendly label for a snake_case category/offer key (e.g. 'free_delivery' -> 'Free Delivery')"""
+    return key.replace('_', ' ').title()
+
 
 class AdDatabase:
     """
@@ -37,6 +170,10 @@ class AdDatabase:
         self.database_url = os.environ.get('DATABASE_URL')
         self.use_postgres = bool(self.database_url)
 
+        # vec0 KNN search is SQLite-only and needs an extension-capable sqlite3 build
+        self.vec_enabled = (not self.use_postgres and sqlite_vec is not None
+                            and hasattr(sqlite3.Connection, 'enable_load_extension'))
+
         if self.use_postgres:
             self.db_path = None
             print(f"✅ Database initialized: PostgreSQL")
@@ -51,14 +188,191 @@ class AdDatabase:
             self.db_path = db_path
             print(f"✅ Database initialized: SQLite at {self.db_path}")
 
+            # Long-lived connections: one writer (serialized by a lock) and a
+            # pool of readers, so the page cache stays warm across requests
+            self._write_lock = threading.Lock()
+            self._writer = self._new_sqlite_connection()
+            self._readers = queue.Queue(maxsize=os.cpu_count() or 4)
+
+        self._prepare_queries()
         self._init_schema()
 
+    def _prepare_queries(self):
+        """
+        Build the hot insight queries once per dialect
+        Reusing the exact same SQL string lets SQLite's statement cache
+        skip re-parsing and re-planning on every request
+        """
+        ph = self._param_placeholder()
+
+        # Date arithmetic differs between SQLite and Postgres
+        if self.use_postgres:
+            def since(days):
+                return f"ad_date >= CURRENT_DATE - {days} * INTERVAL '1 day'"
+        else:
+            def since(days):
+                return f"ad_date >= date('now', '-' || {days} || ' days')"
+
+        # Percentages truncate to whole numbers (FLOOR: Postgres CAST rounds)
+        share = "100.0 * SUM(ad_count) / SUM(SUM(ad_count)) OVER (PARTITION BY advertiser_id)"
+        if self.use_postgres:
+            share = f"FLOOR({share})"
+
+        date_filters = {
+            'all': '',
+            'week': f'WHERE {since(7)}',
+            'month': f'WHERE {since(30)}',
+            'quarter': f'WHERE {since(90)}',
+        }
+        self._messaging_queries = {
+            time_range: f'''
+                SELECT
+                    advertiser_id,
+                    primary_theme,
+                    CAST({share} AS INTEGER) as percentage
+                FROM mv_messaging_counts
+                {date_filter}
+                GROUP BY advertiser_id, primary_theme
+            '''
+            for time_range, date_filter in date_filters.items()
+        }
+
+        self._velocity_query = f'''
+            SELECT
+                ad_date,
+                advertiser_id,
+                ad_count
+            FROM mv_daily_velocity
+            WHERE {since(ph)}
+        '''
+
+        self._promo_timeline_query = f'''
+            SELECT
+                ad_date as promo_date,
+                offer_type,
+                SUM(ad_count) as count
+            FROM mv_promo_counts
+            WHERE {since(ph)}
+            GROUP BY ad_date, offer_type
+        '''
+
     def _get_connection(self):
         """Get database connection (Postgres or SQLite)"""
         if self.use_postgres:
             return psycopg2.connect(self.database_url)
         else:
-            return sqlite3.connect(self.db_path)
+            return self._new_sqlite_connection()
+
+    def _new_sqlite_connection(self):
+        """Open a tuned SQLite connection that can be shared across threads"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+
+        if self.vec_enabled:
+            try:
+                conn.enable_load_extension(True)
+                sqlite_vec.load(conn)
+                conn.enable_load_extension(False)
+            except sqlite3.OperationalError as e:
+                print(f"⚠️  sqlite-vec not loaded ({e}) - similarity search falls back to a full scan")
+                self.vec_enabled = False
+        return conn
+
+    @contextmanager
+    def _read(self):
+        """
+        Borrow a connection for read-only queries
+        SQLite: taken from the reader pool and returned afterwards
+        Postgres: a fresh connection, closed afterwards
+        """
+        if self.use_postgres:
+            conn = psycopg2.connect(self.database_url)
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._new_sqlite_connection()
+
+        try:
+            yield conn
+        finally:
+            conn.row_factory = None
+            try:
+                self._readers.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def _write(self):
+        """
+        Run a block inside a single write transaction
+        Commits on success, rolls back on error
+        SQLite: uses the shared writer connection under the write lock
+        """
+        if self.use_postgres:
+            conn = psycopg2.connect(self.database_url)
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            return
+
+        with self._write_lock:
+            conn = self._writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.row_factory = None
+
+    def close(self):
+        """Close pooled SQLite connections (e.g. before replacing the db file)"""
+        if self.use_postgres:
+            return
+
+        # PRAGMA optimize refreshes any stale planner stats the connection's queries ran into
+        with self._write_lock:
+            self._writer.execute("PRAGMA optimize")
+            self._writer.close()
+        while True:
+            try:
+                reader = self._readers.get_nowait()
+            except queue.Empty:
+                break
+            reader.execute("PRAGMA optimize")
+            reader.close()
+
+    def checkpoint(self) -> bool:
+        """
+        Flush the SQLite write-ahead log into the main database file
+        Call before copying/replacing the raw .db file (WAL mode keeps
+        recent writes in adintel.db-wal until checkpointed)
+
+        Returns:
+            True once the whole log is in the main file; False if a reader
+            kept it busy past busy_timeout (the file is missing recent writes)
+        """
+        if self.use_postgres:
+            return True
+
+        # busy_timeout retries while readers finish; busy=1 means they never did
+        with self._write_lock:
+            busy, log_frames, checkpointed = self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        return not busy and log_frames == checkpointed
 
     def _get_dict_cursor(self, conn):
         """Get a cursor that returns rows as dictionaries"""
@@ -68,6 +382,20 @@ class AdDatabase:
             conn.row_factory = sqlite3.Row
             return conn.cursor()
 
+    def _table_columns(self, cursor, table: str) -> List[str]:
+        """Get existing column names of a table (different syntax for SQLite vs Postgres)"""
+        if self.use_postgres:
+            cursor.execute("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_name = %s
+            """, (table,))
+            return [col[0] for col in cursor.fetchall()]
+        else:
+            # table_xinfo (unlike table_info) also lists generated columns
+            cursor.execute(f"PRAGMA table_xinfo({table})")
+            return [col[1] for col in cursor.fetchall()]
+
     def _param_placeholder(self):
         """Get parameter placeholder for SQL queries (? for SQLite, %s for Postgres)"""
         return '%s' if self.use_postgres else '?'
@@ -80,159 +408,654 @@ class AdDatabase:
         """Get FALSE value for SQL queries"""
         return 'FALSE' if self.use_postgres else '0'
 
+    def _json_array_agg(self, column):
+        """Get aggregate collecting the distinct non-empty values of a column as a JSON array"""
+        func = 'json_agg' if self.use_postgres else 'json_group_array'
+        return f"{func}(DISTINCT {column}) FILTER (WHERE {column} IS NOT NULL AND {column} != '')"
+
+    @staticmethod
+    def _json_array(value) -> List:
+        """Decode a _json_array_agg column (psycopg2 already parses json, empty json_agg is NULL)"""
+        if isinstance(value, str):
+            return _json_loads(value)
+        return value or []
+
     def _init_schema(self):
-        """Create database tables if they don't exist"""
-        conn = self._get_connection()
-        try:
+        """
+        Create or upgrade the database schema
+        An up-to-date database costs a single version read (no DDL, no write lock)
+        """
+        if not self.use_postgres:
+            # WAL lets readers run alongside the writer and batches fsyncs
+            # (sticky: stored in the database file, so only set once here)
+            self._writer.execute("PRAGMA journal_mode=WAL")
+
+        with self._read() as conn:
             cursor = conn.cursor()
+            version = self._schema_version(cursor)
+            missing_vec_index = self.vec_enabled and not self._has_vec_index(cursor)
 
-            # SQL syntax differs between SQLite and Postgres
+        if version >= SCHEMA_VERSION and not missing_vec_index:
+            return
+
+        with self._write() as conn:
+            cursor = conn.cursor()
+
+            # Re-read under the write lock: another process may have just migrated
+            version = self._schema_version(cursor)
+            migrations = (
+                self._migrate_to_v1, self._migrate_to_v2, self._migrate_to_v3,
+                self._migrate_to_v4, self._migrate_to_v5, self._migrate_to_v6,
+                self._migrate_to_v7, self._migrate_to_v8, self._migrate_to_v9,
+                self._migrate_to_v10, self._migrate_to_v11, self._migrate_to_v12,
+                self._migrate_to_v13,
+            )
+            for target, migrate in enumerate(migrations, start=1):
+                if version < target:
+                    migrate(cursor)
+
+            if self.vec_enabled:
+                self._init_vec_index(cursor)
+
+            if version < SCHEMA_VERSION:
+                # First run after adding the roll-ups: build them from existing ads
+                cursor.execute('SELECT EXISTS (SELECT 1 FROM ads) AND NOT EXISTS (SELECT 1 FROM mv_daily_velocity)')
+                if cursor.fetchone()[0]:
+                    self._refresh_rollups(cursor)
+                    print("  📈 Built insight roll-up tables")
+
+                # Refresh planner statistics so the covering indexes get picked
+                cursor.execute('ANALYZE')
+
+                self._set_schema_version(cursor, SCHEMA_VERSION)
+
+    def _schema_version(self, cursor) -> int:
+        """Read the stored schema version (0 for databases created before versioning)"""
+        if self.use_postgres:
+            cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return 0
+            cursor.execute('SELECT MAX(version) FROM schema_version')
+            return cursor.fetchone()[0] or 0
+        else:
+            cursor.execute('PRAGMA user_version')
+            return cursor.fetchone()[0]
+
+    def _set_schema_version(self, cursor, version: int):
+        """Record the schema version (inside the migration transaction)"""
+        if self.use_postgres:
+            cursor.execute('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)')
+            cursor.execute('DELETE FROM schema_version')
+            cursor.execute('INSERT INTO schema_version (version) VALUES (%s)', (version,))
+        else:
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+
+    def _has_vec_index(self, cursor) -> bool:
+        """Check whether the sqlite-vec vec_ads table exists"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'vec_ads'")
+        return cursor.fetchone() is not None
+
+    def _init_vec_index(self, cursor):
+        """Create the vec_ads KNN table (sqlite-vec only) and index any embeddings it is missing"""
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS vec_ads USING vec0(
+                ad_id INTEGER PRIMARY KEY,
+                embedding float[{EMBEDDING_DIM}] distance_metric=cosine
+            )
+        ''')
+        cursor.execute(f'''
+            INSERT INTO vec_ads (ad_id, embedding)
+            SELECT ad_id, embedding FROM ad_enrichment
+            WHERE embedding IS NOT NULL
+              AND length(embedding) = {EMBEDDING_DIM * 4}
+              AND ad_id NOT IN (SELECT ad_id FROM vec_ads)
+        ''')
+
+    def _migrate_to_v1(self, cursor):
+        """
+        Baseline schema: every table, column, backfill and index up to versioning
+        Each step is idempotent, so it is safe on databases created by any
+        earlier release (they all report version 0)
+        """
+        # SQL syntax differs between SQLite and Postgres
+        if self.use_postgres:
+            id_type = "SERIAL PRIMARY KEY"
+            bool_default = "DEFAULT TRUE"
+            timestamp_default = "DEFAULT CURRENT_TIMESTAMP"
+        else:
+            id_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
+            bool_default = "DEFAULT 1"
+            timestamp_default = "DEFAULT CURRENT_TIMESTAMP"
+
+        # Table 1: Raw ads
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS ads (
+                id {id_type},
+                advertiser_id TEXT NOT NULL,
+                ad_text TEXT,
+                image_url TEXT,
+                html_content TEXT,
+                regions TEXT,
+                first_seen_date TIMESTAMP {timestamp_default},
+                last_seen_date TIMESTAMP,
+                is_active BOOLEAN {bool_default},
+                created_at TIMESTAMP {timestamp_default},
+                UNIQUE(advertiser_id, ad_text, image_url)
+            )
+        ''')
+
+        # Table 2: AI enrichment data
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS ad_enrichment (
+                ad_id INTEGER PRIMARY KEY,
+                product_category TEXT,
+                product_name TEXT,
+                messaging_themes TEXT,
+                primary_theme TEXT,
+                audience_segment TEXT,
+                offer_type TEXT,
+                offer_details TEXT,
+                confidence_score REAL,
+                analysis_model TEXT,
+                analyzed_at TIMESTAMP {timestamp_default},
+                FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Table 2b: Messaging theme scores (one row per ad + theme)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ad_themes (
+                ad_id INTEGER NOT NULL,
+                theme TEXT NOT NULL,
+                weight REAL,
+                PRIMARY KEY (ad_id, theme),
+                FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Move legacy JSON-encoded messaging_themes into ad_themes
+        # (the column is cleared once migrated, so this only runs once per row)
+        cursor.execute("SELECT ad_id, messaging_themes FROM ad_enrichment WHERE messaging_themes IS NOT NULL")
+        legacy_themes = cursor.fetchall()
+        if legacy_themes:
+            ph = self._param_placeholder()
+            theme_rows = [
+                (ad_id, theme, weight)
+                for ad_id, themes_json in legacy_themes
+                for theme, weight in (_json_loads(themes_json) or {}).items()
+            ]
+            cursor.executemany(f'''
+                INSERT INTO ad_themes (ad_id, theme, weight) VALUES ({ph}, {ph}, {ph})
+                ON CONFLICT (ad_id, theme) DO NOTHING
+            ''', theme_rows)
+            cursor.execute("UPDATE ad_enrichment SET messaging_themes = NULL WHERE messaging_themes IS NOT NULL")
+            print(f"  🎯 Moved messaging themes for {len(legacy_themes)} ads into ad_themes")
+
+        # Migration-safe: Add new columns if they don't exist
+        columns = self._table_columns(cursor, 'ad_enrichment')
+
+        # Add is_qatar_only (region validation)
+        if 'is_qatar_only' not in columns:
             if self.use_postgres:
-                id_type = "SERIAL PRIMARY KEY"
-                bool_default = "DEFAULT TRUE"
-                timestamp_default = "DEFAULT CURRENT_TIMESTAMP"
+                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN is_qatar_only BOOLEAN DEFAULT TRUE')
             else:
-                id_type = "INTEGER PRIMARY KEY AUTOINCREMENT"
-                bool_default = "DEFAULT 1"
-                timestamp_default = "DEFAULT CURRENT_TIMESTAMP"
+                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN is_qatar_only BOOLEAN DEFAULT 1')
+            print("  📍 Added is_qatar_only column")
 
-            # Table 1: Raw ads
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS ads (
-                    id {id_type},
-                    advertiser_id TEXT NOT NULL,
-                    ad_text TEXT,
-                    image_url TEXT,
-                    html_content TEXT,
-                    regions TEXT,
-                    first_seen_date TIMESTAMP {timestamp_default},
-                    last_seen_date TIMESTAMP,
-                    is_active BOOLEAN {bool_default},
-                    created_at TIMESTAMP {timestamp_default},
-                    UNIQUE(advertiser_id, ad_text, image_url)
-                )
-            ''')
+        # Add orchestrator-specific fields
+        if 'brand' not in columns:
+            cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN brand TEXT')
+            print("  🏷️  Added brand column")
 
-            # Table 2: AI enrichment data
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS ad_enrichment (
-                    ad_id INTEGER PRIMARY KEY,
-                    product_category TEXT,
-                    product_name TEXT,
-                    messaging_themes TEXT,
-                    primary_theme TEXT,
-                    audience_segment TEXT,
-                    offer_type TEXT,
-                    offer_details TEXT,
-                    confidence_score REAL,
-                    analysis_model TEXT,
-                    analyzed_at TIMESTAMP {timestamp_default},
-                    FOREIGN KEY (ad_id) REFERENCES ads(id) ON DELETE CASCADE
-                )
-            ''')
+        if 'food_category' not in columns:
+            cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN food_category TEXT')
+            print("  🍔 Added food_category column")
 
-            # Migration-safe: Add new columns if they don't exist
-            # Get existing columns (different syntax for SQLite vs Postgres)
+        if 'rejected_wrong_region' not in columns:
             if self.use_postgres:
-                cursor.execute("""
-                    SELECT column_name
-                    FROM information_schema.columns
-                    WHERE table_name = 'ad_enrichment'
-                """)
-                columns = [col[0] for col in cursor.fetchall()]
+                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN rejected_wrong_region BOOLEAN NOT NULL DEFAULT FALSE')
             else:
-                cursor.execute("PRAGMA table_info(ad_enrichment)")
-                columns = [col[1] for col in cursor.fetchall()]
+                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN rejected_wrong_region BOOLEAN NOT NULL DEFAULT 0')
+            print("  🚫 Added rejected_wrong_region column")
+        else:
+            # Older databases allowed NULL: normalize so the accepted-ads
+            # filter is a plain equality (and can use idx_enrich_accepted)
+            cursor.execute(f'UPDATE ad_enrichment SET rejected_wrong_region = {self._false_val()} WHERE rejected_wrong_region IS NULL')
+            if self.use_postgres:
+                cursor.execute('ALTER TABLE ad_enrichment ALTER COLUMN rejected_wrong_region SET DEFAULT FALSE')
+                cursor.execute('ALTER TABLE ad_enrichment ALTER COLUMN rejected_wrong_region SET NOT NULL')
+
+        if 'detected_region' not in columns:
+            cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN detected_region TEXT')
+            print("  🌍 Added detected_region column")
+
+        # RAG-ready: Add embedding vector field for future semantic search
+        # (deprecated: JSON text, superseded by the float32 `embedding` BLOB below)
+        if 'embedding_vector' not in columns:
+            cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN embedding_vector TEXT')
+            print("  🧠 Added embedding_vector column (RAG-ready)")
+
+        if 'embedding' not in columns:
+            cursor.execute(f"ALTER TABLE ad_enrichment ADD COLUMN embedding {'BYTEA' if self.use_postgres else 'BLOB'}")
+            print("  🧠 Added embedding column (float32 BLOB)")
+
+        # Pack any legacy JSON embeddings into the BLOB column (cleared once moved)
+        cursor.execute("SELECT ad_id, embedding_vector FROM ad_enrichment WHERE embedding_vector IS NOT NULL")
+        legacy_embeddings = [(_pack_embedding(_json_loads(vec_json)), ad_id) for ad_id, vec_json in cursor.fetchall()]
+        if legacy_embeddings:
+            ph = self._param_placeholder()
+            cursor.executemany(f'UPDATE ad_enrichment SET embedding = {ph}, embedding_vector = NULL WHERE ad_id = {ph}', legacy_embeddings)
+            print(f"  🧠 Packed {len(legacy_embeddings)} embeddings into float32 BLOBs")
 
-            # Add is_qatar_only (region validation)
-            if 'is_qatar_only' not in columns:
-                if self.use_postgres:
-                    cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN is_qatar_only BOOLEAN DEFAULT TRUE')
-                else:
-                    cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN is_qatar_only BOOLEAN DEFAULT 1')
-                print("  📍 Added is_qatar_only column")
+        # Add manually_edited flag to protect user corrections from AI overwrite
+        if 'manually_edited' not in columns:
+            if self.use_postgres:
+                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN manually_edited BOOLEAN DEFAULT FALSE')
+            else:
+                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN manually_edited BOOLEAN DEFAULT 0')
+            print("  ✏️  Added manually_edited column (protects user corrections)")
+
+        # Table 3: Scrape runs (for tracking)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS scrape_runs (
+                id {id_type},
+                advertiser_id TEXT NOT NULL,
+                run_date TIMESTAMP {timestamp_default},
+                ads_found INTEGER,
+                ads_new INTEGER,
+                ads_retired INTEGER,
+                enrichment_enabled BOOLEAN DEFAULT {'FALSE' if self.use_postgres else '0'}
+            )
+        ''')
+
+        # Table 4: Product Knowledge Base (for caching product lookups)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS product_knowledge (
+                id {id_type},
+                product_name TEXT UNIQUE NOT NULL,
+                product_type TEXT NOT NULL,
+                category TEXT,
+                is_restaurant BOOLEAN,
+                is_unknown_category BOOLEAN,
+                is_subscription BOOLEAN,
+                metadata TEXT,
+                confidence REAL DEFAULT 0.0,
+                verified_date TIMESTAMP {timestamp_default},
+                search_source TEXT,
+                created_at TIMESTAMP {timestamp_default}
+            )
+        ''')
+
+        # Roll-up tables for the /insights/* endpoints (one row per group,
+        # rebuilt per advertiser by _refresh_rollups after every write)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mv_daily_velocity (
+                ad_date DATE,
+                advertiser_id TEXT NOT NULL,
+                ad_count INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mv_messaging_counts (
+                advertiser_id TEXT NOT NULL,
+                ad_date DATE,
+                primary_theme TEXT,
+                ad_count INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mv_product_counts (
+                advertiser_id TEXT NOT NULL,
+                product_category TEXT,
+                ad_count INTEGER NOT NULL,
+                unique_creatives INTEGER NOT NULL,
+                first_seen_date TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mv_offer_counts (
+                advertiser_id TEXT NOT NULL,
+                offer_type TEXT NOT NULL,
+                ad_count INTEGER NOT NULL,
+                sample_offer TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mv_audience_counts (
+                advertiser_id TEXT NOT NULL,
+                audience_segment TEXT NOT NULL,
+                ad_count INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mv_promo_counts (
+                ad_date DATE,
+                advertiser_id TEXT NOT NULL,
+                offer_type TEXT NOT NULL,
+                ad_count INTEGER NOT NULL
+            )
+        ''')
+
+        # Create indexes for faster queries
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_advertiser ON ads(advertiser_id)')
+        # Covering indexes for the is_active / rejected_wrong_region JOIN filters
+        # (idx_ads_active_adv supersedes the low-cardinality idx_active)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ads_active_adv ON ads(is_active, advertiser_id, id)')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_enrich_cover ON ad_enrichment(
+                ad_id, rejected_wrong_region, primary_theme, product_category, audience_segment, offer_type
+            )
+        ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_active')
+        # Partial index: only accepted (non-rejected) enrichment rows
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_enrich_accepted ON ad_enrichment(ad_id)
+            WHERE rejected_wrong_region = {self._false_val()}
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_first_seen ON ads(first_seen_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_product_cat ON ad_enrichment(product_category)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_primary_theme ON ad_enrichment(primary_theme)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_product_name ON product_knowledge(product_name)')
+        for table in ('mv_daily_velocity', 'mv_messaging_counts', 'mv_product_counts',
+                      'mv_offer_counts', 'mv_audience_counts', 'mv_promo_counts'):
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_adv ON {table}(advertiser_id)')
+
+    def _migrate_to_v2(self, cursor):
+        """
+        ads.ad_date: calendar day of first_seen_date, derived by the database
+        so the day-bucketed roll-ups group on an indexed column
+        """
+        if 'ad_date' not in self._table_columns(cursor, 'ads'):
+            if self.use_postgres:
+                cursor.execute('ALTER TABLE ads ADD COLUMN ad_date DATE GENERATED ALWAYS AS (CAST(first_seen_date AS DATE)) STORED')
+            else:
+                # SQLite can only ALTER in VIRTUAL generated columns; the index below stores the value
+                cursor.execute('ALTER TABLE ads ADD COLUMN ad_date TEXT GENERATED ALWAYS AS (date(first_seen_date)) VIRTUAL')
+            print("  📅 Added ad_date column")
 
-            # Add orchestrator-specific fields
-            if 'brand' not in columns:
-                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN brand TEXT')
-                print("  🏷️  Added brand column")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ad_date ON ads(ad_date, advertiser_id)')
+        # Range filters of get_daily_velocity / get_promo_timeline
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_mv_daily_velocity_date ON mv_daily_velocity(ad_date)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_mv_promo_counts_date ON mv_promo_counts(ad_date)')
 
-            if 'food_category' not in columns:
-                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN food_category TEXT')
-                print("  🍔 Added food_category column")
+    def _migrate_to_v3(self, cursor):
+        """
+        ads.image_url_hash: 64-bit hash of image_url, so unique-creative
+        counts compare 8-byte integers instead of full URL strings
+        """
+        if 'image_url_hash' not in self._table_columns(cursor, 'ads'):
+            cursor.execute(f"ALTER TABLE ads ADD COLUMN image_url_hash {'BIGINT' if self.use_postgres else 'INTEGER'}")
+            print("  🖼️  Added image_url_hash column")
 
-            if 'rejected_wrong_region' not in columns:
-                if self.use_postgres:
-                    cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN rejected_wrong_region BOOLEAN DEFAULT FALSE')
-                else:
-                    cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN rejected_wrong_region BOOLEAN DEFAULT 0')
-                print("  🚫 Added rejected_wrong_region column")
+        cursor.execute('SELECT id, image_url FROM ads WHERE image_url_hash IS NULL')
+        url_hashes = [(_url_hash(image_url), ad_id) for ad_id, image_url in cursor.fetchall()]
+        if url_hashes:
+            ph = self._param_placeholder()
+            cursor.executemany(f'UPDATE ads SET image_url_hash = {ph} WHERE id = {ph}', url_hashes)
 
-            if 'detected_region' not in columns:
-                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN detected_region TEXT')
-                print("  🌍 Added detected_region column")
+    def _migrate_to_v4(self, cursor):
+        """
+        Copy ads.advertiser_id / ads.is_active onto ad_enrichment so the
+        insight queries read one table (kept in step by save_ads and
+        mark_ads_inactive)
+        """
+        columns = self._table_columns(cursor, 'ad_enrichment')
+        if 'advertiser_id' not in columns:
+            cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN advertiser_id TEXT')
+        if 'is_active' not in columns:
+            cursor.execute(f'ALTER TABLE ad_enrichment ADD COLUMN is_active BOOLEAN DEFAULT {self._true_val()}')
+            print("  🪞 Added advertiser_id/is_active to ad_enrichment")
+
+        cursor.execute('''
+            UPDATE ad_enrichment SET
+                advertiser_id = (SELECT a.advertiser_id FROM ads a WHERE a.id = ad_enrichment.ad_id),
+                is_active = (SELECT a.is_active FROM ads a WHERE a.id = ad_enrichment.ad_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_enrich_insights
+            ON ad_enrichment(is_active, rejected_wrong_region, advertiser_id, primary_theme)
+        ''')
+
+    def _migrate_to_v5(self, cursor):
+        """
+        Full-text index over ads.ad_text (see search_ads)
+        SQLite: FTS5 external-content table kept in sync by triggers
+        Postgres: GIN index on the tsvector expression search_ads queries
+        """
+        if self.use_postgres:
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ads_text_fts
+                ON ads USING GIN (to_tsvector('simple', COALESCE(ad_text, '')))
+            ''')
+            return
+
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS ads_fts
+            USING fts5(ad_text, content='ads', content_rowid='id')
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS ads_fts_ai AFTER INSERT ON ads BEGIN
+                INSERT INTO ads_fts (rowid, ad_text) VALUES (new.id, new.ad_text);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS ads_fts_ad AFTER DELETE ON ads BEGIN
+                INSERT INTO ads_fts (ads_fts, rowid, ad_text) VALUES ('delete', old.id, old.ad_text);
+            END
+        ''')
+        # Only ad_text changes touch the index (save_ads' last_seen_date bumps don't)
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS ads_fts_au AFTER UPDATE OF ad_text ON ads BEGIN
+                INSERT INTO ads_fts (ads_fts, rowid, ad_text) VALUES ('delete', old.id, old.ad_text);
+                INSERT INTO ads_fts (rowid, ad_text) VALUES (new.id, new.ad_text);
+            END
+        ''')
+        cursor.execute("INSERT INTO ads_fts (ads_fts) VALUES ('rebuild')")
+        print("  🔎 Built ads_fts full-text index")
+
+    def _migrate_to_v6(self, cursor):
+        """
+        mv_tag_counts: active ads per (advertiser, product_category, brand,
+        food_category) - backs the brand / food / product category breakdowns
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mv_tag_counts (
+                advertiser_id TEXT NOT NULL,
+                product_category TEXT,
+                brand TEXT,
+                food_category TEXT,
+                ad_count INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_mv_tag_counts_adv ON mv_tag_counts(advertiser_id)')
+        self._refresh_rollups(cursor)
+
+    def _migrate_to_v7(self, cursor):
+        """
+        Covering index for the per-advertiser mv_tag_counts refresh:
+        the filter and GROUP BY columns are all read from the index
+        """
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_enrich_tags ON ad_enrichment(
+                advertiser_id, is_active, rejected_wrong_region, product_category, brand, food_category
+            )
+        ''')
 
-            # RAG-ready: Add embedding vector field for future semantic search
-            if 'embedding_vector' not in columns:
-                cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN embedding_vector TEXT')
-                print("  🧠 Added embedding_vector column (RAG-ready)")
+    def _migrate_to_v8(self, cursor):
+        """
+        ocr_cache: OCR service results keyed by a hash of (prompt, image),
+        so reused creatives skip the GPU round-trip
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                hash TEXT PRIMARY KEY,
+                result_json TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _migrate_to_v9(self, cursor):
+        """
+        mv_tag_counts now stores whitespace-trimmed tags - rebuild it
+        """
+        self._refresh_rollups(cursor)
 
-            # Add manually_edited flag to protect user corrections from AI overwrite
-            if 'manually_edited' not in columns:
-                if self.use_postgres:
-                    cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN manually_edited BOOLEAN DEFAULT FALSE')
-                else:
-                    cursor.execute('ALTER TABLE ad_enrichment ADD COLUMN manually_edited BOOLEAN DEFAULT 0')
-                print("  ✏️  Added manually_edited column (protects user corrections)")
+    def _migrate_to_v10(self, cursor):
+        """
+        vision_cache: Llava image analyses keyed by a hash of (model, prompt, image URL),
+        so repeat insight runs skip the download and inference
+        """
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS vision_cache (
+                hash TEXT PRIMARY KEY,
+                result_json TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _migrate_to_v11(self, cursor):
+        """
+        Covering index for the per-advertiser competitor summary (count + latest
+        created_at + the id probed against ad_enrichment); supersedes idx_advertiser
+        """
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ads_adv_created ON ads(advertiser_id, created_at, id)')
+        cursor.execute('DROP INDEX IF EXISTS idx_advertiser')
 
-            # Table 3: Scrape runs (for tracking)
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS scrape_runs (
-                    id {id_type},
-                    advertiser_id TEXT NOT NULL,
-                    run_date TIMESTAMP {timestamp_default},
-                    ads_found INTEGER,
-                    ads_new INTEGER,
-                    ads_retired INTEGER,
-                    enrichment_enabled BOOLEAN DEFAULT {'FALSE' if self.use_postgres else '0'}
-                )
-            ''')
+    def _migrate_to_v12(self, cursor):
+        """
+        Per-advertiser first_seen_date index: serves the newest-first competitor
+        gallery page without a sort, and the competitor's 7/14/30-day windows
+        """
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_ads_adv_first_seen ON ads(advertiser_id, first_seen_date)')
 
-            # Table 4: Product Knowledge Base (for caching product lookups)
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS product_knowledge (
-                    id {id_type},
-                    product_name TEXT UNIQUE NOT NULL,
-                    product_type TEXT NOT NULL,
-                    category TEXT,
-                    is_restaurant BOOLEAN,
-                    is_unknown_category BOOLEAN,
-                    is_subscription BOOLEAN,
-                    metadata TEXT,
-                    confidence REAL DEFAULT 0.0,
-                    verified_date TIMESTAMP {timestamp_default},
-                    search_source TEXT,
-                    created_at TIMESTAMP {timestamp_default}
-                )
-            ''')
+    def _migrate_to_v13(self, cursor):
+        """
+        Drop the unused ads.dedupe_hash column and its index: save_ads upserts on
+        the UNIQUE(advertiser_id, ad_text, image_url) key, so nothing reads the hash
+        """
+        cursor.execute('DROP INDEX IF EXISTS idx_ads_dedupe_hash')
+        # SQLite only gained DROP COLUMN in 3.35; older builds keep the (unwritten) column
+        if self.use_postgres or sqlite3.sqlite_version_info >= (3, 35, 0):
+            if 'dedupe_hash' in self._table_columns(cursor, 'ads'):
+                cursor.execute('ALTER TABLE ads DROP COLUMN dedupe_hash')
 
-            # Create indexes for faster queries
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_advertiser ON ads(advertiser_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_active ON ads(is_active)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_first_seen ON ads(first_seen_date)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_product_cat ON ad_enrichment(product_category)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_primary_theme ON ad_enrichment(primary_theme)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_product_name ON product_knowledge(product_name)')
+    def _refresh_rollups(self, cursor, advertiser_ids: Optional[List[str]] = None):
+        """
+        Rebuild the mv_* roll-up rows for the given advertisers (all if None)
+        Must run inside the write transaction that changed their ads
 
-            conn.commit()
-        finally:
-            conn.close()
+        Args:
+            cursor: Cursor of the open write transaction
+            advertiser_ids: Advertisers whose ads changed
+        """
+        ph = self._param_placeholder()
+        true_val = self._true_val()
+        false_val = self._false_val()
+
+        params = list(advertiser_ids) if advertiser_ids else []
+        if advertiser_ids:
+            in_list = ', '.join([ph] * len(params))
+            delete_filter = f'WHERE advertiser_id IN ({in_list})'
+            ads_filter = f'AND a.advertiser_id IN ({in_list})'
+            enrichment_filter = f'AND e.advertiser_id IN ({in_list})'
+        else:
+            delete_filter = ''
+            ads_filter = ''
+            enrichment_filter = ''
+
+        accepted = f'e.rejected_wrong_region = {false_val}'
+
+        rollups = {
+            'mv_daily_velocity': f'''
+                SELECT a.ad_date, a.advertiser_id, COUNT(*)
+                FROM ads a
+                WHERE 1 = 1 {ads_filter}
+                GROUP BY a.ad_date, a.advertiser_id
+            ''',
+            'mv_messaging_counts': f'''
+                SELECT a.advertiser_id, a.ad_date, e.primary_theme, COUNT(*)
+                FROM ads a
+                JOIN ad_enrichment e ON a.id = e.ad_id
+                WHERE a.is_active = {true_val}
+                  AND {accepted}
+                  {ads_filter}
+                GROUP BY a.advertiser_id, a.ad_date, e.primary_theme
+            ''',
+            'mv_product_counts': f'''
+                SELECT a.advertiser_id, e.product_category,
+                       COUNT(DISTINCT a.id), COUNT(DISTINCT a.image_url_hash), MIN(a.first_seen_date)
+                FROM ads a
+                JOIN ad_enrichment e ON a.id = e.ad_id
+                WHERE a.is_active = {true_val}
+                  AND {accepted}
+                  {ads_filter}
+                GROUP BY a.advertiser_id, e.product_category
+            ''',
+            'mv_offer_counts': f'''
+                SELECT e.advertiser_id, e.offer_type, COUNT(*), MAX(e.offer_details)
+                FROM ad_enrichment e
+                WHERE e.is_active = {true_val}
+                  AND e.offer_type IS NOT NULL
+                  AND e.offer_type != 'none'
+                  AND e.offer_type != ''
+                  AND {accepted}
+                  {enrichment_filter}
+                GROUP BY e.advertiser_id, e.offer_type
+            ''',
+            'mv_audience_counts': f'''
+                SELECT e.advertiser_id, e.audience_segment, COUNT(*)
+                FROM ad_enrichment e
+                WHERE e.is_active = {true_val}
+                  AND e.audience_segment IS NOT NULL
+                  AND {accepted}
+                  {enrichment_filter}
+                GROUP BY e.advertiser_id, e.audience_segment
+            ''',
+            'mv_promo_counts': f'''
+                SELECT a.ad_date, a.advertiser_id, e.offer_type, COUNT(*)
+                FROM ads a
+                JOIN ad_enrichment e ON a.id = e.ad_id
+                WHERE e.offer_type IS NOT NULL
+                  AND e.offer_type != 'none'
+                  {ads_filter}
+                GROUP BY a.ad_date, a.advertiser_id, e.offer_type
+            ''',
+        }
+
+        # Tags are trimmed once here, so the breakdowns read clean values
+        rollups['mv_tag_counts'] = f'''
+            SELECT e.advertiser_id, TRIM(e.product_category), TRIM(e.brand), TRIM(e.food_category), COUNT(*)
+            FROM ad_enrichment e
+            WHERE e.is_active = {true_val}
+              AND {accepted}
+              {enrichment_filter}
+            GROUP BY e.advertiser_id, TRIM(e.product_category), TRIM(e.brand), TRIM(e.food_category)
+        '''
+
+        for table, select_sql in rollups.items():
+            cursor.execute(f'DELETE FROM {table} {delete_filter}', params)
+            cursor.execute(f'INSERT INTO {table} ({", ".join(ROLLUP_TABLES[table])}) {select_sql}', params)
+
+    def refresh_rollups(self, advertiser_ids: Optional[List[str]] = None):
+        """
+        Rebuild insight roll-ups after ads/enrichment were changed outside
+        save_ads/mark_ads_inactive (e.g. manual edits from the API)
+
+        Args:
+            advertiser_ids: Advertisers to rebuild (all if None)
+        """
+        with self._write() as conn:
+            self._refresh_rollups(conn.cursor(), advertiser_ids)
 
     def save_ads(self, ads: List[Dict], advertiser_id: str = None) -> Dict:
         """
         Save or update ads with enrichment data
         Handles temporal tracking (new vs existing ads)
 
+        All ads are written in one transaction: each distinct ad is a single
+        INSERT ... ON CONFLICT DO UPDATE upsert (RETURNING its id and whether it
+        was new), then enrichment goes through executemany
+
         Args:
             ads: List of ad dicts with enrichment fields
             advertiser_id: Optional advertiser ID (will extract from ads if not provided)
@@ -246,261 +1069,503 @@ class AdDatabase:
             'ads_total': len(ads)
         }
 
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+        # Resolve advertiser + identity key for every ad up front
+        keyed_ads = []
+        for ad in ads:
+            adv_id = advertiser_id or ad.get('advertiser_id')
+            if not adv_id:
+                print(f"⚠️  Skipping ad without advertiser_id")
+                continue
+            # '' not NULL: NULLs never conflict on the UNIQUE key
+            keyed_ads.append((adv_id, (adv_id, ad.get('ad_text') or '', ad.get('image_url') or ''), ad))
 
-            for ad in ads:
-                adv_id = advertiser_id or ad.get('advertiser_id')
-                if not adv_id:
-                    print(f"⚠️  Skipping ad without advertiser_id")
-                    continue
+        if not keyed_ads:
+            print(f"📊 Saved 0 new ads, updated 0 existing ads")
+            return stats
+
+        ph = self._param_placeholder()
+        true_val = self._true_val()
+
+        # One upsert per distinct ad; repeats within the batch only bump last_seen_date
+        upsert_rows = {}
+        repeat_keys = []
+        for adv_id, key, ad in keyed_ads:
+            if key in upsert_rows:
+                repeat_keys.append(key)
+                continue
+            upsert_rows[key] = key + (
+                ad.get('html_content', ''),
+                ad.get('regions', ''),
+                _url_hash(ad.get('image_url'))
+            )
+
+        # New rows are inserted with last_seen_date NULL; the DO UPDATE branch sets it
+        upsert_sql = f'''
+            INSERT INTO ads (advertiser_id, ad_text, image_url, html_content, regions, image_url_hash)
+            VALUES {'%s' if self.use_postgres else '(?, ?, ?, ?, ?, ?)'}
+            ON CONFLICT (advertiser_id, ad_text, image_url) DO UPDATE SET
+                last_seen_date = CURRENT_TIMESTAMP,
+                is_active = {true_val},
+                image_url_hash = EXCLUDED.image_url_hash
+            RETURNING id, advertiser_id, ad_text, image_url, last_seen_date IS NULL
+        '''
 
-                # Check if ad already exists
-                ph = self._param_placeholder()
+        with self._write() as conn:
+            cursor = conn.cursor()
+
+            if self.use_postgres:
+                returned = psycopg2.extras.execute_values(cursor, upsert_sql, list(upsert_rows.values()), fetch=True)
+            else:
+                returned = [cursor.execute(upsert_sql, row).fetchone() for row in upsert_rows.values()]
+
+            existing_ids = {}
+            for ad_id, adv_id, ad_text, image_url, was_new in returned:
+                existing_ids[(adv_id, ad_text, image_url)] = ad_id
+                stats['ads_new' if was_new else 'ads_updated'] += 1
+
+            if repeat_keys:
+                cursor.executemany(f'''
+                    UPDATE ads
+                    SET last_seen_date = CURRENT_TIMESTAMP,
+                        is_active = {true_val}
+                    WHERE id = {ph}
+                ''', [(existing_ids[key],) for key in set(repeat_keys)])
+                stats['ads_updated'] += len(repeat_keys)
+
+            # Every saved ad is active again - mirror that onto its enrichment row
+            cursor.executemany(f'UPDATE ad_enrichment SET is_active = {true_val} WHERE ad_id = {ph}',
+                               [(ad_id,) for ad_id in existing_ids.values()])
+
+            # Save enrichment data if present (one entry per ad - the last copy in the batch wins,
+            # so a repeated ad doesn't insert its theme rows twice)
+            enriched = list({
+                existing_ids[key]: (existing_ids[key], adv_id, ad) for adv_id, key, ad in keyed_ads
+                if 'product_category' in ad or 'brand' in ad
+            }.values())
+
+            if enriched:
+                # Don't overwrite enrichment that was manually edited by a user
+                advertiser_ids = list({adv_id for adv_id, _, _ in keyed_ads})
                 cursor.execute(f'''
-                    SELECT id, first_seen_date FROM ads
-                    WHERE advertiser_id = {ph} AND ad_text = {ph} AND image_url = {ph}
-                ''', (adv_id, ad.get('ad_text', ''), ad.get('image_url', '')))
-
-                existing = cursor.fetchone()
-
-                if existing:
-                    # Update existing ad
-                    ad_id, first_seen = existing
-                    cursor.execute(f'''
-                        UPDATE ads
-                        SET last_seen_date = CURRENT_TIMESTAMP,
-                            is_active = {'TRUE' if self.use_postgres else '1'}
-                        WHERE id = {ph}
-                    ''', (ad_id,))
-                    stats['ads_updated'] += 1
-                else:
-                    # Insert new ad
-                    cursor.execute(f'''
-                        INSERT INTO ads (advertiser_id, ad_text, image_url, html_content, regions)
-                        VALUES ({ph}, {ph}, {ph}, {ph}, {ph})
-                    ''', (
+                    SELECT e.ad_id FROM ad_enrichment e
+                    WHERE e.advertiser_id IN ({', '.join([ph] * len(advertiser_ids))})
+                      AND e.manually_edited = {true_val}
+                ''', advertiser_ids)
+                manually_edited = {row[0] for row in cursor.fetchall()}
+
+                enrichment_rows = []
+                themed_ad_ids = []
+                theme_rows = []
+                vec_rows = {}  # ad_id -> packed embedding (vec0 rejects a repeated ad_id)
+                for ad_id, adv_id, ad in enriched:
+                    if ad_id in manually_edited:
+                        # Skip updating manually edited ads
+                        print(f"  ✏️  Skipping ad {ad_id} - manually edited by user")
+                        continue
+
+                    enrichment_rows.append((
+                        ad_id,
                         adv_id,
-                        ad.get('ad_text', ''),
-                        ad.get('image_url', ''),
-                        ad.get('html_content', ''),
-                        ad.get('regions', '')
+                        ad.get('product_category'),
+                        ad.get('product_name'),
+                        ad.get('primary_theme'),
+                        ad.get('audience_segment'),
+                        ad.get('offer_type'),
+                        ad.get('offer_details'),
+                        ad.get('confidence_score'),
+                        ad.get('analysis_model', 'orchestrator'),
+                        ad.get('is_qatar_only', True),  # Default to True (Qatar)
+                        ad.get('brand'),  # Vision-extracted brand
+                        ad.get('food_category'),  # Vision-extracted food category
+                        ad.get('detected_region'),  # Region validator result
+                        ad.get('rejected_wrong_region') or False,  # Region filter flag (never NULL)
+                        _pack_embedding(ad.get('embedding'))  # float32 BLOB for similarity search
                     ))
-                    if self.use_postgres:
-                        cursor.execute('SELECT lastval()')
-                        ad_id = cursor.fetchone()[0]
-                    else:
-                        ad_id = cursor.lastrowid
-                    stats['ads_new'] += 1
-
-                # Save enrichment data if present
-                if 'product_category' in ad or 'brand' in ad:
-                    # Convert messaging_themes dict to JSON string
-                    themes_json = json.dumps(ad.get('messaging_themes', {}))
-
-                    # Use ON CONFLICT for Postgres, INSERT OR REPLACE for SQLite
-                    if self.use_postgres:
-                        # Check if manually edited before overwriting
-                        cursor.execute(f'''
-                            SELECT manually_edited FROM ad_enrichment WHERE ad_id = {ph}
-                        ''', (ad_id,))
-                        result = cursor.fetchone()
-                        is_manually_edited = result and result[0] if result else False
-
-                        if is_manually_edited:
-                            # Skip updating manually edited ads
-                            print(f"  ✏️  Skipping ad {ad_id} - manually edited by user")
-                        else:
-                            cursor.execute(f'''
-                                INSERT INTO ad_enrichment
-                                (ad_id, product_category, product_name, messaging_themes,
-                                 primary_theme, audience_segment, offer_type, offer_details,
-                                 confidence_score, analysis_model, is_qatar_only,
-                                 brand, food_category, detected_region, rejected_wrong_region, manually_edited)
-                                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, FALSE)
-                                ON CONFLICT (ad_id) DO UPDATE SET
-                                    product_category = EXCLUDED.product_category,
-                                    product_name = EXCLUDED.product_name,
-                                    messaging_themes = EXCLUDED.messaging_themes,
-                                    primary_theme = EXCLUDED.primary_theme,
-                                    audience_segment = EXCLUDED.audience_segment,
-                                    offer_type = EXCLUDED.offer_type,
-                                    offer_details = EXCLUDED.offer_details,
-                                    confidence_score = EXCLUDED.confidence_score,
-                                    analysis_model = EXCLUDED.analysis_model,
-                                    is_qatar_only = EXCLUDED.is_qatar_only,
-                                    brand = EXCLUDED.brand,
-                                    food_category = EXCLUDED.food_category,
-                                    detected_region = EXCLUDED.detected_region,
-                                    rejected_wrong_region = EXCLUDED.rejected_wrong_region
-                                WHERE ad_enrichment.manually_edited = FALSE
-                            ''', (
-                            ad_id,
-                            ad.get('product_category'),
-                            ad.get('product_name'),
-                            themes_json,
-                            ad.get('primary_theme'),
-                            ad.get('audience_segment'),
-                            ad.get('offer_type'),
-                            ad.get('offer_details'),
-                            ad.get('confidence_score'),
-                            ad.get('analysis_model', 'orchestrator'),
-                            ad.get('is_qatar_only', True),  # Default to True (Qatar)
-                            ad.get('brand'),  # Vision-extracted brand
-                            ad.get('food_category'),  # Vision-extracted food category
-                            ad.get('detected_region'),  # Region validator result
-                            ad.get('rejected_wrong_region', False)  # Region filter flag
-                        ))
-                    else:
-                        # SQLite: Check if manually edited before overwriting
-                        cursor.execute(f'''
-                            SELECT manually_edited FROM ad_enrichment WHERE ad_id = {ph}
-                        ''', (ad_id,))
-                        result = cursor.fetchone()
-                        is_manually_edited = result and result[0] if result else False
-
-                        if is_manually_edited:
-                            # Skip updating manually edited ads
-                            print(f"  ✏️  Skipping ad {ad_id} - manually edited by user")
-                        else:
-                            cursor.execute(f'''
-                                INSERT OR REPLACE INTO ad_enrichment
-                                (ad_id, product_category, product_name, messaging_themes,
-                                 primary_theme, audience_segment, offer_type, offer_details,
-                                 confidence_score, analysis_model, is_qatar_only,
-                                 brand, food_category, detected_region, rejected_wrong_region, manually_edited)
-                                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, 0)
-                            ''', (
-                                ad_id,
-                                ad.get('product_category'),
-                                ad.get('product_name'),
-                                themes_json,
-                                ad.get('primary_theme'),
-                                ad.get('audience_segment'),
-                                ad.get('offer_type'),
-                                ad.get('offer_details'),
-                                ad.get('confidence_score'),
-                                ad.get('analysis_model', 'orchestrator'),
-                                ad.get('is_qatar_only', True),  # Default to True (Qatar)
-                                ad.get('brand'),  # Vision-extracted brand
-                                ad.get('food_category'),  # Vision-extracted food category
-                                ad.get('detected_region'),  # Region validator result
-                                ad.get('rejected_wrong_region', False)  # Region filter flag
-                            ))
-
-            conn.commit()
+                    themed_ad_ids.append((ad_id,))
+                    if ad.get('embedding') and len(ad['embedding']) == EMBEDDING_DIM:
+                        vec_rows[ad_id] = enrichment_rows[-1][-1]
+                    theme_rows.extend(
+                        (ad_id, theme, weight)
+                        for theme, weight in (ad.get('messaging_themes') or {}).items()
+                    )
+
+                # Use ON CONFLICT for Postgres, INSERT OR REPLACE for SQLite
+                if self.use_postgres:
+                    cursor.executemany(f'''
+                        INSERT INTO ad_enrichment
+                        (ad_id, advertiser_id, product_category, product_name,
+                         primary_theme, audience_segment, offer_type, offer_details,
+                         confidence_score, analysis_model, is_qatar_only,
+                         brand, food_category, detected_region, rejected_wrong_region, embedding,
+                         is_active, manually_edited)
+                        VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, TRUE, FALSE)
+                        ON CONFLICT (ad_id) DO UPDATE SET
+                            advertiser_id = EXCLUDED.advertiser_id,
+                            product_category = EXCLUDED.product_category,
+                            product_name = EXCLUDED.product_name,
+                            primary_theme = EXCLUDED.primary_theme,
+                            audience_segment = EXCLUDED.audience_segment,
+                            offer_type = EXCLUDED.offer_type,
+                            offer_details = EXCLUDED.offer_details,
+                            confidence_score = EXCLUDED.confidence_score,
+                            analysis_model = EXCLUDED.analysis_model,
+                            is_qatar_only = EXCLUDED.is_qatar_only,
+                            brand = EXCLUDED.brand,
+                            food_category = EXCLUDED.food_category,
+                            detected_region = EXCLUDED.detected_region,
+                            rejected_wrong_region = EXCLUDED.rejected_wrong_region,
+                            embedding = EXCLUDED.embedding
+                        WHERE ad_enrichment.manually_edited = FALSE
+                    ''', enrichment_rows)
+                else:
+                    cursor.executemany(f'''
+                        INSERT OR REPLACE INTO ad_enrichment
+                        (ad_id, advertiser_id, product_category, product_name,
+                         primary_theme, audience_segment, offer_type, offer_details,
+                         confidence_score, analysis_model, is_qatar_only,
+                         brand, food_category, detected_region, rejected_wrong_region, embedding,
+                         is_active, manually_edited)
+                        VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, 1, 0)
+                    ''', enrichment_rows)
+
+                # Replace each re-enriched ad's theme scores
+                cursor.executemany(f'DELETE FROM ad_themes WHERE ad_id = {ph}', themed_ad_ids)
+                cursor.executemany(f'INSERT INTO ad_themes (ad_id, theme, weight) VALUES ({ph}, {ph}, {ph})', theme_rows)
+
+                # Keep the KNN index in step (vec0 has no upsert)
+                if self.vec_enabled:
+                    cursor.executemany('DELETE FROM vec_ads WHERE ad_id = ?', themed_ad_ids)
+                    cursor.executemany('INSERT INTO vec_ads (ad_id, embedding) VALUES (?, ?)', vec_rows.items())
+
+            self._refresh_rollups(cursor, list({adv_id for adv_id, _, _ in keyed_ads}))
+
+        # Large batches shift cardinalities enough to mislead the planner
+        if stats['ads_new'] + stats['ads_updated'] > ANALYZE_AFTER_ROWS:
+            with self._write() as conn:
+                cursor = conn.cursor()
+                cursor.execute('ANALYZE ads')
+                cursor.execute('ANALYZE ad_enrichment')
 
         print(f"📊 Saved {stats['ads_new']} new ads, updated {stats['ads_updated']} existing ads")
         return stats
 
-    def get_all_ads(self, active_only: bool = True) -> List[Dict]:
+    def _load_themes(self, conn, advertiser_id: str = None) -> Dict[int, Dict[str, float]]:
         """
-        Retrieve ALL ads across all competitors with enrichment data
+        Load messaging theme scores from ad_themes
 
         Args:
-            active_only: If True, only return active ads
+            conn: Open connection
+            advertiser_id: Optional - only this competitor's ads
 
         Returns:
-            List of ad dicts with enrichment fields
+            Dict mapping ad_id to {theme: weight}
         """
-        conn = self._get_connection()
-        cursor = self._get_dict_cursor(conn)  # Use database-agnostic dict cursor
+        cursor = conn.cursor()
 
-        false_val = 'FALSE' if self.use_postgres else '0'
-        true_val = 'TRUE' if self.use_postgres else '1'
+        if advertiser_id:
+            ph = self._param_placeholder()
+            cursor.execute(f'''
+                SELECT t.ad_id, t.theme, t.weight
+                FROM ad_themes t
+                JOIN ads a ON a.id = t.ad_id
+                WHERE a.advertiser_id = {ph}
+            ''', (advertiser_id,))
+        else:
+            cursor.execute('SELECT ad_id, theme, weight FROM ad_themes')
+
+        # Fold rows in as they arrive rather than holding a list of every score
+        themes_by_ad = {}
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for ad_id, theme, weight in rows:
+                themes_by_ad.setdefault(ad_id, {})[theme] = weight
+        return themes_by_ad
+
+    @staticmethod
+    def _wants_themes(columns: Optional[Sequence[str]]) -> bool:
+        """Whether a streamed ad projection includes messaging_themes"""
+        return columns is None or 'messaging_themes' in columns
+
+    @classmethod
+    def _ad_projection(cls, columns: Optional[Sequence[str]]) -> str:
+        """
+        SELECT list for get_all_ads / get_ads_by_competitor
 
-        query = f'''
-            SELECT
-                a.*,
-                e.product_category,
-                e.product_name,
-                e.messaging_themes,
-                e.primary_theme,
-                e.audience_segment,
-                e.offer_type,
-                e.offer_details,
-                e.confidence_score,
-                e.brand,
-                e.food_category,
-                e.detected_region,
-                e.rejected_wrong_region
-            FROM ads a
-            LEFT JOIN ad_enrichment e ON a.id = e.ad_id
-        '''
+        None reads every ad and enrichment field. Otherwise only the named
+        fields are read, and ad_themes is only scanned for messaging_themes
+        """
+        if columns is None:
+            columns = AD_COLUMNS + ENRICHMENT_COLUMNS + ('messaging_themes',)
+
+        select = []
+        for col in columns:
+            if col in AD_COLUMNS:
+                select.append(f'a.{col}')
+            elif col in ENRICHMENT_COLUMNS:
+                select.append(f'e.{col}')
+            elif col == 'messaging_themes':
+                # _row_to_ad looks themes up by id and drops enrichment_ad_id
+                if 'id' not in columns:
+                    select.append('a.id')
+                select.append('e.ad_id as enrichment_ad_id')
+            else:
+                raise ValueError(f"Unknown ad column: {col}")
+        return ', '.join(select)
+
+    @staticmethod
+    def _row_to_ad(fields: tuple, row: tuple, themes_by_ad: Dict[int, Dict[str, float]]) -> Dict:
+        """Convert a plain ads/ad_enrichment row tuple into an ad dict"""
+        ad = dict(zip(fields, row))
+        # Enriched ads always carry a themes dict (possibly empty)
+        has_enrichment = ad.pop('enrichment_ad_id') is not None
+        ad['messaging_themes'] = themes_by_ad.get(ad['id'], {}) if has_enrichment else None
+        return ad
+
+    def _stream_ads(self, cursor, themes_by_ad: Dict[int, Dict[str, float]]) -> Iterator[Dict]:
+        """Yield ad dicts from an executed cursor, FETCH_BATCH_SIZE rows at a time"""
+        # Column names are read once per query, not rebuilt per row
+        fields = tuple(col[0] for col in cursor.description)
+        with_themes = 'enrichment_ad_id' in fields
+        while True:
+            rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            if with_themes:
+                yield from (self._row_to_ad(fields, row, themes_by_ad) for row in rows)
+            else:
+                yield from (dict(zip(fields, row)) for row in rows)
 
-        if active_only:
-            query += f' WHERE a.is_active = {true_val} AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)'
-        else:
-            query += f' WHERE (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)'
+    def get_all_ads(self, active_only: bool = True, columns: Optional[Sequence[str]] = None) -> Iterator[Dict]:
+        """
+        Stream ALL ads across all competitors with enrichment data
 
-        cursor.execute(query)
-        rows = cursor.fetchall()
+        The read connection stays checked out until the iterator is
+        exhausted or closed - wrap in list() if you need len() or slicing.
 
-        ads = []
-        for row in rows:
-            ad = dict(row)
-            # Parse JSON messaging_themes back to dict
-            if ad.get('messaging_themes'):
-                ad['messaging_themes'] = json.loads(ad['messaging_themes'])
-            ads.append(ad)
+        Args:
+            active_only: If True, only return active ads
+            columns: Optional - only read these fields (see _ad_projection)
 
-        conn.close()
-        return ads
+        Yields:
+            Ad dicts with enrichment fields
+        """
+        with self._read() as conn:
+            cursor = conn.cursor()  # Plain tuples: _stream_ads zips them with the column names
 
-    def get_ads_by_competitor(self, advertiser_id: str, active_only: bool = True) -> List[Dict]:
+            false_val = 'FALSE' if self.use_postgres else '0'
+            true_val = 'TRUE' if self.use_postgres else '1'
+
+            query = f'''
+                SELECT {self._ad_projection(columns)}
+                FROM ads a
+                LEFT JOIN ad_enrichment e ON a.id = e.ad_id
+            '''
+
+            if active_only:
+                query += f' WHERE a.is_active = {true_val} AND (e.rejected_wrong_region = {false_val} OR e.ad_id IS NULL)'
+            else:
+                query += f' WHERE (e.rejected_wrong_region = {false_val} OR e.ad_id IS NULL)'
+
+            themes_by_ad = self._load_themes(conn) if self._wants_themes(columns) else {}
+
+            cursor.execute(query)
+            yield from self._stream_ads(cursor, themes_by_ad)
+
+    def get_ads_by_competitor(self, advertiser_id: str, active_only: bool = True,
+                              columns: Optional[Sequence[str]] = None) -> Iterator[Dict]:
         """
-        Retrieve all ads for a competitor with enrichment data
+        Stream all ads for a competitor with enrichment data
+
+        The read connection stays checked out until the iterator is
+        exhausted or closed - wrap in list() if you need len() or slicing.
 
         Args:
             advertiser_id: Competitor's advertiser ID
             active_only: If True, only return active ads
+            columns: Optional - only read these fields (see _ad_projection)
 
-        Returns:
-            List of ad dicts with enrichment fields
+        Yields:
+            Ad dicts with enrichment fields
         """
-        conn = self._get_connection()
-        cursor = self._get_dict_cursor(conn)  # Get cursor that returns dicts
+        with self._read() as conn:
+            cursor = conn.cursor()  # Plain tuples: _stream_ads zips them with the column names
 
+            ph = self._param_placeholder()
+            false_val = 'FALSE' if self.use_postgres else '0'
+            true_val = 'TRUE' if self.use_postgres else '1'
+
+            query = f'''
+                SELECT {self._ad_projection(columns)}
+                FROM ads a
+                LEFT JOIN ad_enrichment e ON a.id = e.ad_id
+                WHERE a.advertiser_id = {ph}
+                  AND (e.rejected_wrong_region = {false_val} OR e.ad_id IS NULL)
+            '''
+
+            if active_only:
+                query += f' AND a.is_active = {true_val}'
+            themes_by_ad = self._load_themes(conn, advertiser_id) if self._wants_themes(columns) else {}
+
+            cursor.execute(query, (advertiser_id,))
+            yield from self._stream_ads(cursor, themes_by_ad)
+
+    def get_competitor_gallery(self, advertiser_id: str, active_only: bool = True,
+                               category: str = None, limit: int = 50, offset: int = 0,
+                               after: Optional[tuple] = None) -> Dict:
+        """
+        One page of a competitor's ads, newest first, already in the gallery's field set
+        Used by: /api/competitors/{advertiser_id}/ads endpoint
+
+        Args:
+            advertiser_id: Competitor's advertiser ID
+            active_only: If True, only count and return active ads
+            category: Optional exact product_category filter
+            limit: Max ads to return (0 = no limit)
+            offset: Ads to skip before the page starts
+            after: Optional keyset cursor - (first_seen_date, id) of the previous
+                   page's last ad; the page starts right after it and the count
+                   is skipped (total_ads is None)
+
+        Returns:
+            {"total_ads": 100, "ads": [{"id": 123, "image_url": "https://...", ...}, ...]}
+        """
         ph = self._param_placeholder()
-        false_val = 'FALSE' if self.use_postgres else '0'
-        true_val = 'TRUE' if self.use_postgres else '1'
+        true_val = self._true_val()
+        false_val = self._false_val()
 
-        query = f'''
-            SELECT
-                a.*,
-                e.product_category,
-                e.product_name,
-                e.messaging_themes,
-                e.primary_theme,
-                e.audience_segment,
-                e.offer_type,
-                e.offer_details,
-                e.confidence_score,
-                e.brand,
-                e.food_category,
-                e.detected_region,
-                e.rejected_wrong_region
+        where = f'''
             FROM ads a
             LEFT JOIN ad_enrichment e ON a.id = e.ad_id
             WHERE a.advertiser_id = {ph}
-              AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
+              AND (e.rejected_wrong_region = {false_val} OR e.ad_id IS NULL)
         '''
-
+        params = [advertiser_id]
         if active_only:
-            query += f' AND a.is_active = {true_val}'
-        cursor.execute(query, (advertiser_id,))
-        rows = cursor.fetchall()
+            where += f' AND a.is_active = {true_val}'
+        if category:
+            where += f' AND e.product_category = {ph}'
+            params.append(category)
 
-        ads = []
-        for row in rows:
-            ad = dict(row)
-            # Parse JSON messaging_themes back to dict
-            if ad.get('messaging_themes'):
-                ad['messaging_themes'] = json.loads(ad['messaging_themes'])
-            ads.append(ad)
+        with self._read() as conn:
+            cursor = conn.cursor()
 
-        conn.close()
-        return ads
+            # Later pages don't recount: the client has the total from the first page
+            total_ads = None
+            if after is None:
+                cursor.execute(f'SELECT COUNT(*) {where}', params)
+                total_ads = cursor.fetchone()[0]
+            else:
+                # Seeks straight to the cursor on idx_ads_adv_first_seen instead of an OFFSET scan
+                where += f' AND (a.first_seen_date, a.id) < ({ph}, {ph})'
+                params += list(after)
+
+            # target_audience has never been populated; kept so the payload shape is stable
+            query = f'''
+                SELECT
+                    a.id, a.image_url, a.ad_text,
+                    e.product_category, e.product_name, e.offer_type, e.offer_details,
+                    e.primary_theme, NULL as target_audience,
+                    a.first_seen_date, a.last_seen_date, a.is_active,
+                    e.brand, e.food_category, e.detected_region, e.rejected_wrong_region
+                {where}
+                ORDER BY a.first_seen_date DESC, a.id DESC
+            '''
+            if limit:
+                query += f' LIMIT {ph}'
+                params.append(max(limit, 0))
+            elif offset and not self.use_postgres:
+                query += ' LIMIT -1'  # SQLite only accepts OFFSET after a LIMIT
+            if offset:
+                query += f' OFFSET {ph}'
+                params.append(max(offset, 0))
+
+            cursor.execute(query, params)
+            fields = tuple(col[0] for col in cursor.description)
+            ads = [dict(zip(fields, row)) for row in cursor.fetchall()]
+
+            return {'total_ads': total_ads, 'ads': ads}
+
+    def search_similar(self, vec: List[float], k: int = 10) -> List[Dict]:
+        """
+        Find the ads whose embeddings are closest to `vec` (cosine distance)
+        Uses the sqlite-vec KNN index when available, otherwise scans the BLOBs
+
+        Args:
+            vec: Query embedding (EMBEDDING_DIM floats)
+            k: Number of neighbours to return
+
+        Returns:
+            List of {"ad_id": int, "distance": float}, nearest first
+        """
+        with self._read() as conn:
+            cursor = conn.cursor()
+
+            if self.vec_enabled:
+                # Deleted ads can leave index rows behind - the JOIN drops them
+                cursor.execute('''
+                    SELECT knn.ad_id, knn.distance
+                    FROM (
+                        SELECT ad_id, distance FROM vec_ads
+                        WHERE embedding MATCH ? AND k = ?
+                    ) knn
+                    JOIN ads a ON a.id = knn.ad_id
+                    ORDER BY knn.distance
+                ''', (_pack_embedding(vec), k))
+                return [{'ad_id': ad_id, 'distance': distance} for ad_id, distance in cursor.fetchall()]
+
+            query_norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+
+            def cosine_distance(blob):
+                other = _unpack_embedding(blob)
+                norm = math.sqrt(sum(x * x for x in other)) or 1.0
+                return 1.0 - sum(a * b for a, b in zip(vec, other)) / (query_norm * norm)
+
+            cursor.execute('SELECT ad_id, embedding FROM ad_enrichment WHERE embedding IS NOT NULL')
+            nearest = heapq.nsmallest(k, ((cosine_distance(blob), ad_id) for ad_id, blob in cursor))
+            return [{'ad_id': ad_id, 'distance': distance} for distance, ad_id in nearest]
+
+    def search_ads(self, query: str, limit: int = 50) -> List[Dict]:
+        """
+        Full-text search over ad copy, best matches first
+
+        Args:
+            query: Words to look for (all must appear; matched as plain terms)
+            limit: Maximum number of ads to return
+
+        Returns:
+            List of ad dicts (same columns as get_all_ads, without enrichment)
+        """
+        terms = query.split()
+        if not terms:
+            return []
+
+        with self._read() as conn:
+            cursor = conn.cursor()
+
+            if self.use_postgres:
+                cursor.execute(f'''
+                    SELECT {AD_SELECT}
+                    FROM ads a
+                    WHERE to_tsvector('simple', COALESCE(a.ad_text, '')) @@ plainto_tsquery('simple', %s)
+                    ORDER BY ts_rank(to_tsvector('simple', COALESCE(a.ad_text, '')), plainto_tsquery('simple', %s)) DESC
+                    LIMIT %s
+                ''', (query, query, limit))
+            else:
+                # Quote every term so user input can't inject FTS5 query syntax
+                match = ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+                cursor.execute(f'''
+                    SELECT {AD_SELECT}
+                    FROM ads_fts f
+                    JOIN ads a ON a.id = f.rowid
+                    WHERE ads_fts MATCH ?
+                    ORDER BY bm25(ads_fts)
+                    LIMIT ?
+                ''', (match, limit))
+
+            fields = tuple(col[0] for col in cursor.description)
+            return [dict(zip(fields, row)) for row in cursor.fetchall()]
 
     def get_products_by_competitor(self, advertiser_id: str = None) -> List[Dict]:
         """
@@ -523,37 +1588,31 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
 
             ph = self._param_placeholder()
-            false_val = 'FALSE' if self.use_postgres else '0'
-            true_val = 'TRUE' if self.use_postgres else '1'
 
             # Days active calculation differs between SQLite and Postgres
             if self.use_postgres:
-                days_calc = "CAST(EXTRACT(DAY FROM (CURRENT_TIMESTAMP - MIN(a.first_seen_date))) AS INTEGER)"
+                days_calc = "CAST(EXTRACT(DAY FROM (CURRENT_TIMESTAMP - first_seen_date)) AS INTEGER)"
             else:
-                days_calc = "CAST(julianday('now') - julianday(MIN(a.first_seen_date)) AS INTEGER)"
+                days_calc = "CAST(julianday('now') - julianday(first_seen_date) AS INTEGER)"
 
             query = f'''
                 SELECT
-                    a.advertiser_id,
-                    e.product_category,
-                    COUNT(DISTINCT a.id) as ad_count,
-                    COUNT(DISTINCT a.image_url) as unique_creatives,
+                    advertiser_id,
+                    product_category,
+                    ad_count,
+                    unique_creatives,
                     {days_calc} as days_active
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
+                FROM mv_product_counts
             '''
 
             if advertiser_id:
-                query += f' AND a.advertiser_id = {ph}'
-                cursor.execute(query + ' GROUP BY a.advertiser_id, e.product_category', (advertiser_id,))
+                cursor.execute(query + f' WHERE advertiser_id = {ph}', (advertiser_id,))
             else:
-                cursor.execute(query + ' GROUP BY a.advertiser_id, e.product_category')
+                cursor.execute(query)
 
             rows = cursor.fetchall()
 
@@ -584,55 +1643,17 @@ class AdDatabase:
                 ...
             }
         """
-        # Calculate date filter
-        date_filter = ""
-        if time_range == "week":
-            date_filter = "AND a.first_seen_date >= date('now', '-7 days')"
-        elif time_range == "month":
-            date_filter = "AND a.first_seen_date >= date('now', '-30 days')"
-        elif time_range == "quarter":
-            date_filter = "AND a.first_seen_date >= date('now', '-90 days')"
+        # Unknown ranges fall back to all-time
+        query = self._messaging_queries.get(time_range, self._messaging_queries['all'])
 
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
-
-            true_val = self._true_val()
-            false_val = self._false_val()
-
-            query = f'''
-                SELECT
-                    a.advertiser_id,
-                    e.primary_theme,
-                    COUNT(*) as count
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
-                  {date_filter}
-                GROUP BY a.advertiser_id, e.primary_theme
-            '''
-
             cursor.execute(query)
-            rows = cursor.fetchall()
 
-            # Aggregate by competitor
+            # Themes a competitor never used stay at 0
             breakdown = {}
-            totals = {}
-
-            for row in rows:
-                adv_id, theme, count = row
-                if adv_id not in breakdown:
-                    breakdown[adv_id] = {'price': 0, 'speed': 0, 'quality': 0, 'convenience': 0}
-                    totals[adv_id] = 0
-
-                breakdown[adv_id][theme] = count
-                totals[adv_id] += count
-
-            # Convert to percentages
-            for adv_id in breakdown:
-                total = totals[adv_id]
-                for theme in breakdown[adv_id]:
-                    breakdown[adv_id][theme] = int((breakdown[adv_id][theme] / total) * 100) if total > 0 else 0
+            for adv_id, theme, percentage in cursor.fetchall():
+                breakdown.setdefault(adv_id, {'price': 0, 'speed': 0, 'quality': 0, 'convenience': 0})[theme] = percentage
 
             return breakdown
 
@@ -655,37 +1676,10 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
 
-            ph = self._param_placeholder()
-
-            # Date arithmetic differs between SQLite and Postgres
-            if self.use_postgres:
-                date_filter = f"first_seen_date >= CURRENT_DATE - INTERVAL '{ph} days'"
-                query = f'''
-                    SELECT
-                        DATE(first_seen_date) as ad_date,
-                        advertiser_id,
-                        COUNT(*) as count
-                    FROM ads
-                    WHERE {date_filter}
-                    GROUP BY DATE(first_seen_date), advertiser_id
-                    ORDER BY ad_date DESC
-                '''
-                cursor.execute(query.replace(ph, '%s'), (days,))
-            else:
-                query = f'''
-                    SELECT
-                        DATE(first_seen_date) as ad_date,
-                        advertiser_id,
-                        COUNT(*) as count
-                    FROM ads
-                    WHERE first_seen_date >= date('now', {ph} || ' days')
-                    GROUP BY DATE(first_seen_date), advertiser_id
-                    ORDER BY ad_date DESC
-                '''
-                cursor.execute(query, (-days,))
+            cursor.execute(self._velocity_query, (days,))
             rows = cursor.fetchall()
 
             # Group by date
@@ -723,58 +1717,36 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
 
-            true_val = self._true_val()
-            false_val = self._false_val()
-
-            query = f'''
+            # Segment totals and share of all targeted ads come from window functions
+            query = '''
                 SELECT
-                    e.audience_segment,
-                    a.advertiser_id,
-                    COUNT(*) as ad_count
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
-                  AND e.audience_segment IS NOT NULL
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
-                GROUP BY e.audience_segment, a.advertiser_id
-                ORDER BY ad_count DESC
+                    audience_segment,
+                    advertiser_id,
+                    SUM(ad_count) OVER (PARTITION BY audience_segment) as total_ads,
+                    CAST(ROUND(100.0 * SUM(ad_count) OVER (PARTITION BY audience_segment)
+                               / SUM(ad_count) OVER (), 1) AS DOUBLE PRECISION) as percentage
+                FROM mv_audience_counts
+                ORDER BY total_ads DESC, ad_count DESC
             '''
 
             cursor.execute(query)
-            rows = cursor.fetchall()
 
-            # Aggregate by segment
-            segment_data = {}
-            total_ads = 0
-
-            for row in rows:
-                segment, adv_id, count = row
-                if segment not in segment_data:
-                    segment_data[segment] = {
-                        'total_ads': 0,
-                        'competitors': []
+            audience_by_segment = {}
+            for segment, adv_id, total_ads, percentage in cursor.fetchall():
+                if segment not in audience_by_segment:
+                    audience_by_segment[segment] = {
+                        'segment': segment,
+                        'competitors': [],
+                        'total_ads': total_ads,
+                        'percentage': percentage
                     }
+                audience_by_segment[segment]['competitors'].append(adv_id)
 
-                segment_data[segment]['total_ads'] += count
-                segment_data[segment]['competitors'].append(adv_id)
-                total_ads += count
-
-            # Convert to list with percentages
-            audience_list = []
-            for segment, data in segment_data.items():
-                percentage = round((data['total_ads'] / total_ads * 100), 1) if total_ads > 0 else 0
-                audience_list.append({
-                    'segment': segment,
-                    'competitors': data['competitors'],
-                    'total_ads': data['total_ads'],
-                    'percentage': percentage
-                })
-
-            # Sort by total_ads descending
-            audience_list.sort(key=lambda x: x['total_ads'], reverse=True)
+            # Already sorted by total_ads descending
+            audience_list = list(audience_by_segment.values())
 
             return audience_list
 
@@ -789,42 +1761,10 @@ class AdDatabase:
         Returns:
             List of daily promo stats with breakdown by offer type
         """
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
 
-            ph = self._param_placeholder()
-
-            # Date arithmetic differs between SQLite and Postgres
-            if self.use_postgres:
-                query = f'''
-                    SELECT
-                        DATE(a.first_seen_date) as promo_date,
-                        e.offer_type,
-                        COUNT(*) as count
-                    FROM ads a
-                    JOIN ad_enrichment e ON a.id = e.ad_id
-                    WHERE a.first_seen_date >= CURRENT_DATE - INTERVAL '{days} days'
-                      AND e.offer_type IS NOT NULL
-                      AND e.offer_type != 'none'
-                    GROUP BY DATE(a.first_seen_date), e.offer_type
-                    ORDER BY promo_date DESC
-                '''
-                cursor.execute(query)
-            else:
-                query = f'''
-                    SELECT
-                        DATE(a.first_seen_date) as promo_date,
-                        e.offer_type,
-                        COUNT(*) as count
-                    FROM ads a
-                    JOIN ad_enrichment e ON a.id = e.ad_id
-                    WHERE a.first_seen_date >= date('now', {ph} || ' days')
-                      AND e.offer_type IS NOT NULL
-                      AND e.offer_type != 'none'
-                    GROUP BY DATE(a.first_seen_date), e.offer_type
-                    ORDER BY promo_date DESC
-                '''
-                cursor.execute(query, (-days,))
+            cursor.execute(self._promo_timeline_query, (days,))
             rows = cursor.fetchall()
 
             # Group by date
@@ -867,76 +1807,44 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
 
-            true_val = self._true_val()
-            false_val = self._false_val()
-
-            query = f'''
+            # Offer-type totals and share of all offers come from window functions
+            query = '''
                 SELECT
-                    e.offer_type,
-                    e.offer_details,
-                    a.advertiser_id,
-                    COUNT(*) as ad_count
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
-                  AND e.offer_type IS NOT NULL
-                  AND e.offer_type != 'none'
-                  AND e.offer_type != ''
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
-                GROUP BY e.offer_type, a.advertiser_id
-                ORDER BY ad_count DESC
+                    offer_type,
+                    sample_offer,
+                    advertiser_id,
+                    SUM(ad_count) OVER (PARTITION BY offer_type) as type_count,
+                    CAST(ROUND(100.0 * SUM(ad_count) OVER (PARTITION BY offer_type)
+                               / SUM(ad_count) OVER (), 1) AS DOUBLE PRECISION) as percentage
+                FROM mv_offer_counts
+                ORDER BY type_count DESC, ad_count DESC
             '''
 
             cursor.execute(query)
-            rows = cursor.fetchall()
 
-            # Aggregate by offer type
-            offer_data = {}
-            total_offers = 0
-
-            for row in rows:
-                offer_type, offer_details, adv_id, count = row
-
-                if offer_type not in offer_data:
-                    offer_data[offer_type] = {
-                        'ad_count': 0,
-                        'competitors': set(),
-                        'sample_offers': set()
+            offers_by_type = {}
+            for offer_type, sample_offer, adv_id, type_count, percentage in cursor.fetchall():
+                if offer_type not in offers_by_type:
+                    offers_by_type[offer_type] = {
+                        'offer_type': offer_type,
+                        'label': OFFER_LABELS.get(offer_type) or _category_label(offer_type),
+                        'ad_count': type_count,
+                        'percentage': percentage,
+                        'competitors': [],
+                        'sample_offers': []
                     }
+                offer = offers_by_type[offer_type]
+                if adv_id not in offer['competitors']:
+                    offer['competitors'].append(adv_id)
+                # Top 3 distinct samples
+                if sample_offer and sample_offer not in offer['sample_offers'] and len(offer['sample_offers']) < 3:
+                    offer['sample_offers'].append(sample_offer)
 
-                offer_data[offer_type]['ad_count'] += count
-                offer_data[offer_type]['competitors'].add(adv_id)
-                if offer_details:
-                    offer_data[offer_type]['sample_offers'].add(offer_details)
-                total_offers += count
-
-            # Convert to list with labels and percentages
-            offer_labels = {
-                'percentage_discount': '% Off Discounts',
-                'fixed_discount': 'Fixed Amount Off',
-                'free_delivery': 'Free Delivery',
-                'bogo': 'Buy One Get One',
-                'limited_time': 'Limited Time Offer',
-                'new_product': 'New Product Launch'
-            }
-
-            offers_list = []
-            for offer_type, data in offer_data.items():
-                percentage = round((data['ad_count'] / total_offers * 100), 1) if total_offers > 0 else 0
-                offers_list.append({
-                    'offer_type': offer_type,
-                    'label': offer_labels.get(offer_type, offer_type.replace('_', ' ').title()),
-                    'ad_count': data['ad_count'],
-                    'percentage': percentage,
-                    'competitors': list(data['competitors']),
-                    'sample_offers': list(data['sample_offers'])[:3]  # Top 3 samples
-                })
-
-            # Sort by ad_count descending
-            offers_list.sort(key=lambda x: x['ad_count'], reverse=True)
+            # Already sorted by ad_count descending
+            offers_list = list(offers_by_type.values())
 
             return offers_list
 
@@ -958,55 +1866,51 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
 
             true_val = self._true_val()
             false_val = self._false_val()
 
+            # Extract restaurant name in SQL (format: "Restaurant - Food Type")
+            if self.use_postgres:
+                restaurant_expr = "split_part(e.product_name, ' - ', 1)"
+            else:
+                restaurant_expr = "substr(e.product_name, 1, instr(e.product_name || ' - ', ' - ') - 1)"
+
+            # Top 20 restaurants; total (window, evaluated before LIMIT) covers
+            # every restaurant so percentages reflect the full share
             query = f'''
                 SELECT
-                    e.product_name,
+                    {restaurant_expr} as restaurant,
                     e.product_category,
-                    a.advertiser_id,
-                    COUNT(*) as ad_count
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
+                    COUNT(*) as ad_count,
+                    SUM(COUNT(*)) OVER (),
+                    {self._json_array_agg('e.advertiser_id')}
+                FROM ad_enrichment e
+                WHERE e.is_active = {true_val}
                   AND e.product_name IS NOT NULL
                   AND e.product_name != ''
                   AND e.product_name != 'Unknown'
                   AND e.product_category = 'Specific Restaurant/Brand Promo'
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
-                GROUP BY e.product_name, e.product_category, a.advertiser_id
-                ORDER BY ad_count DESC
+                  AND e.rejected_wrong_region = {false_val}
+                GROUP BY restaurant, e.product_category
+                ORDER BY ad_count DESC, restaurant
                 LIMIT 20
             '''
 
             cursor.execute(query)
-            rows = cursor.fetchall()
-
-            # Aggregate restaurants
-            total_restaurant_ads = sum(row[3] for row in rows)
-
-            restaurants_list = []
-            for row in rows:
-                product_name, product_category, adv_id, ad_count = row
 
-                # Extract restaurant name (format: "Restaurant - Food Type")
-                restaurant = product_name.split(' - ')[0] if ' - ' in product_name else product_name
-
-                percentage = round((ad_count / total_restaurant_ads * 100), 1) if total_restaurant_ads > 0 else 0
-
-                restaurants_list.append({
+            return [
+                {
                     'restaurant': restaurant,
                     'ad_count': ad_count,
-                    'percentage': percentage,
+                    'percentage': round((ad_count / total * 100), 1),
                     'food_category': product_category,
-                    'competitors': [adv_id]
-                })
-
-            return restaurants_list
+                    'competitors': self._json_array(competitors)
+                }
+                for restaurant, product_category, ad_count, total, competitors in cursor.fetchall()
+            ]
 
     def get_brands_breakdown(self) -> List[Dict]:
         """
@@ -1026,76 +1930,45 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-
-            true_val = self._true_val()
-            false_val = self._false_val()
-            
-            # GROUP_CONCAT vs STRING_AGG
-            concat_func = "STRING_AGG(DISTINCT e.food_category, ',')" if self.use_postgres else "GROUP_CONCAT(DISTINCT e.food_category)"
-
-            query = f'''
-                SELECT
-                    e.brand,
-                    a.advertiser_id,
-                    COUNT(*) as ad_count,
-                    {concat_func} as food_categories
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
-                  AND e.brand IS NOT NULL
-                  AND e.brand != ''
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
-                GROUP BY e.brand, a.advertiser_id
-                ORDER BY ad_count DESC
-            '''
-
-            cursor.execute(query)
-            rows = cursor.fetchall()
+        return list(self.iter_brands_breakdown())
 
-            # Aggregate by brand
-            brand_data = {}
-            total_brand_ads = 0
+    def iter_brands_breakdown(self) -> Iterator[Dict]:
+        """
+        Stream the brand breakdown row by row (same dicts as
+        get_brands_breakdown) - the read connection stays checked out
+        until the iterator is exhausted or closed
+        """
+        with self._read() as conn:
+            cursor = conn.cursor()
 
-            for row in rows:
-                brand, adv_id, count, food_cats = row
+            # total is the grand total over all groups (window over the grouped rows)
+            cursor.execute(f'''
+                SELECT brand,
+                       SUM(ad_count) AS ad_count,
+                       SUM(SUM(ad_count)) OVER (),
+                       {self._json_array_agg('advertiser_id')},
+                       {self._json_array_agg('food_category')}
+                FROM mv_tag_counts
+                WHERE brand IS NOT NULL
+                  AND brand != ''
+                GROUP BY brand
+                ORDER BY ad_count DESC, brand
+            ''')
 
-                if brand not in brand_data:
-                    brand_data[brand] = {
-                        'ad_count': 0,
-                        'competitors': set(),
-                        'food_categories': set()
+            # Sorted by ad_count descending
+            while True:
+                rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for brand, ad_count, total, competitors, food_categories in rows:
+                    yield {
+                        'brand': brand,
+                        'ad_count': ad_count,
+                        'percentage': round((ad_count / total * 100), 1),
+                        'competitors': self._json_array(competitors),
+                        'food_categories': self._json_array(food_categories)
                     }
 
-                brand_data[brand]['ad_count'] += count
-                brand_data[brand]['competitors'].add(adv_id)
-
-                # Parse food categories
-                if food_cats:
-                    for cat in food_cats.split(','):
-                        if cat and cat.strip():
-                            brand_data[brand]['food_categories'].add(cat.strip())
-
-                total_brand_ads += count
-
-            # Convert to list with percentages
-            brands_list = []
-            for brand, data in brand_data.items():
-                percentage = round((data['ad_count'] / total_brand_ads * 100), 1) if total_brand_ads > 0 else 0
-                brands_list.append({
-                    'brand': brand,
-                    'ad_count': data['ad_count'],
-                    'percentage': percentage,
-                    'competitors': list(data['competitors']),
-                    'food_categories': list(data['food_categories'])
-                })
-
-            # Sort by ad_count descending
-            brands_list.sort(key=lambda x: x['ad_count'], reverse=True)
-
-            return brands_list
-
     def get_food_categories_breakdown(self) -> List[Dict]:
         """
         Get food categories breakdown with % distribution
@@ -1114,76 +1987,45 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-
-            true_val = self._true_val()
-            false_val = self._false_val()
-
-            # GROUP_CONCAT vs STRING_AGG
-            concat_func = "STRING_AGG(DISTINCT e.brand, ',')" if self.use_postgres else "GROUP_CONCAT(DISTINCT e.brand)"
-
-            query = f'''
-                SELECT
-                    e.food_category,
-                    a.advertiser_id,
-                    COUNT(*) as ad_count,
-                    {concat_func} as brands
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
-                  AND e.food_category IS NOT NULL
-                  AND e.food_category != ''
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
-                GROUP BY e.food_category, a.advertiser_id
-                ORDER BY ad_count DESC
-            '''
-
-            cursor.execute(query)
-            rows = cursor.fetchall()
+        return list(self.iter_food_categories_breakdown())
 
-            # Aggregate by food category
-            category_data = {}
-            total_food_ads = 0
+    def iter_food_categories_breakdown(self) -> Iterator[Dict]:
+        """
+        Stream the food category breakdown row by row (same dicts as
+        get_food_categories_breakdown) - the read connection stays checked out
+        until the iterator is exhausted or closed
+        """
+        with self._read() as conn:
+            cursor = conn.cursor()
 
-            for row in rows:
-                food_cat, adv_id, count, brands_str = row
+            # total is the grand total over all groups (window over the grouped rows)
+            cursor.execute(f'''
+                SELECT food_category,
+                       SUM(ad_count) AS ad_count,
+                       SUM(SUM(ad_count)) OVER (),
+                       {self._json_array_agg('advertiser_id')},
+                       {self._json_array_agg('brand')}
+                FROM mv_tag_counts
+                WHERE food_category IS NOT NULL
+                  AND food_category != ''
+                GROUP BY food_category
+                ORDER BY ad_count DESC, food_category
+            ''')
 
-                if food_cat not in category_data:
-                    category_data[food_cat] = {
-                        'ad_count': 0,
-                        'competitors': set(),
-                        'brands': set()
+            # Sorted by ad_count descending
+            while True:
+                rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for food_cat, ad_count, total, competitors, brands in rows:
+                    yield {
+                        'food_category': food_cat,
+                        'ad_count': ad_count,
+                        'percentage': round((ad_count / total * 100), 1),
+                        'competitors': self._json_array(competitors),
+                        'brands': self._json_array(brands)
                     }
 
-                category_data[food_cat]['ad_count'] += count
-                category_data[food_cat]['competitors'].add(adv_id)
-
-                # Parse brands
-                if brands_str:
-                    for brand in brands_str.split(','):
-                        if brand and brand.strip():
-                            category_data[food_cat]['brands'].add(brand.strip())
-
-                total_food_ads += count
-
-            # Convert to list with percentages
-            categories_list = []
-            for food_cat, data in category_data.items():
-                percentage = round((data['ad_count'] / total_food_ads * 100), 1) if total_food_ads > 0 else 0
-                categories_list.append({
-                    'food_category': food_cat,
-                    'ad_count': data['ad_count'],
-                    'percentage': percentage,
-                    'competitors': list(data['competitors']),
-                    'brands': list(data['brands'])
-                })
-
-            # Sort by ad_count descending
-            categories_list.sort(key=lambda x: x['ad_count'], reverse=True)
-
-            return categories_list
-
     def get_product_categories_breakdown(self) -> List[Dict]:
         """
         Get product categories breakdown with % distribution
@@ -1202,124 +2044,162 @@ class AdDatabase:
                 ...
             ]
         """
-        with self._get_connection() as conn:
+        return list(self.iter_product_categories_breakdown())
+
+    def iter_product_categories_breakdown(self) -> Iterator[Dict]:
+        """
+        Stream the product category breakdown row by row (same dicts as
+        get_product_categories_breakdown) - the read connection stays checked out
+        until the iterator is exhausted or closed
+        """
+        with self._read() as conn:
             cursor = conn.cursor()
 
-            true_val = self._true_val()
-            false_val = self._false_val()
+            # total is the grand total over all groups (window over the grouped rows)
+            cursor.execute(f'''
+                SELECT product_category,
+                       SUM(ad_count) AS ad_count,
+                       SUM(SUM(ad_count)) OVER (),
+                       {self._json_array_agg('advertiser_id')},
+                       {self._json_array_agg('brand')}
+                FROM mv_tag_counts
+                WHERE product_category IS NOT NULL
+                  AND product_category != ''
+                GROUP BY product_category
+                ORDER BY ad_count DESC, product_category
+            ''')
 
-            # GROUP_CONCAT vs STRING_AGG
-            concat_func = "STRING_AGG(DISTINCT e.brand, ',')" if self.use_postgres else "GROUP_CONCAT(DISTINCT e.brand)"
+            # Sorted by ad_count descending
+            while True:
+                rows = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for product_cat, ad_count, total, competitors, brands in rows:
+                    yield {
+                        'product_category': product_cat,
+                        'category_label': _category_label(product_cat),
+                        'ad_count': ad_count,
+                        'percentage': round((ad_count / total * 100), 1),
+                        'competitors': self._json_array(competitors),
+                        'brands': self._json_array(brands)
+                    }
 
-            query = f'''
-                SELECT
-                    e.product_category,
-                    a.advertiser_id,
-                    COUNT(*) as ad_count,
-                    {concat_func} as brands
-                FROM ads a
-                JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.is_active = {true_val}
-                  AND e.product_category IS NOT NULL
-                  AND e.product_category != ''
-                  AND (e.rejected_wrong_region = {false_val} OR e.rejected_wrong_region IS NULL)
-                GROUP BY e.product_category, a.advertiser_id
-                ORDER BY ad_count DESC
-            '''
+    def mark_ads_inactive(self, advertiser_id: str, ad_signatures: List[str]):
+        """
+        Mark ads as inactive if they're not in the provided list
+        Used for incremental scraping to detect removed ads
 
-            cursor.execute(query)
-            rows = cursor.fetchall()
+        Args:
+            advertiser_id: Competitor's advertiser ID
+            ad_signatures: ad_signature() of every ad that is still ACTIVE
+        """
+        with self._write() as conn:
+            cursor = conn.cursor()
 
-            # Aggregate by product category
-            category_data = {}
-            total_ads = 0
+            ph = self._param_placeholder()
+            true_val = self._true_val()
+            false_val = self._false_val()
 
-            for row in rows:
-                product_cat, adv_id, count, brands_str = row
+            # Stage the live signatures, then retire everything else in one statement
+            cursor.execute('CREATE TEMP TABLE IF NOT EXISTS active_sigs (sig TEXT PRIMARY KEY)')
+            cursor.execute('DELETE FROM active_sigs')
+            cursor.executemany(f'INSERT INTO active_sigs (sig) VALUES ({ph}) ON CONFLICT (sig) DO NOTHING',
+                               [(sig,) for sig in ad_signatures])
 
-                if product_cat not in category_data:
-                    category_data[product_cat] = {
-                        'ad_count': 0,
-                        'competitors': set(),
-                        'brands': set()
-                    }
+            cursor.execute(f'''
+                UPDATE ads
+                SET is_active = {false_val}, last_seen_date = CURRENT_TIMESTAMP
+                WHERE advertiser_id = {ph} AND is_active = {true_val}
+                  AND COALESCE(ad_text, '') || '||' || COALESCE(image_url, '') NOT IN (SELECT sig FROM active_sigs)
+            ''', (advertiser_id,))
+            inactive_count = cursor.rowcount
+            cursor.execute('DROP TABLE active_sigs')
 
-                category_data[product_cat]['ad_count'] += count
-                category_data[product_cat]['competitors'].add(adv_id)
+            cursor.execute(f'''
+                UPDATE ad_enrichment
+                SET is_active = {false_val}
+                WHERE advertiser_id = {ph} AND is_active = {true_val}
+                  AND ad_id IN (SELECT id FROM ads WHERE advertiser_id = {ph} AND is_active = {false_val})
+            ''', (advertiser_id, advertiser_id))
 
-                # Parse brands
-                if brands_str:
-                    for brand in brands_str.split(','):
-                        if brand and brand.strip():
-                            category_data[product_cat]['brands'].add(brand.strip())
+            if inactive_count:
+                self._refresh_rollups(cursor, [advertiser_id])
 
-                total_ads += count
+            print(f"🔄 Marked {inactive_count} ads as inactive")
+            return inactive_count
 
-            # Convert to list with percentages
-            categories_list = []
-            for product_cat, data in category_data.items():
-                percentage = round((data['ad_count'] / total_ads * 100), 1) if total_ads > 0 else 0
+    def reject_ad(self, ad_id: int) -> Optional[str]:
+        """
+        Soft-delete an ad by flagging its enrichment row rejected_wrong_region
+        (created if the ad was never enriched), rebuilding its advertiser's
+        roll-ups in the same write transaction
+        Used by: DELETE /api/ad-content/{ad_id}
 
-                # Friendly category name
-                category_label = product_cat.replace('_', ' ').title()
+        Returns:
+            The ad's advertiser_id, or None if there is no such ad
+        """
+        with self._write() as conn:
+            cursor = conn.cursor()
 
-                categories_list.append({
-                    'product_category': product_cat,
-                    'category_label': category_label,
-                    'ad_count': data['ad_count'],
-                    'percentage': percentage,
-                    'competitors': list(data['competitors']),
-                    'brands': list(data['brands'])
-                })
+            ph = self._param_placeholder()
+            true_val = self._true_val()
 
-            # Sort by ad_count descending
-            categories_list.sort(key=lambda x: x['ad_count'], reverse=True)
+            # One statement: copies the ad's keys into a new enrichment row or flags the
+            # existing one; no row back means there is no such ad
+            cursor.execute(f'''
+                INSERT INTO ad_enrichment (ad_id, advertiser_id, is_active, rejected_wrong_region)
+                SELECT id, advertiser_id, is_active, {true_val} FROM ads WHERE id = {ph}
+                ON CONFLICT (ad_id) DO UPDATE SET rejected_wrong_region = {true_val}
+                RETURNING advertiser_id
+            ''', (ad_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            advertiser_id = row[0]
 
-            return categories_list
+            self._refresh_rollups(cursor, [advertiser_id])
+            return advertiser_id
 
-    def mark_ads_inactive(self, advertiser_id: str, ad_signatures: List[str]):
+    def update_ad_enrichment(self, ad_id: int, fields: Dict) -> Optional[str]:
         """
-        Mark ads as inactive if they're not in the provided list
-        Used for incremental scraping to detect removed ads
+        Apply a manual edit to an ad's enrichment (created if the ad was never
+        enriched) and mark it manually_edited so re-enrichment keeps it, rebuilding
+        its advertiser's roll-ups in the same write transaction
+        Used by: PATCH /api/ad-content/{ad_id}
 
         Args:
-            advertiser_id: Competitor's advertiser ID
-            ad_signatures: List of ad signatures (ad_text||image_url) that are ACTIVE
+            ad_id: Database ID of the ad
+            fields: Column -> value, keys limited to EDITABLE_ENRICHMENT_FIELDS
+
+        Returns:
+            The ad's advertiser_id, or None if there is no such ad
         """
-        with self._get_connection() as conn:
+        unknown = set(fields) - set(EDITABLE_ENRICHMENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Fields not editable: {sorted(unknown)}")
+
+        with self._write() as conn:
             cursor = conn.cursor()
 
             ph = self._param_placeholder()
             true_val = self._true_val()
-            false_val = self._false_val()
 
-            # Get all ads for this advertiser
+            columns = list(fields)
+            set_clause = ', '.join(f'{col} = excluded.{col}' for col in columns)
             cursor.execute(f'''
-                SELECT id, ad_text, image_url
-                FROM ads
-                WHERE advertiser_id = {ph} AND is_active = {true_val}
-            ''', (advertiser_id,))
-
-            rows = cursor.fetchall()
-
-            inactive_count = 0
-            for row in rows:
-                ad_id, ad_text, image_url = row
-                signature = f"{ad_text}||{image_url}"
-
-                # If this ad is not in current scrape, mark inactive
-                if signature not in ad_signatures:
-                    cursor.execute(f'''
-                        UPDATE ads
-                        SET is_active = {false_val}, last_seen_date = CURRENT_TIMESTAMP
-                        WHERE id = {ph}
-                    ''', (ad_id,))
-                    inactive_count += 1
-
-            conn.commit()
+                INSERT INTO ad_enrichment (ad_id, advertiser_id, is_active, manually_edited, {', '.join(columns)})
+                SELECT id, advertiser_id, is_active, {true_val}, {', '.join([ph] * len(columns))}
+                FROM ads WHERE id = {ph}
+                ON CONFLICT (ad_id) DO UPDATE SET {set_clause}, manually_edited = {true_val}
+                RETURNING advertiser_id
+            ''', [fields[col] for col in columns] + [ad_id])
+            row = cursor.fetchone()
+            if not row:
+                return None
+            advertiser_id = row[0]
 
-            print(f"🔄 Marked {inactive_count} ads as inactive")
-            return inactive_count
+            self._refresh_rollups(cursor, [advertiser_id])
+            return advertiser_id
 
     def record_scrape_run(self, advertiser_id: str, stats: Dict):
         """
@@ -1329,7 +2209,7 @@ class AdDatabase:
             advertiser_id: Competitor's advertiser ID
             stats: Dict with keys: ads_found, ads_new, ads_retired
         """
-        with self._get_connection() as conn:
+        with self._write() as conn:
             cursor = conn.cursor()
 
             ph = self._param_placeholder()
@@ -1346,26 +2226,140 @@ class AdDatabase:
                 1 if 'product_category' in stats else 0
             ))
 
-            conn.commit()
+    def get_competitor_summaries(self) -> List[Dict]:
+        """
+        Ad count and latest scrape time per advertiser, excluding wrong-region ads
+        Used by: /api/competitors endpoint
 
-    def get_stats(self) -> Dict:
-        """Get overall database statistics"""
-        with self._get_connection() as conn:
+        Returns:
+            [{"advertiser_id": "AR123", "total_ads": 42, "last_scraped": datetime or None}, ...]
+        """
+        with self._read() as conn:
             cursor = conn.cursor()
 
-            true_val = self._true_val()
+            # Un-enriched ads count too, so probe for a rejection instead of joining:
+            # a covering scan of idx_ads_adv_created plus one key lookup per ad
+            cursor.execute(f'''
+                SELECT
+                    a.advertiser_id,
+                    COUNT(*) as total_ads,
+                    MAX(a.created_at) as last_scraped
+                FROM ads a
+                WHERE a.advertiser_id IS NOT NULL
+                  AND NOT EXISTS (
+                    SELECT 1 FROM ad_enrichment e
+                    WHERE e.ad_id = a.id AND e.rejected_wrong_region = {self._true_val()}
+                )
+                GROUP BY a.advertiser_id
+            ''')
+
+            summaries = []
+            for advertiser_id, total_ads, last_scraped in cursor.fetchall():
+                # SQLite hands back TIMESTAMP columns as text, Postgres as datetime
+                if isinstance(last_scraped, str):
+                    try:
+                        last_scraped = datetime.fromisoformat(last_scraped)
+                    except ValueError:
+                        last_scraped = None
+                summaries.append({
+                    'advertiser_id': advertiser_id,
+                    'total_ads': total_ads,
+                    'last_scraped': last_scraped
+                })
+
+            return summaries
+
+    def get_competitor_insight_counts(self, advertiser_id: str) -> Dict:
+        """
+        Active-ad counts behind a competitor's insight card, excluding wrong-region ads
+        Used by: /api/competitors/{advertiser_id}/insights endpoint
+
+        Returns:
+            {"total_ads": 42, "last_week": 5, "previous_week": 3,
+             "competitor_recent": 20, "all_recent": 80,
+             "top_category": "Grocery" or None, "top_category_count": 12}
+        """
+        ph = self._param_placeholder()
+        true_val = self._true_val()
+        false_val = self._false_val()
+
+        # Same naive local-time windows the endpoint always compared against
+        now = datetime.now()
+        week_ago, two_weeks_ago, month_ago = (
+            (now - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+            for days in (7, 14, 30)
+        )
+
+        with self._read() as conn:
+            cursor = conn.cursor()
+
+            # One pass over this competitor's ads plus everyone's last 30 days
+            # (idx_ads_adv_created and idx_first_seen cover the two halves of the OR)
+            cursor.execute(f'''
+                SELECT
+                    COUNT(*) FILTER (WHERE a.advertiser_id = {ph}),
+                    COUNT(*) FILTER (WHERE a.advertiser_id = {ph} AND a.first_seen_date >= {ph}),
+                    COUNT(*) FILTER (WHERE a.advertiser_id = {ph}
+                                       AND a.first_seen_date >= {ph} AND a.first_seen_date < {ph}),
+                    COUNT(*) FILTER (WHERE a.advertiser_id = {ph} AND a.first_seen_date >= {ph}),
+                    COUNT(*) FILTER (WHERE a.first_seen_date >= {ph})
+                FROM ads a
+                LEFT JOIN ad_enrichment e ON a.id = e.ad_id
+                WHERE a.is_active = {true_val}
+                  AND (e.rejected_wrong_region = {false_val} OR e.ad_id IS NULL)
+                  AND (a.advertiser_id = {ph} OR a.first_seen_date >= {ph})
+            ''', (
+                advertiser_id,
+                advertiser_id, week_ago,
+                advertiser_id, two_weeks_ago, week_ago,
+                advertiser_id, month_ago,
+                month_ago,
+                advertiser_id, month_ago,
+            ))
+            total_ads, last_week, previous_week, competitor_recent, all_recent = cursor.fetchone()
+
+            cursor.execute(f'''
+                SELECT e.product_category, COUNT(*) as count
+                FROM ads a
+                JOIN ad_enrichment e ON a.id = e.ad_id
+                WHERE a.advertiser_id = {ph}
+                  AND a.is_active = {true_val}
+                  AND e.rejected_wrong_region = {false_val}
+                  AND e.product_category IS NOT NULL
+                  AND e.product_category != ''
+                GROUP BY e.product_category
+                ORDER BY count DESC, e.product_category
+                LIMIT 1
+            ''', (advertiser_id,))
+            top = cursor.fetchone()
 
-            cursor.execute('SELECT COUNT(*) FROM ads')
-            total_ads = cursor.fetchone()[0]
+            return {
+                'total_ads': total_ads,
+                'last_week': last_week,
+                'previous_week': previous_week,
+                'competitor_recent': competitor_recent,
+                'all_recent': all_recent,
+                'top_category': top[0] if top else None,
+                'top_category_count': top[1] if top else 0
+            }
 
-            cursor.execute(f'SELECT COUNT(*) FROM ads WHERE is_active = {true_val}')
-            active_ads = cursor.fetchone()[0]
+    def get_stats(self) -> Dict:
+        """Get overall database statistics"""
+        with self._read() as conn:
+            cursor = conn.cursor()
 
-            cursor.execute('SELECT COUNT(DISTINCT advertiser_id) FROM ads')
-            total_competitors = cursor.fetchone()[0]
+            true_val = self._true_val()
 
-            cursor.execute('SELECT COUNT(*) FROM ad_enrichment')
-            enriched_ads = cursor.fetchone()[0]
+            # One scan of ads for all three ad counts
+            cursor.execute(f'''
+                SELECT
+                    COUNT(*),
+                    COUNT(*) FILTER (WHERE is_active = {true_val}),
+                    COUNT(DISTINCT advertiser_id),
+                    (SELECT COUNT(*) FROM ad_enrichment)
+                FROM ads
+            ''')
+            total_ads, active_ads, total_competitors, enriched_ads = cursor.fetchone()
 
             return {
                 'total_ads': total_ads,
@@ -1379,6 +2373,15 @@ class AdDatabase:
     # Product Knowledge Base Methods
     # ========================================================================
 
+    @staticmethod
+    def _product_from_row(description, row) -> Dict:
+        """Build a product dict from a product_knowledge row"""
+        product = dict(zip((col[0] for col in description), row))
+        # Parse JSON metadata if present
+        if product.get('metadata'):
+            product['metadata'] = _json_loads(product['metadata'])
+        return product
+
     def lookup_product(self, product_name: str) -> Optional[Dict]:
         """
         Look up a product in the knowledge base
@@ -1390,44 +2393,59 @@ class AdDatabase:
         Returns:
             Dict with product info or None if not found
         """
-        with self._get_connection() as conn:
-            conn.row_factory = sqlite3.Row
+        return self.lookup_products_batch([product_name]).get(product_name)
+
+    def lookup_products_batch(self, product_names: List[str]) -> Dict[str, Dict]:
+        """
+        Look up many products in the knowledge base on one connection
+        Exact (case-insensitive) matches come from a single IN query; only
+        the misses fall back to the fuzzy "contains" match
+
+        Args:
+            product_names: Product/restaurant names to look up
+
+        Returns:
+            Dict mapping each found name (as passed in) to its product info
+        """
+        names = list(dict.fromkeys(name for name in product_names if name))
+        if not names:
+            return {}
+
+        with self._read() as conn:
             cursor = conn.cursor()
 
             ph = self._param_placeholder()
 
-            # Try exact match first
+            # Exact matches first
             cursor.execute(f'''
                 SELECT * FROM product_knowledge
-                WHERE LOWER(product_name) = LOWER({ph})
-            ''', (product_name,))
+                WHERE LOWER(product_name) IN ({', '.join(['LOWER(' + ph + ')'] * len(names))})
+            ''', names)
 
-            row = cursor.fetchone()
+            by_lower = {}
+            for row in cursor.fetchall():
+                product = self._product_from_row(cursor.description, row)
+                by_lower.setdefault(product['product_name'].lower(), product)
 
-            if row:
-                product = dict(row)
-                # Parse JSON metadata if present
-                if product.get('metadata'):
-                    product['metadata'] = json.loads(product['metadata'])
-                return product
+            found = {name: by_lower[name.lower()] for name in names if name.lower() in by_lower}
 
-            # Try fuzzy match (contains)
-            cursor.execute(f'''
-                SELECT * FROM product_knowledge
-                WHERE LOWER(product_name) LIKE LOWER({ph})
-                ORDER BY LENGTH(product_name) ASC
-                LIMIT 1
-            ''', (f'%{product_name}%',))
+            # Fuzzy match (contains) for the misses
+            for name in names:
+                if name in found:
+                    continue
+                cursor.execute(f'''
+                    SELECT * FROM product_knowledge
+                    WHERE LOWER(product_name) LIKE LOWER({ph})
+                    ORDER BY LENGTH(product_name) ASC
+                    LIMIT 1
+                ''', (f'%{name}%',))
 
-            row = cursor.fetchone()
+                row = cursor.fetchone()
 
-            if row:
-                product = dict(row)
-                if product.get('metadata'):
-                    product['metadata'] = json.loads(product['metadata'])
-                return product
+                if row:
+                    found[name] = self._product_from_row(cursor.description, row)
 
-            return None
+            return found
 
     def save_product_knowledge(self, product_data: Dict):
         """
@@ -1445,23 +2463,50 @@ class AdDatabase:
                 - confidence (optional float)
                 - search_source (optional): 'web_search', 'manual', etc.
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
+        self.save_product_knowledge_batch([product_data])
 
-            # Convert metadata dict to JSON if present
-            metadata_json = None
-            if 'metadata' in product_data and product_data['metadata']:
-                metadata_json = json.dumps(product_data['metadata'])
+        print(f"   💾 Cached product knowledge: {product_data['product_name']} ({product_data['product_type']})")
 
-            ph = self._param_placeholder()
+    def save_product_knowledge_batch(self, products: List[Dict]) -> int:
+        """
+        Save many products to the knowledge base in one transaction
+
+        Args:
+            products: List of product dicts (same keys as save_product_knowledge);
+                      a name repeated in the batch keeps its last entry
+
+        Returns:
+            Number of products written
+        """
+        # One row per product_name (Postgres can't upsert the same key twice in a statement)
+        rows = {
+            product_data['product_name']: (
+                product_data['product_name'],
+                product_data['product_type'],
+                product_data.get('category'),
+                product_data.get('is_restaurant', False),
+                product_data.get('is_unknown_category', False),
+                product_data.get('is_subscription', False),
+                # Convert metadata dict to JSON if present
+                _json_dumps(product_data['metadata']) if product_data.get('metadata') else None,
+                product_data.get('confidence', 0.0),
+                product_data.get('search_source', 'unknown')
+            )
+            for product_data in products
+        }
+        if not rows:
+            return 0
+
+        with self._write() as conn:
+            cursor = conn.cursor()
 
             # Use ON CONFLICT for Postgres, INSERT OR REPLACE for SQLite
             if self.use_postgres:
-                cursor.execute(f'''
+                psycopg2.extras.execute_values(cursor, '''
                     INSERT INTO product_knowledge
                     (product_name, product_type, category, is_restaurant, is_unknown_category,
                      is_subscription, metadata, confidence, search_source, verified_date)
-                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, CURRENT_TIMESTAMP)
+                    VALUES %s
                     ON CONFLICT (product_name) DO UPDATE SET
                         product_type = EXCLUDED.product_type,
                         category = EXCLUDED.category,
@@ -1472,42 +2517,107 @@ class AdDatabase:
                         confidence = EXCLUDED.confidence,
                         search_source = EXCLUDED.search_source,
                         verified_date = CURRENT_TIMESTAMP
-                ''', (
-                    product_data['product_name'],
-                    product_data['product_type'],
-                    product_data.get('category'),
-                    product_data.get('is_restaurant', False),
-                    product_data.get('is_unknown_category', False),
-                    product_data.get('is_subscription', False),
-                    metadata_json,
-                    product_data.get('confidence', 0.0),
-                    product_data.get('search_source', 'unknown')
-                ))
+                ''', list(rows.values()),
+                    template='(%s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)')
             else:
-                cursor.execute(f'''
+                cursor.executemany('''
                     INSERT OR REPLACE INTO product_knowledge
                     (product_name, product_type, category, is_restaurant, is_unknown_category,
                      is_subscription, metadata, confidence, search_source, verified_date)
-                    VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, CURRENT_TIMESTAMP)
-                ''', (
-                    product_data['product_name'],
-                    product_data['product_type'],
-                    product_data.get('category'),
-                    product_data.get('is_restaurant', False),
-                    product_data.get('is_unknown_category', False),
-                    product_data.get('is_subscription', False),
-                    metadata_json,
-                    product_data.get('confidence', 0.0),
-                    product_data.get('search_source', 'unknown')
-                ))
-
-            conn.commit()
-
-            print(f"   💾 Cached product knowledge: {product_data['product_name']} ({product_data['product_type']})")
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ''', list(rows.values()))
+
+        return len(rows)
+
+    def get_ocr_result(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached OCR result
+
+        Args:
+            key: Content hash from DeepSeekOCRClient
+
+        Returns:
+            The OCR service's result dict, or None on a miss
+        """
+        with self._read() as conn:
+            cursor = conn.cursor()
+
+            ph = self._param_placeholder()
+            cursor.execute(f'SELECT result_json FROM ocr_cache WHERE hash = {ph}', (key,))
+            row = cursor.fetchone()
+
+            return _json_loads(row[0]) if row else None
+
+    def save_ocr_result(self, key: str, result: Dict):
+        """
+        Cache an OCR result (replaces any earlier result for the key)
+
+        Args:
+            key: Content hash from DeepSeekOCRClient
+            result: The OCR service's result dict
+        """
+        with self._write() as conn:
+            cursor = conn.cursor()
+
+            ph = self._param_placeholder()
+            cursor.execute(f'''
+                INSERT INTO ocr_cache (hash, result_json)
+                VALUES ({ph}, {ph})
+                ON CONFLICT (hash) DO UPDATE SET
+                    result_json = EXCLUDED.result_json,
+                    created_at = CURRENT_TIMESTAMP
+            ''', (key, _json_dumps(result)))
+
+    def get_vision_results(self, keys: List[str]) -> Dict[str, Dict]:
+        """
+        Look up cached vision analyses
+
+        Args:
+            keys: Content hashes from VisionAnalyzer
+
+        Returns:
+            Dict mapping each cached key to its analysis dict (misses are absent)
+        """
+        if not keys:
+            return {}
+
+        with self._read() as conn:
+            cursor = conn.cursor()
+
+            ph = self._param_placeholder()
+            placeholders = ', '.join([ph] * len(keys))
+            cursor.execute(
+                f'SELECT hash, result_json FROM vision_cache WHERE hash IN ({placeholders})',
+                tuple(keys)
+            )
+
+            return {key: _json_loads(result_json) for key, result_json in cursor.fetchall()}
+
+    def save_vision_results(self, results: Dict[str, Dict]):
+        """
+        Cache vision analyses (replaces any earlier result for a key)
+
+        Args:
+            results: Dict mapping content hash to analysis dict
+        """
+        if not results:
+            return
+
+        with self._write() as conn:
+            cursor = conn.cursor()
+
+            ph = self._param_placeholder()
+            cursor.executemany(f'''
+                INSERT INTO vision_cache (hash, result_json)
+                VALUES ({ph}, {ph})
+                ON CONFLICT (hash) DO UPDATE SET
+                    result_json = EXCLUDED.result_json,
+                    created_at = CURRENT_TIMESTAMP
+            ''', [(key, _json_dumps(result)) for key, result in results.items()])
 
     def get_product_knowledge_stats(self) -> Dict:
         """Get statistics about the product knowledge base"""
-        with self._get_connection() as conn:
+        with self._read() as conn:
             cursor = conn.cursor()
 
             cursor.execute('SELECT COUNT(*) FROM product_knowledge')
@@ -1566,7 +2676,7 @@ def test_database():
     print(f"   Stats: {stats}")
 
     print("\n2. Retrieving ads for competitor...")
-    ads = db.get_ads_by_competitor('AR_TEST_001')
+    ads = list(db.get_ads_by_competitor('AR_TEST_001'))
     print(f"   Found {len(ads)} ads")
     if ads:
         print(f"   First ad: {ads[0].get('ad_text')}")
@@ -4,10 +4,56 @@ DeepSeek-OCR Client
 Wrapper to call the DeepSeek-OCR microservice
 """
 
+import asyncio
+import base64
+import hashlib
+from functools import lru_cache
+import httpx
 import requests
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional, Tuple, Union
+import json
 import time
 
+# Optional: orjson parses the (coordinate-heavy) OCR responses 2-3x faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _parse_json(body: bytes):
+    """Parse a response body (orjson when installed)"""
+    return orjson.loads(body) if orjson else json.loads(body)
+
+
+@lru_cache(maxsize=32)
+def _prompt_digest(prompt: str):
+    """
+    BLAKE2b state with the prompt (and separator) already fed in
+    Prompts come from a handful of templates, so each is encoded and
+    hashed once; cache keys copy() this state and add only the image
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(prompt.encode())
+    digest.update(b'\0')
+    return digest
+
+
+class OCRError(Exception):
+    """
+    A DeepSeek-OCR call failed
+
+    status is the HTTP status code, or None when the service couldn't be
+    reached or timed out - so callers can retry 5xx/None and skip 4xx
+    """
+
+    def __init__(self, status: Optional[int], detail: str):
+        self.status = status
+        self.detail = detail
+        super().__init__(f"DeepSeek-OCR failed (HTTP {status}): {detail}" if status else detail)
+
 
 class DeepSeekOCRClient:
     """
@@ -18,17 +64,50 @@ class DeepSeekOCRClient:
         result = client.extract_text(image_url="https://...")
     """
 
-    def __init__(self, service_url: str = "http://localhost:8001"):
+    def __init__(self, service_url: str = "http://localhost:8001", cache=None):
         """
         Initialize client
 
         Args:
             service_url: URL of DeepSeek-OCR service
+            cache: Optional AdDatabase - results are cached in its ocr_cache
+                   table, keyed by a hash of (prompt, image), and repeats of
+                   the same creative skip the service
         """
         self.service_url = service_url
+        self.cache = cache
         self.ocr_endpoint = f"{service_url}/ocr"
+        self.ocr_multipart_endpoint = f"{service_url}/ocr_multipart"
         self.health_endpoint = f"{service_url}/health"
 
+        # Raw image bytes go as multipart until the service turns out not to
+        # have /ocr_multipart (then they're base64-encoded into /ocr instead)
+        self._multipart_supported = True
+
+        # Keep-alive session: OCR calls reuse pooled sockets instead of
+        # opening a new TCP connection per image
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+        # Async client for extract_many, created on first use in a running loop
+        self._aclient = None
+        self._aclient_loop = None
+
+    def close(self):
+        """Close pooled connections to the service"""
+        self._session.close()
+
+    def __del__(self):
+        session = getattr(self, '_session', None)
+        if session is not None:
+            session.close()
+
     def health_check(self) -> bool:
         """
         Check if DeepSeek-OCR service is running
@@ -37,7 +116,7 @@ class DeepSeekOCRClient:
             True if healthy, False otherwise
         """
         try:
-            response = requests.get(self.health_endpoint, timeout=2)
+            response = self._session.get(self.health_endpoint, timeout=2)
             return response.status_code == 200
         except:
             return False
@@ -46,15 +125,18 @@ class DeepSeekOCRClient:
                      image_url: Optional[str] = None,
                      image_base64: Optional[str] = None,
                      prompt: str = "<image>\n<|grounding|>Extract all text from this advertisement.",
-                     timeout: int = 60) -> Dict:
+                     timeout: int = 60,
+                     image_bytes: Optional[bytes] = None) -> Dict:
         """
         Extract text from image using DeepSeek-OCR
 
         Args:
             image_url: URL to image
-            image_base64: Base64-encoded image (alternative to URL)
+            image_base64: Base64-encoded image (deprecated - pass image_bytes)
             prompt: OCR prompt (task-specific)
             timeout: Request timeout in seconds
+            image_bytes: Raw image bytes, uploaded as multipart/form-data
+                         (no base64 inflation or JSON string encoding)
 
         Returns:
             {
@@ -72,10 +154,60 @@ class DeepSeekOCRClient:
             }
 
         Raises:
-            Exception if service is down or OCR fails
+            OCRError if service is down or OCR fails
         """
+        endpoint, request = self._ocr_request(image_url, image_base64, image_bytes, prompt)
+
+        cache_key = self._cache_key(image_url, image_base64, image_bytes, prompt) if self.cache is not None else None
+        if cache_key:
+            cached = self.cache.get_ocr_result(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            response = self._session.post(endpoint, timeout=timeout, **request)
+
+            if endpoint == self.ocr_multipart_endpoint and response.status_code in (404, 405):
+                # Service predates /ocr_multipart - send base64 JSON from now on
+                self._multipart_supported = False
+                endpoint, request = self._ocr_request(image_url, image_base64, image_bytes, prompt)
+                response = self._session.post(endpoint, timeout=timeout, **request)
+
+            result = self._check_response(response)
+
+        except OCRError:
+            raise
+        except requests.exceptions.Timeout:
+            raise OCRError(None, "DeepSeek-OCR service timeout")
+        except requests.exceptions.ConnectionError:
+            raise OCRError(None, "Cannot connect to DeepSeek-OCR service. Is it running?")
+        except Exception as e:
+            raise OCRError(None, f"DeepSeek-OCR error: {str(e)}")
+
+        if cache_key:
+            self.cache.save_ocr_result(cache_key, result)
+        return result
+
+    @staticmethod
+    def _check_response(response) -> Dict:
+        """
+        Parse a successful OCR response (requests or httpx), or raise OCRError
+        A non-JSON error body (e.g. a proxy's HTML 502) is reported as text
+        """
+        if response.status_code != 200:
+            try:
+                detail = _parse_json(response.content).get('detail', response.text[:200])
+            except Exception:
+                detail = response.text[:200]
+            raise OCRError(response.status_code, detail)
+
+        return _parse_json(response.content)
+
+    @staticmethod
+    def _build_payload(image_url: Optional[str], image_base64: Optional[str], prompt: str) -> Dict:
+        """Build the /ocr request body"""
         if not image_url and not image_base64:
-            raise ValueError("Provide either image_url or image_base64")
+            raise ValueError("Provide image_url, image_bytes or image_base64")
 
         payload = {
             "prompt": prompt,
@@ -89,25 +221,127 @@ class DeepSeekOCRClient:
         else:
             payload["image_base64"] = image_base64
 
-        try:
-            response = requests.post(
-                self.ocr_endpoint,
-                json=payload,
-                timeout=timeout
-            )
+        return payload
 
-            if response.status_code != 200:
-                error_detail = response.json().get('detail', 'Unknown error')
-                raise Exception(f"DeepSeek-OCR failed: {error_detail}")
+    def _ocr_request(self,
+                     image_url: Optional[str],
+                     image_base64: Optional[str],
+                     image_bytes: Optional[bytes],
+                     prompt: str) -> Tuple[str, Dict]:
+        """
+        Endpoint and body for an OCR call (same keyword arguments for requests and httpx)
+        Raw bytes go to /ocr_multipart when the service supports it
+        """
+        if image_bytes is not None and self._multipart_supported:
+            return self.ocr_multipart_endpoint, {
+                'files': {'image': ('ad', image_bytes, 'application/octet-stream')},
+                'data': {'prompt': prompt, 'base_size': '1024', 'image_size': '640', 'crop_mode': 'true'}
+            }
 
-            return response.json()
+        if image_bytes is not None:
+            image_base64 = base64.b64encode(image_bytes).decode('ascii')
+        return self.ocr_endpoint, {'json': self._build_payload(image_url, image_base64, prompt)}
 
-        except requests.exceptions.Timeout:
-            raise Exception("DeepSeek-OCR service timeout")
-        except requests.exceptions.ConnectionError:
-            raise Exception("Cannot connect to DeepSeek-OCR service. Is it running?")
+    @staticmethod
+    def _cache_key(image_url: Optional[str],
+                   image_base64: Optional[str],
+                   image_bytes: Optional[bytes],
+                   prompt: str) -> str:
+        """
+        ocr_cache key: 128-bit BLAKE2b of the prompt and the image bytes
+        (or the URL alone - ad platform image URLs are content-addressed)
+        """
+        if image_bytes is None and image_base64:
+            image_bytes = base64.b64decode(image_base64)
+        image = image_bytes if image_bytes is not None else image_url.encode()
+
+        digest = _prompt_digest(prompt).copy()
+        digest.update(image)
+        return digest.hexdigest()
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """
+        Pooled AsyncClient for the running event loop
+        (an AsyncClient can't be reused once the loop it ran on is closed)
+        """
+        loop = asyncio.get_running_loop()
+        if self._aclient is None or self._aclient_loop is not loop:
+            self._aclient = httpx.AsyncClient(
+                base_url=self.service_url,
+                limits=httpx.Limits(max_connections=32)
+            )
+            self._aclient_loop = loop
+        return self._aclient
+
+    async def aclose(self):
+        """Close the async client's pooled connections"""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
+            self._aclient_loop = None
+
+    async def extract_text_async(self,
+                                 image_url: Optional[str] = None,
+                                 image_base64: Optional[str] = None,
+                                 prompt: str = "<image>\n<|grounding|>Extract all text from this advertisement.",
+                                 timeout: int = 60,
+                                 image_bytes: Optional[bytes] = None) -> Dict:
+        """
+        Async version of extract_text - same arguments, result and errors
+        """
+        endpoint, request = self._ocr_request(image_url, image_base64, image_bytes, prompt)
+
+        cache_key = self._cache_key(image_url, image_base64, image_bytes, prompt) if self.cache is not None else None
+        if cache_key:
+            cached = self.cache.get_ocr_result(cache_key)
+            if cached is not None:
+                return cached
+
+        try:
+            client = self._async_client()
+            response = await client.post(endpoint, timeout=timeout, **request)
+
+            if endpoint == self.ocr_multipart_endpoint and response.status_code in (404, 405):
+                # Service predates /ocr_multipart - send base64 JSON from now on
+                self._multipart_supported = False
+                endpoint, request = self._ocr_request(image_url, image_base64, image_bytes, prompt)
+                response = await client.post(endpoint, timeout=timeout, **request)
+
+            result = self._check_response(response)
+
+        except OCRError:
+            raise
+        except httpx.TimeoutException:
+            raise OCRError(None, "DeepSeek-OCR service timeout")
+        except httpx.ConnectError:
+            raise OCRError(None, "Cannot connect to DeepSeek-OCR service. Is it running?")
         except Exception as e:
-            raise Exception(f"DeepSeek-OCR error: {str(e)}")
+            raise OCRError(None, f"DeepSeek-OCR error: {str(e)}")
+
+        if cache_key:
+            self.cache.save_ocr_result(cache_key, result)
+        return result
+
+    async def extract_many(self, images: List[Dict], concurrency: int = 8) -> List[Union[Dict, Exception]]:
+        """
+        Run OCR on many images with up to `concurrency` requests in flight
+
+        Args:
+            images: One dict of extract_text_async keyword arguments per image
+                    (image_url or image_bytes, optionally prompt / timeout)
+            concurrency: Maximum simultaneous requests to the service
+
+        Returns:
+            Results in the same order as images; a failed image gets the
+            OCRError (or ValueError for a missing image) instead of a result dict
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def extract_one(kwargs: Dict) -> Dict:
+            async with semaphore:
+                return await self.extract_text_async(**kwargs)
+
+        return await asyncio.gather(*(extract_one(kwargs) for kwargs in images), return_exceptions=True)
 
 
 # Task-specific prompt templates
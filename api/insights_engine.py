@@ -3,24 +3,169 @@
 AI-Powered Insights Engine with Vision Analysis
 Analyzes competitor ad images using Llava and generates intelligent insights
 """
+import os
 import json
 import csv
 import base64
+import hashlib
+import random
+import threading
+import asyncio
+import httpx
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from collections import Counter
+from collections import Counter, OrderedDict
 import io
 from PIL import Image
 
+# Optional: h2 lets image downloads multiplex over one HTTP/2 connection per CDN host
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Optional: orjson parses/serializes the Ollama bodies (base64 images, LLM output) faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Per-competitor roll-ups from earlier insight runs (see InsightsEngine._analysis_cache_path)
+ANALYSIS_CACHE_DIR = Path(__file__).parent.parent / "data" / "cache" / "analysis"
+
+# Serializes vision fan-outs across threads (e.g. concurrent API requests)
+_VISION_LOCK = threading.Lock()
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_CLOSERS = {'{': '}', '[': ']'}
+
+
+def _load_json(body):
+    """Parse a JSON body (orjson when installed)"""
+    return orjson.loads(body) if orjson else json.loads(body)
+
+
+def _dump_json(payload) -> bytes:
+    """Serialize a request body (orjson when installed)"""
+    return orjson.dumps(payload) if orjson else json.dumps(payload).encode('utf-8')
+
+
+def _extract_json(text: str, opener: str):
+    """
+    First complete JSON value starting with `opener` ('{' or '[') in an LLM response
+
+    raw_decode stops at the end of that value, so markdown fences and any chatter
+    after it (including stray brackets) are ignored. Returns None if nothing parses.
+    """
+    start = text.find(opener)
+    if start == -1:
+        return None
+
+    # Fast path: the usual response is one JSON value, possibly fenced
+    if orjson:
+        try:
+            return orjson.loads(text[start:text.rfind(_JSON_CLOSERS[opener]) + 1])
+        except orjson.JSONDecodeError:
+            pass
+
+    while start != -1:
+        try:
+            return _JSON_DECODER.raw_decode(text, start)[0]
+        except ValueError:
+            start = text.find(opener, start + 1)
+    return None
+
+
+VISION_PROMPT = """Analyze this advertisement image and extract key information.
+
+Return ONLY a JSON object with this exact structure:
+{
+  "category": "food|promo|brand|product|service",
+  "has_text": true/false,
+  "text_content": "any text visible in the image",
+  "primary_theme": "brief description of main visual theme",
+  "visual_elements": "what's shown (people, food, products, etc.)",
+  "colors": "dominant colors",
+  "emotion": "energetic|calm|urgent|friendly|professional"
+}
+
+Focus on marketing strategy - is this about food appeal, discounts/promos, brand building, or product features?"""
+
+
+# Static skeleton of the weekly insights prompt; only the figures and the
+# per-competitor summary are filled in per call
+INSIGHTS_PROMPT = """You are a competitive intelligence analyst specializing in advertising strategy.
+
+**Market Overview:**
+- Total Competitors: {total_competitors}
+- Total Ads Tracked: {total_ads}
+
+**Competitor Analysis (with Vision AI):**
+{competitors_summary}
+
+**Task:**
+Generate exactly 3 HIGH-VALUE competitive insights in JSON format. Focus on:
+
+1. **Strategic Differences**: How competitors differ in visual approach, messaging, and ad themes
+2. **Market Opportunities**: Gaps or weaknesses you can exploit
+3. **Competitive Threats**: Aggressive moves or new campaigns to watch
+
+Each insight must be:
+- Specific and data-driven (use percentages, ratios, comparisons)
+- Actionable (what should the user do?)
+- Based on the vision analysis data
+
+Return ONLY a JSON array:
+[
+  {{
+    "title": "Attention-grabbing headline (max 10 words)",
+    "description": "Detailed insight with specific visual/strategic differences (2-3 sentences)",
+    "metric": "Key stat (e.g., '70%', '3x', '45 ads')",
+    "type": "warning|info|success",
+    "insight_type": "visual_strategy|messaging|market_leader|opportunity|threat"
+  }}
+]
+
+Examples of great insights:
+- "Talabat uses food imagery in 80% of ads vs your 40% - stronger appetite appeal"
+- "Rafiq just launched 15 'free delivery' promo ads - aggressive price war starting"
+- "Only you are using 'friendly' tone - competitors are 70% urgent/promotional"
+
+Return ONLY valid JSON, no markdown or extra text."""
+
 
 class VisionAnalyzer:
     """Analyze ad images using Llava vision model"""
 
-    def __init__(self, ollama_url: str = "http://localhost:11434"):
+    def __init__(self, ollama_url: str = "http://localhost:11434", cache=None, memory_size: int = 4096):
+        """
+        Args:
+            ollama_url: Ollama server URL
+            cache: Optional AdDatabase - analyses are persisted in its vision_cache
+            memory_size: Analyses kept in the in-process LRU in front of `cache`
+        """
         self.ollama_url = ollama_url
         self.vision_model = "llava:latest"
+        # Keep Llava loaded between batches so later calls skip the model load
+        self.keep_alive = "10m"
+        # Longest side sent to Llava; larger images are downscaled first
+        self.max_image_side = 1024
+        # Images downloaded ahead of the Llava slots during a batch
+        self.prefetch_depth = 4
+        # Per-attempt cap on a Llava call, and retries after the first attempt
+        self.infer_timeout = 15
+        self.infer_retries = 2
+        self.cache = cache
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
 
     def analyze_ad_image(self, image_url: str) -> Dict[str, Any]:
         """
@@ -36,71 +181,208 @@ class VisionAnalyzer:
                 'emotion': str
             }
         """
-        try:
-            # Download image
-            img_response = requests.get(image_url, timeout=10)
-            if img_response.status_code != 200:
-                return self._default_analysis()
-
-            # Convert to base64
-            img_base64 = base64.b64encode(img_response.content).decode('utf-8')
-
-            # Analyze with Llava
-            prompt = """Analyze this advertisement image and extract key information.
-
-Return ONLY a JSON object with this exact structure:
-{
-  "category": "food|promo|brand|product|service",
-  "has_text": true/false,
-  "text_content": "any text visible in the image",
-  "primary_theme": "brief description of main visual theme",
-  "visual_elements": "what's shown (people, food, products, etc.)",
-  "colors": "dominant colors",
-  "emotion": "energetic|calm|urgent|friendly|professional"
-}
+        return self.analyze_images([image_url], concurrency=1)[0]
 
-Focus on marketing strategy - is this about food appeal, discounts/promos, brand building, or product features?"""
+    def analyze_images(self, image_urls: List[str], concurrency: int = 5) -> List[Dict[str, Any]]:
+        """
+        Analyze several ad images concurrently (results in input order)
 
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.vision_model,
-                    "prompt": prompt,
-                    "images": [img_base64],
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,
-                        "num_predict": 300
-                    }
-                },
-                timeout=45
-            )
+        At most `concurrency` Llava calls run at once; image downloads run
+        ahead of them (prefetch_depth extra) so Llava never waits on the network.
+        Must be called outside a running event loop.
+        """
+        # The same creative often appears in several ads: analyze each URL once
+        keys = {url: self._cache_key(url) for url in image_urls}
+        by_url = self._cached_results(keys)
+
+        misses = [url for url in keys if url not in by_url]
+        if misses:
+            # One fan-out at a time per process: concurrent insight requests queue
+            # here instead of stacking their calls onto Ollama's parallel slots
+            with _VISION_LOCK:
+                # Whoever held the lock may have just analyzed some of these
+                by_url.update(self._cached_results({url: keys[url] for url in misses}))
+                misses = [url for url in misses if url not in by_url]
+                if misses:
+                    by_url.update(self._analyze_misses(misses, keys, concurrency))
+
+        return [by_url[url] for url in image_urls]
+
+    def _analyze_misses(self, misses: List[str], keys: Dict[str, str], concurrency: int) -> Dict[str, Dict[str, Any]]:
+        """Run the vision fan-out for uncached URLs and cache the successful analyses"""
+        results = asyncio.run(self._analyze_batch(misses, concurrency))
+
+        # Failed analyses come back as the default - leave those uncached
+        default = self._default_analysis()
+        fresh = {keys[url]: result for url, result in zip(misses, results) if result != default}
+        self._remember(fresh)
+        if self.cache is not None and fresh:
+            try:
+                self.cache.save_vision_results(fresh)
+            except Exception as e:
+                print(f"Vision cache write failed: {e}")
+
+        return dict(zip(misses, results))
+
+    def _cache_key(self, image_url: str) -> str:
+        """vision_cache key: 128-bit BLAKE2b of the model, prompt and image URL"""
+        h = hashlib.blake2b(digest_size=16)
+        for part in (self.vision_model, VISION_PROMPT, image_url):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def _cached_results(self, keys: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        """Cached analyses by URL: in-process LRU first, then the database"""
+        found = {}
+        for url, key in keys.items():
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[url] = self._memory[key]
+
+        remaining = {key: url for url, key in keys.items() if url not in found}
+        if self.cache is not None and remaining:
+            try:
+                stored = self.cache.get_vision_results(list(remaining))
+            except Exception as e:
+                print(f"Vision cache read failed: {e}")
+                stored = {}
+            self._remember(stored)
+            for key, result in stored.items():
+                found[remaining[key]] = result
+
+        return found
+
+    def _remember(self, results: Dict[str, Dict[str, Any]]):
+        """Add analyses to the in-process LRU, evicting the oldest past memory_size"""
+        for key, result in results.items():
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    async def _analyze_batch(self, image_urls: List[str], concurrency: int) -> List[Dict[str, Any]]:
+        sem = asyncio.Semaphore(concurrency)
+        # Up to prefetch_depth images are downloaded ahead of the busy Llava
+        # slots, so the next image is ready as soon as a slot frees up
+        fetch_sem = asyncio.Semaphore(self.prefetch_depth)
+        pool = max(10, concurrency + self.prefetch_depth)
+        limits = httpx.Limits(max_connections=pool, max_keepalive_connections=pool)
+        # Ollama itself speaks HTTP/1.1 (kept alive); httpx negotiates per origin
+        async with httpx.AsyncClient(limits=limits, http2=HTTP2_AVAILABLE) as client:
+            return await asyncio.gather(*(
+                self.analyze_ad_image_async(client, sem, url, fetch_sem) for url in image_urls
+            ))
+
+    async def analyze_ad_image_async(
+        self,
+        client: httpx.AsyncClient,
+        sem: asyncio.Semaphore,
+        image_url: str,
+        fetch_sem: Optional[asyncio.Semaphore] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of analyze_ad_image sharing one client and concurrency limit
 
-            if response.status_code == 200:
-                result = response.json()['response']
-                return self._parse_vision_result(result)
-            else:
-                return self._default_analysis()
+        `sem` bounds Llava calls only. The download happens under `fetch_sem`
+        (if given), held until a Llava slot is free, so at most that many
+        images are downloaded ahead while others are being analyzed.
+        """
+        try:
+            async with fetch_sem or nullcontext():
+                image_bytes = await self._fetch_bytes(client, image_url)
+                if image_bytes is None:
+                    return self._default_analysis()
+                # Decode/resize off the event loop so other downloads keep flowing
+                image_bytes = await asyncio.to_thread(self._prepare_image, image_bytes)
+                img_base64 = base64.b64encode(image_bytes).decode('utf-8')
+                await sem.acquire()
+
+            try:
+                return await self._infer(client, img_base64)
+            finally:
+                sem.release()
 
         except Exception as e:
             print(f"Error analyzing image {image_url}: {e}")
             return self._default_analysis()
 
-    def _parse_vision_result(self, result: str) -> Dict[str, Any]:
-        """Parse Llava's response"""
+    async def _fetch_bytes(self, client: httpx.AsyncClient, image_url: str) -> Optional[bytes]:
+        """Download an ad image (None on a non-200 response)"""
+        img_response = await client.get(image_url, timeout=10)
+        if img_response.status_code != 200:
+            return None
+        return img_response.content
+
+    def _prepare_image(self, image_bytes: bytes) -> bytes:
+        """
+        Shrink large images to max_image_side (Lanczos, JPEG q85) before upload
+
+        Llava's vision encoder downsamples far below this anyway, so the full-size
+        original only costs upload bandwidth and Ollama preprocessing.
+        Small or undecodable images are passed through unchanged.
+        """
         try:
-            # Find JSON in response
-            start_idx = result.find('{')
-            end_idx = result.rfind('}') + 1
+            im = Image.open(io.BytesIO(image_bytes))
+            if max(im.size) <= self.max_image_side:
+                return image_bytes
+
+            im = im.convert("RGB")
+            im.thumbnail((self.max_image_side, self.max_image_side), Image.LANCZOS)
+            buf = io.BytesIO()
+            im.save(buf, "JPEG", quality=85, optimize=True)
+            return buf.getvalue()
+        except Exception:
+            return image_bytes
+
+    async def _infer(self, client: httpx.AsyncClient, img_base64: str) -> Dict[str, Any]:
+        """
+        Run Llava on a base64 image and parse its analysis
 
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = result[start_idx:end_idx]
-                return json.loads(json_str)
-            else:
-                return self._default_analysis()
-        except:
+        Each attempt is capped at infer_timeout seconds and retried (jittered
+        exponential backoff) on timeouts and connection errors, so one stuck
+        call can't hold up the rest of the batch.
+        """
+        body = _dump_json({
+            "model": self.vision_model,
+            "prompt": VISION_PROMPT,
+            "images": [img_base64],
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": 0.3,
+                "num_predict": 300
+            }
+        })
+
+        for attempt in range(self.infer_retries + 1):
+            try:
+                response = await asyncio.wait_for(
+                    client.post(
+                        f"{self.ollama_url}/api/generate",
+                        content=body,
+                        headers=JSON_HEADERS,
+                        timeout=self.infer_timeout
+                    ),
+                    timeout=self.infer_timeout
+                )
+                break
+            except (asyncio.TimeoutError, httpx.TransportError):
+                if attempt == self.infer_retries:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt + random.random() * 0.1)
+
+        if response.status_code == 200:
+            result = _load_json(response.content)['response']
+            return self._parse_vision_result(result)
+        else:
             return self._default_analysis()
 
+    def _parse_vision_result(self, result: str) -> Dict[str, Any]:
+        """Parse Llava's response"""
+        parsed = _extract_json(result, '{')
+        return parsed if isinstance(parsed, dict) else self._default_analysis()
+
     def _default_analysis(self) -> Dict[str, Any]:
         """Default analysis when vision fails"""
         return {
@@ -117,10 +399,17 @@ Focus on marketing strategy - is this about food appeal, discounts/promos, brand
 class InsightsEngine:
     """Generate AI-powered competitive intelligence insights with vision analysis"""
 
-    def __init__(self, ollama_url: str = "http://localhost:11434"):
+    def __init__(self, ollama_url: str = "http://localhost:11434", db=None):
+        """
+        Args:
+            ollama_url: Ollama server URL
+            db: Optional AdDatabase (the caller's) - vision analyses are persisted in its vision_cache
+        """
         self.ollama_url = ollama_url
         self.text_model = "llama3.1:8b"
-        self.vision_analyzer = VisionAnalyzer(ollama_url)
+        self.vision_analyzer = VisionAnalyzer(ollama_url, cache=db)
+        # Concurrent Llava requests; match the Ollama server's OLLAMA_NUM_PARALLEL
+        self.vision_concurrency = int(os.getenv("OLLAMA_NUM_PARALLEL", 8))
 
     def analyze_competitor_data(
         self,
@@ -166,92 +455,95 @@ class InsightsEngine:
             "competitors": []
         }
 
-        for competitor in competitors_data:
-            print(f"  📊 Analyzing {competitor.get('name', 'Unknown')}...")
-
-            csv_file = Path(competitor.get('csv_file', ''))
-
-            competitor_analysis = {
-                "name": competitor.get('name', 'Unknown'),
-                "advertiser_id": competitor.get('advertiser_id', ''),
-                "total_ads": competitor.get('total_ads', 0),
-                "last_scraped": str(competitor.get('last_scraped', '')),
-            }
-
-            # Read and analyze ads
-            if csv_file.exists():
-                try:
-                    with open(csv_file, 'r') as f:
-                        reader = csv.DictReader(f)
-                        ads = list(reader)
-
-                        # Filter ads with images
-                        ads_with_images = [ad for ad in ads if ad.get('image_url')]
-
-                        # Analyze timing patterns
-                        recent_ads = 0
-                        now = datetime.now().timestamp()
-                        week_ago = (datetime.now() - timedelta(days=7)).timestamp()
-
-                        for ad in ads:
-                            last_shown = ad.get('last_shown', '')
-                            if last_shown:
-                                try:
-                                    if int(last_shown) > week_ago:
-                                        recent_ads += 1
-                                except:
-                                    pass
-
-                        # Vision analysis on sample
-                        vision_results = []
-                        sample_ads = ads_with_images[:sample_size]
-
-                        print(f"    🖼️  Analyzing {len(sample_ads)} ad images with Llava...")
-
-                        for idx, ad in enumerate(sample_ads):
-                            img_url = ad.get('image_url', '')
-                            if img_url:
-                                print(f"      [{idx+1}/{len(sample_ads)}] Analyzing creative...")
-                                vision_analysis = self.vision_analyzer.analyze_ad_image(img_url)
-                                vision_results.append(vision_analysis)
-
-                        # Aggregate vision insights (safely handle missing keys)
-                        categories = Counter(r.get('category', 'unknown') for r in vision_results)
-                        themes = Counter(r.get('primary_theme', 'generic') for r in vision_results)
-                        emotions = Counter(r.get('emotion', 'neutral') for r in vision_results)
-                        has_text_count = sum(1 for r in vision_results if r.get('has_text', False))
-
-                        # Extract common text patterns
-                        text_samples = [r.get('text_content', '') for r in vision_results if r.get('text_content')]
-
-                        competitor_analysis["ad_details"] = {
-                            "total": len(ads),
-                            "with_images": len(ads_with_images),
-                            "recent_ads_7d": recent_ads,
-                            "analyzed_sample": len(vision_results)
-                        }
-
-                        competitor_analysis["visual_strategy"] = {
-                            "top_category": categories.most_common(1)[0][0] if categories else 'unknown',
-                            "category_breakdown": dict(categories),
-                            "top_theme": themes.most_common(1)[0][0] if themes else 'generic',
-                            "top_emotion": emotions.most_common(1)[0][0] if emotions else 'neutral',
-                            "text_heavy": (has_text_count / len(vision_results) * 100) if vision_results else 0,
-                            "sample_text": text_samples[:3]  # Top 3 text samples
-                        }
-
-                except Exception as e:
-                    print(f"    ❌ Error analyzing {competitor.get('name')}: {e}")
-                    import traceback
-                    traceback.print_exc()
+        # Pass 1: read each competitor's CSV and pick its image sample
+        # (reads overlap in a thread pool; results are consumed in competitor order)
+        csv_files = [Path(c.get('csv_file', '')) for c in competitors_data]
+        week_ago = (datetime.now() - timedelta(days=7)).timestamp()
+        # Roll-ups already computed for this exact CSV version and sample size
+        cache_paths = [self._analysis_cache_path(f, sample_size) if f.exists() else None for f in csv_files]
+        cached = [self._load_cached_analysis(path) if path else None for path in cache_paths]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            csv_stats = [
+                executor.submit(self._load_csv_stats, csv_file, sample_size, week_ago)
+                if csv_file.exists() and hit is None else None
+                for csv_file, hit in zip(csv_files, cached)
+            ]
+
+            samples = []  # (competitor_analysis, sample image URLs, roll-up cache path)
+            for competitor, stats, hit, cache_path in zip(competitors_data, csv_stats, cached, cache_paths):
+                print(f"  📊 Analyzing {competitor.get('name', 'Unknown')}...")
+
+                competitor_analysis = {
+                    "name": competitor.get('name', 'Unknown'),
+                    "advertiser_id": competitor.get('advertiser_id', ''),
+                    "total_ads": competitor.get('total_ads', 0),
+                    "last_scraped": str(competitor.get('last_scraped', '')),
+                }
+
+                # Read and analyze ads
+                if hit is not None:
+                    competitor_analysis.update(hit)
+                elif stats is not None:
+                    try:
+                        ad_details, sample_urls = stats.result()
+
+                        # Vision analysis on sample (run for all competitors at once below)
+                        samples.append((competitor_analysis, sample_urls, cache_path))
+                        competitor_analysis["ad_details"] = ad_details
+
+                    except Exception as e:
+                        print(f"    ❌ Error analyzing {competitor.get('name')}: {e}")
+                        import traceback
+                        traceback.print_exc()
+                        competitor_analysis["ad_details"] = {"total": competitor.get('total_ads', 0)}
+                        competitor_analysis["visual_strategy"] = {}
+                else:
+                    # CSV file doesn't exist
                     competitor_analysis["ad_details"] = {"total": competitor.get('total_ads', 0)}
                     competitor_analysis["visual_strategy"] = {}
-            else:
-                # CSV file doesn't exist
-                competitor_analysis["ad_details"] = {"total": competitor.get('total_ads', 0)}
-                competitor_analysis["visual_strategy"] = {}
 
-            analysis["competitors"].append(competitor_analysis)
+                analysis["competitors"].append(competitor_analysis)
+
+        # Pass 2: one fan-out over every competitor's sample, so Llava stays busy
+        # across competitors instead of draining one competitor at a time
+        image_urls = [url for _, urls, _ in samples for url in urls]
+        print(f"    🖼️  Analyzing {len(image_urls)} ad images with Llava...")
+        all_results = self.vision_analyzer.analyze_images(image_urls, concurrency=self.vision_concurrency)
+
+        # Pass 3: scatter results back and aggregate per competitor
+        default = self.vision_analyzer._default_analysis()
+        offset = 0
+        for competitor_analysis, urls, cache_path in samples:
+            vision_results = all_results[offset:offset + len(urls)]
+            offset += len(urls)
+
+            # Aggregate vision insights in one pass (safely handle missing keys)
+            categories, themes, emotions = Counter(), Counter(), Counter()
+            has_text_count = 0
+            text_samples = []  # Extract common text patterns
+            for r in vision_results:
+                categories[r.get('category', 'unknown')] += 1
+                themes[r.get('primary_theme', 'generic')] += 1
+                emotions[r.get('emotion', 'neutral')] += 1
+                if r.get('has_text', False):
+                    has_text_count += 1
+                text_content = r.get('text_content')
+                if text_content and len(text_samples) < 3:
+                    text_samples.append(text_content)
+
+            competitor_analysis["visual_strategy"] = {
+                "top_category": categories.most_common(1)[0][0] if categories else 'unknown',
+                "category_breakdown": dict(categories),
+                "top_theme": themes.most_common(1)[0][0] if themes else 'generic',
+                "top_emotion": emotions.most_common(1)[0][0] if emotions else 'neutral',
+                "text_heavy": (has_text_count / len(vision_results) * 100) if vision_results else 0,
+                "sample_text": text_samples  # Top 3 text samples
+            }
+
+            # Only cache roll-ups where every image was analyzed, so failures get retried
+            if default not in vision_results:
+                self._save_cached_analysis(cache_path, competitor_analysis)
 
         # Sort by total ads
         analysis["competitors"] = sorted(
@@ -262,6 +554,93 @@ class InsightsEngine:
 
         return analysis
 
+    def _analysis_cache_path(self, csv_file: Path, sample_size: int) -> Path:
+        """
+        Sidecar path for a competitor roll-up
+
+        Keyed by the CSV's identity and version (path, mtime, size), the sample
+        size, the vision model/prompt and today's date (recent_ads_7d moves daily).
+        """
+        stat = csv_file.stat()
+        h = hashlib.blake2b(digest_size=16)
+        for part in (str(csv_file.resolve()), str(stat.st_mtime_ns), str(stat.st_size), str(sample_size),
+                     self.vision_analyzer.vision_model, VISION_PROMPT, datetime.now().date().isoformat()):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return ANALYSIS_CACHE_DIR / f"{h.hexdigest()}.json"
+
+    @staticmethod
+    def _load_cached_analysis(cache_path: Path) -> Optional[Dict[str, Any]]:
+        """Cached ad_details/visual_strategy for a competitor, or None on a miss"""
+        try:
+            return _load_json(cache_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _save_cached_analysis(cache_path: Path, competitor_analysis: Dict[str, Any]):
+        """Write a competitor's CSV-derived roll-up to its sidecar (atomically)"""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix('.tmp')
+            tmp_path.write_bytes(_dump_json({
+                "ad_details": competitor_analysis["ad_details"],
+                "visual_strategy": competitor_analysis["visual_strategy"],
+            }))
+            tmp_path.replace(cache_path)
+        except OSError as e:
+            print(f"Analysis cache write failed: {e}")
+
+    @staticmethod
+    def _load_csv_stats(csv_file: Path, sample_size: int, week_ago: float):
+        """
+        One streaming pass over a competitor CSV: counts, 7-day recency and the image sample
+
+        Args:
+            csv_file: Competitor's ads CSV
+            sample_size: Image URLs to keep for vision analysis
+            week_ago: UNIX timestamp; ads last shown after it count as recent
+
+        Returns:
+            (ad_details dict, first `sample_size` image URLs)
+        """
+        total = 0
+        with_images = 0
+        recent_ads = 0
+        sample_urls = []
+        # last_shown is almost always a 10-digit UNIX timestamp: equal-length digit
+        # strings compare like the numbers, so most rows skip int() entirely
+        week_ago_s = str(int(week_ago))
+
+        with open(csv_file, 'r') as f:
+            for ad in csv.DictReader(f):
+                total += 1
+
+                image_url = ad.get('image_url')
+                if image_url:
+                    with_images += 1
+                    if len(sample_urls) < sample_size:
+                        sample_urls.append(image_url)
+
+                last_shown = ad.get('last_shown') or ''
+                if len(last_shown) == len(week_ago_s) and last_shown.isascii() and last_shown.isdigit():
+                    if last_shown > week_ago_s:
+                        recent_ads += 1
+                elif last_shown:
+                    try:
+                        if int(last_shown) > week_ago:
+                            recent_ads += 1
+                    except ValueError:
+                        pass
+
+        ad_details = {
+            "total": total,
+            "with_images": with_images,
+            "recent_ads_7d": recent_ads,
+            "analyzed_sample": len(sample_urls)
+        }
+        return ad_details, sample_urls
+
     def _generate_ai_insights(self, analysis_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Use LLM to generate intelligent insights from vision analysis"""
 
@@ -283,7 +662,7 @@ class InsightsEngine:
             )
 
             if response.status_code == 200:
-                ai_response = response.json()['response']
+                ai_response = _load_json(response.content)['response']
                 insights = self._parse_ai_response(ai_response, analysis_data)
                 return insights
             else:
@@ -314,57 +693,19 @@ class InsightsEngine:
 
             competitors_summary.append(summary)
 
-        prompt = f"""You are a competitive intelligence analyst specializing in advertising strategy.
-
-**Market Overview:**
-- Total Competitors: {analysis_data['total_competitors']}
-- Total Ads Tracked: {analysis_data['total_ads']}
-
-**Competitor Analysis (with Vision AI):**
-{chr(10).join(competitors_summary)}
-
-**Task:**
-Generate exactly 3 HIGH-VALUE competitive insights in JSON format. Focus on:
-
-1. **Strategic Differences**: How competitors differ in visual approach, messaging, and ad themes
-2. **Market Opportunities**: Gaps or weaknesses you can exploit
-3. **Competitive Threats**: Aggressive moves or new campaigns to watch
-
-Each insight must be:
-- Specific and data-driven (use percentages, ratios, comparisons)
-- Actionable (what should the user do?)
-- Based on the vision analysis data
-
-Return ONLY a JSON array:
-[
-  {{
-    "title": "Attention-grabbing headline (max 10 words)",
-    "description": "Detailed insight with specific visual/strategic differences (2-3 sentences)",
-    "metric": "Key stat (e.g., '70%', '3x', '45 ads')",
-    "type": "warning|info|success",
-    "insight_type": "visual_strategy|messaging|market_leader|opportunity|threat"
-  }}
-]
-
-Examples of great insights:
-- "Talabat uses food imagery in 80% of ads vs your 40% - stronger appetite appeal"
-- "Rafiq just launched 15 'free delivery' promo ads - aggressive price war starting"
-- "Only you are using 'friendly' tone - competitors are 70% urgent/promotional"
-
-Return ONLY valid JSON, no markdown or extra text."""
-
-        return prompt
+        return INSIGHTS_PROMPT.format(
+            total_competitors=analysis_data['total_competitors'],
+            total_ads=analysis_data['total_ads'],
+            competitors_summary="\n".join(competitors_summary)
+        )
 
     def _parse_ai_response(self, ai_response: str, analysis_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Parse AI response and format as insights"""
 
         try:
-            start_idx = ai_response.find('[')
-            end_idx = ai_response.rfind(']') + 1
+            ai_insights = _extract_json(ai_response, '[')
 
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = ai_response[start_idx:end_idx]
-                ai_insights = json.loads(json_str)
+            if isinstance(ai_insights, list):
 
                 formatted_insights = []
                 for insight in ai_insights[:3]:
@@ -458,9 +799,12 @@ Return ONLY valid JSON, no markdown or extra text."""
 # Singleton instance
 _insights_engine = None
 
-def get_insights_engine() -> InsightsEngine:
-    """Get or create the global insights engine"""
+def get_insights_engine(db=None) -> InsightsEngine:
+    """Get or create the global insights engine, caching vision analyses in db"""
     global _insights_engine
     if _insights_engine is None:
-        _insights_engine = InsightsEngine()
+        _insights_engine = InsightsEngine(db=db)
+    else:
+        # The API replaces its AdDatabase when a database is uploaded - follow it
+        _insights_engine.vision_analyzer.cache = db
     return _insights_engine
@@ -2,9 +2,11 @@
 """
 AdIntel API - FastAPI backend for ad intelligence platform
 """
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, UploadFile, File, Body
+from fastapi import FastAPI, HTTPException, Request, UploadFile, File, Body
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse, JSONResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, HttpUrl
 from typing import Optional, List, Dict, Any
 from datetime import datetime
@@ -12,9 +14,28 @@ import shutil
 from pathlib import Path
 import uuid
 import json
+import csv
+import re
 import sys
 import os
+import traceback
 import httpx
+import numpy as np
+import pandas as pd
+import asyncio
+import functools
+import hashlib
+import time
+from itertools import chain
+from urllib.parse import quote, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict
+
+# Optional: orjson serializes streamed rows and JSON responses faster than json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Add project root to path
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -24,7 +45,7 @@ from scrapers.api_scraper import GATCAPIScraper, parse_advertiser_url
 
 # Import database for strategic insights
 try:
-    from api.database import AdDatabase
+    from api.database import AdDatabase, EDITABLE_ENRICHMENT_FIELDS
     DB_AVAILABLE = True
     db = AdDatabase()
 except ImportError:
@@ -36,7 +57,8 @@ except ImportError:
 app = FastAPI(
     title="AdIntel API",
     description="API for competitive ad intelligence analysis",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse if orjson else JSONResponse
 )
 
 # CORS middleware (allow frontend to call API)
@@ -48,8 +70,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory job storage (will move to database later)
-jobs_db = {}
+# In-memory job storage (will move to database later), bounded so finished
+# jobs' results don't accumulate for the life of the process
+MAX_JOBS = 1024
+jobs_db = OrderedDict()
 
 # ============================================================================
 # Request/Response Models
@@ -100,6 +124,21 @@ class CompetitorSummary(BaseModel):
 # Helper Functions
 # ============================================================================
 
+# csv_summary() results: path -> ((st_mtime_ns, st_size), (total_ads, region))
+csv_summaries = {}
+
+# Creative dimensions in scraped html_content (weekly insights format breakdown)
+HEIGHT_ATTR_RE = re.compile(r'height="(\d+)"')
+WIDTH_ATTR_RE = re.compile(r'width="(\d+)"')
+AD_FORMAT_SIZES = {
+    "300x250": "Medium Rectangle (300x250)",
+    "728x90": "Leaderboard (728x90)",
+    "320x50": "Mobile Banner (320x50)",
+    "160x600": "Wide Skyscraper (160x600)",
+    "300x600": "Half Page (300x600)",
+    "970x250": "Billboard (970x250)",
+}
+
 # Known advertiser ID to name mapping
 KNOWN_ADVERTISERS = {
     "AR14306592000630063105": "Talabat",
@@ -108,10 +147,245 @@ KNOWN_ADVERTISERS = {
     "AR13676304484790173697": "Keeta",
 }
 
+# Handlers always print a one-line error; full tracebacks only with LOG_TRACEBACKS=1,
+# so a client hammering a failing endpoint doesn't serialize requests on stderr
+LOG_TRACEBACKS = os.getenv("LOG_TRACEBACKS", "0").lower() in ("1", "true", "yes")
+
+def print_traceback():
+    """Print the current exception's traceback when LOG_TRACEBACKS is enabled"""
+    if LOG_TRACEBACKS:
+        traceback.print_exc()
+
 def get_advertiser_name(advertiser_id: str) -> str:
     """Get friendly name for advertiser, fallback to ID if unknown"""
     return KNOWN_ADVERTISERS.get(advertiser_id, advertiser_id)
 
+def csv_summary(csv_file: Path):
+    """
+    (ad count, first ad's region) for a scraped CSV, cached per file version
+
+    csv.reader counts rows without building a dict per ad; quoted multi-line
+    fields rule out a plain newline count. Unchanged files (same mtime and
+    size) are answered from the cache without being opened.
+    """
+    stat = csv_file.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = csv_summaries.get(csv_file)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with open(csv_file, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        first = next((row for row in reader if row), None)
+
+        # Get region from first ad
+        region = 'Unknown'
+        if first is not None and 'regions' in header:
+            idx = header.index('regions')
+            region = first[idx] if idx < len(first) else 'Unknown'
+
+        # Blank lines aren't ads (DictReader skips them too)
+        total_ads = (first is not None) + sum(1 for row in reader if row)
+
+    summary = (total_ads, region)
+    csv_summaries[csv_file] = (version, summary)
+    return summary
+
+def csv_ad_formats(csv_file: Path) -> Dict[str, int]:
+    """Ad format counts (by html_content creative size) for a scraped CSV"""
+    # Only the html_content column is read; CSVs without it yield no formats
+    df = pd.read_csv(csv_file, usecols=lambda col: col == 'html_content', dtype=str)
+    if 'html_content' not in df:
+        return {}
+    html = df['html_content'].dropna()
+
+    # Extract dimensions from HTML (e.g., height="250" width="300")
+    h = pd.to_numeric(html.str.extract(HEIGHT_ATTR_RE.pattern, expand=False))
+    w = pd.to_numeric(html.str.extract(WIDTH_ATTR_RE.pattern, expand=False))
+    sized = h.notna() & w.notna()
+    h = h[sized].astype('int64')
+    w = w[sized].astype('int64')
+
+    # Categorize by common ad sizes, falling back to the aspect ratio
+    fallback = np.where(h > w, "Vertical", np.where(w > h * 2, "Banner", "Square/Rectangle"))
+    ad_formats = (w.astype(str) + 'x' + h.astype(str)).map(AD_FORMAT_SIZES).fillna(
+        pd.Series(fallback, index=h.index))
+
+    return {ad_format: int(count) for ad_format, count in ad_formats.value_counts().items()}
+
+def merge_csv_competitors(competitors_dict: dict):
+    """Add competitors from data/input CSVs where there's no newer database entry"""
+    data_dir = Path(__file__).parent.parent / "data" / "input"
+    if not data_dir.exists():
+        return
+
+    for csv_file in data_dir.glob("*.csv"):
+        # Extract advertiser ID from filename
+        advertiser_id = csv_file.stem.split('_')[0]
+
+        # Skip invalid advertiser IDs and unknown advertisers: every known ID is a
+        # valid AR... ID, so one dict probe covers both
+        advertiser_name = KNOWN_ADVERTISERS.get(advertiser_id)
+        if advertiser_name is None:
+            continue
+
+        # Get file modification time
+        mtime = csv_file.stat().st_mtime
+
+        # If we haven't seen this advertiser from DB, or CSV is newer, process it
+        if advertiser_id not in competitors_dict or mtime > competitors_dict[advertiser_id]['mtime']:
+            try:
+                total_ads, region = csv_summary(csv_file)
+
+                competitors_dict[advertiser_id] = {
+                    'mtime': mtime,
+                    'data': CompetitorSummary(
+                        name=advertiser_name,
+                        advertiser_id=advertiser_id,
+                        region=region,
+                        total_ads=total_ads,
+                        last_scraped=datetime.fromtimestamp(mtime),
+                        csv_file=str(csv_file)
+                    )
+                }
+            except Exception as e:
+                print(f"⚠️  Error reading CSV {csv_file}: {e}")
+
+def competitors_etag() -> Optional[str]:
+    """
+    ETag for /api/competitors: a hash of the SQLite file, its write-ahead log
+    and the data/input CSVs (name, mtime, size) - any scrape, edit or upload
+    touches at least one of them. None on Postgres, whose changes leave no file
+    """
+    if DB_AVAILABLE and db and db.use_postgres:
+        return None
+
+    paths = []
+    if DB_AVAILABLE and db:
+        paths += [Path(db.db_path), Path(f"{db.db_path}-wal")]
+    data_dir = Path(__file__).parent.parent / "data" / "input"
+    if data_dir.exists():
+        paths += sorted(data_dir.glob("*.csv"))
+
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{path.name}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return f'"{digest.hexdigest()}"'
+
+def stream_breakdown(rows, list_key: str, count_key: str) -> StreamingResponse:
+    """
+    Stream a breakdown as {list_key: [...], count_key: n, "total_ads": n, "last_updated": ...}
+    Rows are serialized one at a time as the database yields them, and the
+    totals (which need every row) are written after the list
+
+    The first row is fetched here, before the response starts, so a failing
+    query still surfaces as an HTTP error instead of a truncated body - that
+    fetch runs the query, so call this through run_in_threadpool
+    """
+    first = next(rows, None)
+
+    def body():
+        count = 0
+        total_ads = 0
+        yield f'{{"{list_key}": ['
+        for row in (chain([first], rows) if first is not None else ()):
+            row['competitors'] = [get_advertiser_name(aid) for aid in row['competitors']]
+            piece = orjson.dumps(row).decode() if orjson else json.dumps(row)
+            yield piece if count == 0 else ',' + piece
+            count += 1
+            total_ads += row['ad_count']
+        yield f'], "{count_key}": {count}, "total_ads": {total_ads}, "last_updated": "{datetime.now().isoformat()}"}}'
+
+    return StreamingResponse(body(), media_type="application/json")
+
+# Rendered /api/insights/* bodies: the aggregates only move when ads are scraped
+# or edited, while dashboards poll them continuously.
+# (endpoint name, sorted query params) -> (rendered_at, body)
+INSIGHTS_TTL = 60
+INSIGHTS_STALE_TTL = 300
+INSIGHTS_CACHE_SIZE = 256
+# private + no-cache: clear_insights_cache() must take effect at once, so browsers
+# revalidate every time and shared caches/CDNs never keep a copy
+INSIGHTS_CACHE_CONTROL = "private, no-cache"
+insights_cache = OrderedDict()
+insights_refreshing = {}  # key -> refresh task (held so it isn't garbage collected)
+insights_generation = 0
+
+def clear_insights_cache():
+    """Drop cached insights responses - call whenever ads or enrichment change"""
+    global insights_generation
+    insights_generation += 1
+    insights_cache.clear()
+
+def cached_insights(endpoint=None, *, bypass=None):
+    """
+    Serve an insights endpoint from insights_cache, stale-while-revalidate style
+
+    A body is fresh for INSIGHTS_TTL seconds; after that it is still served for up
+    to INSIGHTS_STALE_TTL more while a single background task re-renders it.
+    Errors propagate and are never cached.
+
+    bypass(kwargs) -> True runs the endpoint directly for that request, for
+    renders that must not be cached or refreshed in the background
+    (use as @cached_insights(bypass=...))
+    """
+    if endpoint is None:
+        return functools.partial(cached_insights, bypass=bypass)
+
+    async def render(key, kwargs):
+        generation = insights_generation
+        content = jsonable_encoder(await endpoint(**kwargs))
+        body = orjson.dumps(content) if orjson else json.dumps(content).encode()
+        # A render that raced clear_insights_cache() is served once but not kept
+        if generation == insights_generation:
+            insights_cache[key] = (time.monotonic(), body)
+            insights_cache.move_to_end(key)
+            while len(insights_cache) > INSIGHTS_CACHE_SIZE:
+                insights_cache.popitem(last=False)
+        return body
+
+    async def revalidate(key, kwargs):
+        try:
+            await render(key, kwargs)
+        except Exception as e:
+            print(f"⚠️  Background refresh of {endpoint.__name__} failed: {e}")
+        finally:
+            insights_refreshing.pop(key, None)
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        if bypass and bypass(kwargs):
+            return await endpoint(**kwargs)
+
+        key = (endpoint.__name__, tuple(sorted(kwargs.items())))
+        cached = insights_cache.get(key)
+        age = time.monotonic() - cached[0] if cached else None
+
+        if cached is None or age > INSIGHTS_TTL + INSIGHTS_STALE_TTL:
+            body = await render(key, kwargs)
+        else:
+            body = cached[1]
+            if age > INSIGHTS_TTL and key not in insights_refreshing:
+                insights_refreshing[key] = asyncio.create_task(revalidate(key, kwargs))
+
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"Cache-Control": INSIGHTS_CACHE_CONTROL}
+        )
+
+    return wrapper
+
+# Scrape/analyze jobs run on their own small pool instead of BackgroundTasks, so
+# minutes-long jobs never hold the threadpool request handlers use for blocking work
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="adintel-job")
+
 def create_job(job_type: str, params: dict) -> str:
     """Create a new job and return job ID"""
     job_id = str(uuid.uuid4())
@@ -126,12 +400,48 @@ def create_job(job_type: str, params: dict) -> str:
         "created_at": datetime.now(),
         "completed_at": None
     }
+    evict_jobs()
     return job_id
 
 def update_job(job_id: str, updates: dict):
     """Update job status"""
     if job_id in jobs_db:
         jobs_db[job_id].update(updates)
+        jobs_db.move_to_end(job_id)
+
+def job_progress(job_id: str, start: int, span: float):
+    """
+    Progress callback for long-running tasks: maps p (0-100) to start + p * span
+
+    The job dict is bound once and only whole-percent changes are written,
+    so frequent callbacks cost a comparison instead of a lookup + update.
+    """
+    job = jobs_db.get(job_id)
+    last = job["progress"] if job else None
+
+    def report(p):
+        nonlocal last
+        progress = int(start + p * span)
+        if job is not None and progress != last:
+            last = progress
+            job["progress"] = progress
+
+    return report
+
+def evict_jobs():
+    """Drop least recently updated jobs beyond MAX_JOBS, finished ones first"""
+    excess = len(jobs_db) - MAX_JOBS
+    if excess <= 0:
+        return
+
+    finished = [job_id for job_id, job in jobs_db.items()
+                if job["status"] in ("completed", "failed")][:excess]
+    for job_id in finished:
+        del jobs_db[job_id]
+
+    # Only still-running jobs left over the cap: drop the stalest
+    while len(jobs_db) > MAX_JOBS:
+        jobs_db.popitem(last=False)
 
 def run_scraper_task(job_id: str, url: str, max_ads: int):
     """Background task to run scraper"""
@@ -159,6 +469,7 @@ def run_scraper_task(job_id: str, url: str, max_ads: int):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_file = f"data/input/{advertiser_id}_{timestamp}.csv"
         scraper.save_to_csv(ads, output_file)
+        clear_insights_cache()
 
         update_job(job_id, {
             "status": "completed",
@@ -196,7 +507,7 @@ def run_analyzer_task(job_id: str, csv_file: str, analyzer: str, sample_size: in
             analyzer_type=analyzer,
             output_dir=output_dir,
             limit=sample_size,
-            progress_callback=lambda p: update_job(job_id, {"progress": int(5 + (p * 0.9))})
+            progress_callback=job_progress(job_id, start=5, span=0.9)
         )
 
         update_job(job_id, {
@@ -251,12 +562,11 @@ def debug_database():
         db_type = "PostgreSQL" if db.use_postgres else "SQLite"
         db_url = os.environ.get('DATABASE_URL', 'Not set')
 
-        # Count records
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM ads")
-        ad_count = cursor.fetchone()[0]
-        conn.close()
+        # Count records (on a pooled reader connection)
+        with db._read() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM ads")
+            ad_count = cursor.fetchone()[0]
 
         return {
             "database_type": db_type,
@@ -278,21 +588,40 @@ async def upload_database(file: UploadFile = File(...)):
     curl -X POST https://your-backend-url/api/upload-database \
       -F "file=@/path/to/your/ads.db"
     """
+    global db
+
     if not file.filename.endswith('.db'):
         raise HTTPException(status_code=400, detail="Only .db files are allowed")
 
     try:
-        # Save the uploaded file
         db_path = Path("data/adintel.db")
         db_path.parent.mkdir(parents=True, exist_ok=True)
 
-        with db_path.open("wb") as buffer:
+        # Stage the upload next to the live file, so the swap below is a single rename
+        upload_path = db_path.with_name(db_path.name + ".upload")
+        with upload_path.open("wb") as buffer:
             shutil.copyfileobj(file.file, buffer)
 
-        # Reinitialize database connection
-        global db
-        if DB_AVAILABLE:
-            db = AdDatabase()
+        closed = False
+        try:
+            if DB_AVAILABLE and db:
+                # A busy checkpoint means a reader is still mid-query on the old file
+                if not await run_in_threadpool(db.checkpoint):
+                    raise HTTPException(status_code=409, detail="Database is busy - retry the upload")
+                # Release pooled connections to the old file
+                db.close()
+                closed = True
+
+            # Drop the old write-ahead log so it isn't replayed onto the new file
+            for suffix in ("-wal", "-shm"):
+                Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+            os.replace(upload_path, db_path)
+        finally:
+            upload_path.unlink(missing_ok=True)
+            # Reinitialize database connection
+            if closed or (DB_AVAILABLE and not db):
+                db = AdDatabase()
+        clear_insights_cache()
 
         return {
             "status": "success",
@@ -300,6 +629,8 @@ async def upload_database(file: UploadFile = File(...)):
             "filename": file.filename,
             "size_bytes": db_path.stat().st_size
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload database: {str(e)}")
 
@@ -318,6 +649,10 @@ async def download_database():
         if not db_path.exists():
             raise HTTPException(status_code=404, detail="Database file not found")
 
+        # Include writes still sitting in the write-ahead log
+        if DB_AVAILABLE and db and not await run_in_threadpool(db.checkpoint):
+            raise HTTPException(status_code=409, detail="Database is busy - retry the download")
+
         return Response(
             content=db_path.read_bytes(),
             media_type="application/octet-stream",
@@ -331,7 +666,7 @@ async def download_database():
         raise HTTPException(status_code=500, detail=f"Failed to download database: {str(e)}")
 
 @app.post("/api/scrape", response_model=ScrapeResponse)
-async def scrape_ads(request: ScrapeRequest, background_tasks: BackgroundTasks):
+async def scrape_ads(request: ScrapeRequest):
     """
     Scrape ads from Google Ad Transparency Center
 
@@ -353,8 +688,8 @@ async def scrape_ads(request: ScrapeRequest, background_tasks: BackgroundTasks):
             "max_ads": request.max_ads
         })
 
-        # Start background task
-        background_tasks.add_task(run_scraper_task, job_id, request.url, request.max_ads)
+        # Start background job
+        job_executor.submit(run_scraper_task, job_id, request.url, request.max_ads)
 
         return ScrapeResponse(
             job_id=job_id,
@@ -369,7 +704,7 @@ async def scrape_ads(request: ScrapeRequest, background_tasks: BackgroundTasks):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/analyze", response_model=AnalyzeResponse)
-async def analyze_ads(request: AnalyzeRequest, background_tasks: BackgroundTasks):
+async def analyze_ads(request: AnalyzeRequest):
     """
     Analyze scraped ads with AI
 
@@ -393,8 +728,8 @@ async def analyze_ads(request: AnalyzeRequest, background_tasks: BackgroundTasks
         estimated_minutes = (request.sample_size * 45) / 60  # 45 sec per ad
         estimated_time = f"~{int(estimated_minutes)} minutes"
 
-        # Start background task
-        background_tasks.add_task(
+        # Start background job
+        job_executor.submit(
             run_analyzer_task,
             job_id,
             request.csv_file,
@@ -424,51 +759,40 @@ async def get_job_status(job_id: str):
     return JobStatus(**job)
 
 @app.get("/api/competitors", response_model=List[CompetitorSummary])
-async def list_competitors():
+async def list_competitors(request: Request, response: Response):
     """
     List all scraped competitors (from database + CSV files for backward compatibility)
+
+    Sends an ETag derived from the data files, so polling clients that send it
+    back in If-None-Match get a 304 without the database being queried
     """
+    etag = await run_in_threadpool(competitors_etag)
+    if etag:
+        if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+    return await gather_competitors()
+
+async def gather_competitors() -> List[CompetitorSummary]:
+    """Competitor summaries from the database, merged with data/input CSVs"""
     competitors_dict = {}
 
     # FIRST: Try to load from database (preferred source)
     if DB_AVAILABLE and db:
         try:
-            # Query database for all advertisers (excluding rejected ads)
-            # Use database abstraction layer to support both SQLite and Postgres
-            conn = db._get_connection()
-            cursor = conn.cursor()
+            # Query database for all advertisers (excluding rejected ads), off the event loop
+            summaries = await run_in_threadpool(db.get_competitor_summaries)
 
-            # Handle SQL differences between SQLite (0/1) and Postgres (FALSE/TRUE)
-            rejected_condition = "e.rejected_wrong_region = FALSE" if db.use_postgres else "e.rejected_wrong_region = 0"
-
-            query = f"""
-                SELECT
-                    a.advertiser_id,
-                    COUNT(*) as total_ads,
-                    MAX(a.created_at) as last_scraped
-                FROM ads a
-                LEFT JOIN ad_enrichment e ON a.id = e.ad_id
-                WHERE a.advertiser_id IS NOT NULL
-                  AND ({rejected_condition} OR e.rejected_wrong_region IS NULL)
-                GROUP BY a.advertiser_id
-            """
-            cursor.execute(query)
-
-            for row in cursor.fetchall():
-                advertiser_id, total_ads, last_scraped_str = row
+            for summary in summaries:
+                advertiser_id = summary['advertiser_id']
 
                 # Skip unknown advertisers (where name == ID)
                 advertiser_name = get_advertiser_name(advertiser_id)
                 if advertiser_name == advertiser_id:
                     continue
 
-                # Parse datetime string to datetime object
-                last_scraped_dt = None
-                if last_scraped_str:
-                    try:
-                        last_scraped_dt = datetime.strptime(last_scraped_str, "%Y-%m-%d %H:%M:%S")
-                    except:
-                        pass
+                last_scraped_dt = summary['last_scraped']
 
                 # Use timestamp for mtime comparison
                 mtime = last_scraped_dt.timestamp() if last_scraped_dt else 0
@@ -479,62 +803,23 @@ async def list_competitors():
                         name=advertiser_name,
                         advertiser_id=advertiser_id,
                         region="QA",  # Default region
-                        total_ads=total_ads,
+                        total_ads=summary['total_ads'],
                         last_scraped=last_scraped_dt,
                         csv_file=None  # Database source
                     )
                 }
 
-            conn.close()
         except Exception as e:
             print(f"⚠️  Database query failed, falling back to CSV: {e}")
 
-    # SECOND: Also scan CSV files (for backward compatibility)
-    data_dir = Path(__file__).parent.parent / "data" / "input"
-    if data_dir.exists():
-        for csv_file in data_dir.glob("*.csv"):
-            # Extract advertiser ID from filename
-            advertiser_id = csv_file.stem.split('_')[0]
-
-            # Skip invalid advertiser IDs and unknown advertisers (where name == ID)
-            advertiser_name = get_advertiser_name(advertiser_id)
-            if advertiser_id in ['None'] or 'gatc-scraped-data' in advertiser_id or not advertiser_id.startswith('AR') or advertiser_name == advertiser_id:
-                continue
-
-            # Get file modification time
-            mtime = csv_file.stat().st_mtime
-
-            # If we haven't seen this advertiser from DB, or CSV is newer, process it
-            if advertiser_id not in competitors_dict or mtime > competitors_dict[advertiser_id]['mtime']:
-                # Read CSV to get ad count (quick peek)
-                import csv
-                try:
-                    with open(csv_file, 'r') as f:
-                        reader = csv.DictReader(f)
-                        ads = list(reader)
-                        total_ads = len(ads)
-
-                        # Get region from first ad
-                        region = ads[0].get('regions', 'Unknown') if ads else 'Unknown'
-
-                    competitors_dict[advertiser_id] = {
-                        'mtime': mtime,
-                        'data': CompetitorSummary(
-                            name=get_advertiser_name(advertiser_id),
-                            advertiser_id=advertiser_id,
-                            region=region,
-                            total_ads=total_ads,
-                            last_scraped=datetime.fromtimestamp(mtime),
-                            csv_file=str(csv_file)
-                        )
-                    }
-                except Exception as e:
-                    print(f"⚠️  Error reading CSV {csv_file}: {e}")
+    # SECOND: Also scan CSV files (for backward compatibility), off the event loop
+    await run_in_threadpool(merge_csv_competitors, competitors_dict)
 
     # Return just the competitor data (not the mtime tracking)
     return [item['data'] for item in competitors_dict.values()]
 
 @app.get("/api/insights/products")
+@cached_insights
 async def get_product_insights(advertiser_id: Optional[str] = None):
     """
     Get product/category breakdown by competitor
@@ -584,7 +869,7 @@ async def get_product_insights(advertiser_id: Optional[str] = None):
             )
 
         # Get category-level breakdown from database
-        products = db.get_products_by_competitor(advertiser_id)
+        products = await run_in_threadpool(db.get_products_by_competitor, advertiser_id)
 
         # EXCLUDE "Specific Restaurant/Brand Promo" aggregated entries
         # (we'll add detailed restaurant data with product_name instead)
@@ -595,7 +880,7 @@ async def get_product_insights(advertiser_id: Optional[str] = None):
             product['competitor'] = get_advertiser_name(product['advertiser_id'])
 
         # Get restaurant-specific data with product_name
-        restaurants = db.get_restaurants_breakdown()
+        restaurants = await run_in_threadpool(db.get_restaurants_breakdown)
 
         # Add restaurant products to the products list with product_name
         for restaurant in restaurants:
@@ -627,16 +912,16 @@ async def get_product_insights(advertiser_id: Optional[str] = None):
             "last_updated": datetime.now().isoformat(),
             "total_products": total_products,
             "total_ads": total_ads,
-            "database_stats": db.get_stats() if db else {}
+            "database_stats": await run_in_threadpool(db.get_stats) if db else {}
         }
 
     except Exception as e:
         print(f"Error getting product insights: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/messaging")
+@cached_insights
 async def get_messaging_insights(time_range: str = "all", advertiser_id: Optional[str] = None):
     """
     Get messaging themes breakdown across competitors
@@ -678,7 +963,7 @@ async def get_messaging_insights(time_range: str = "all", advertiser_id: Optiona
 
         # Get messaging breakdown from database
         # Returns: {"AR123": {"price": 45, "speed": 25, ...}, "AR456": {...}, ...}
-        messaging_data = db.get_messaging_breakdown(time_range)
+        messaging_data = await run_in_threadpool(db.get_messaging_breakdown, time_range)
 
         # Transform to theme-centric view
         # Aggregate across all competitors
@@ -730,11 +1015,11 @@ async def get_messaging_insights(time_range: str = "all", advertiser_id: Optiona
 
     except Exception as e:
         print(f"Error getting messaging insights: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/velocity")
+@cached_insights
 async def get_velocity_insights(days: int = 30):
     """
     Get creative velocity - daily new ad launch frequency
@@ -746,7 +1031,7 @@ async def get_velocity_insights(days: int = 30):
         if not DB_AVAILABLE or not db:
             raise HTTPException(status_code=503, detail="Database not available")
 
-        velocity_data = db.get_daily_velocity(days)
+        velocity_data = await run_in_threadpool(db.get_daily_velocity, days)
 
         # Enrich with competitor names
         for day in velocity_data:
@@ -763,11 +1048,11 @@ async def get_velocity_insights(days: int = 30):
         }
     except Exception as e:
         print(f"Error getting velocity insights: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/audiences")
+@cached_insights
 async def get_audience_insights():
     """
     Get audience segment targeting breakdown
@@ -783,7 +1068,7 @@ async def get_audience_insights():
         if not DB_AVAILABLE or not db:
             raise HTTPException(status_code=503, detail="Database not available")
 
-        audience_data = db.get_audience_breakdown()
+        audience_data = await run_in_threadpool(db.get_audience_breakdown)
 
         # Enrich with competitor names
         for segment in audience_data:
@@ -797,11 +1082,11 @@ async def get_audience_insights():
         }
     except Exception as e:
         print(f"Error getting audience insights: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/promos")
+@cached_insights
 async def get_promo_insights(days: int = 30):
     """
     Get promo/offer intensity timeline
@@ -816,7 +1101,7 @@ async def get_promo_insights(days: int = 30):
         if not DB_AVAILABLE or not db:
             raise HTTPException(status_code=503, detail="Database not available")
 
-        promo_data = db.get_promo_timeline(days)
+        promo_data = await run_in_threadpool(db.get_promo_timeline, days)
 
         # Calculate totals
         total_promos = sum(d['total_promos'] for d in promo_data)
@@ -838,8 +1123,7 @@ async def get_promo_insights(days: int = 30):
         }
     except Exception as e:
         print(f"Error getting promo insights: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/competitors/{advertiser_id}/insights")
@@ -858,10 +1142,11 @@ async def get_competitor_insights(advertiser_id: str):
         if not DB_AVAILABLE or not db:
             raise HTTPException(status_code=503, detail="Database not available")
 
-        # Get competitor's ads
-        ads = db.get_ads_by_competitor(advertiser_id, active_only=True)
+        # Counts come straight from SQL instead of streaming every ad into Python
+        counts = await run_in_threadpool(db.get_competitor_insight_counts, advertiser_id)
+        total_ads = counts['total_ads']
 
-        if not ads:
+        if not total_ads:
             return {
                 "advertiser_id": advertiser_id,
                 "total_ads": 0,
@@ -873,56 +1158,20 @@ async def get_competitor_insights(advertiser_id: str):
                 "share_of_voice": 0
             }
 
-        total_ads = len(ads)
-
         # Calculate velocity (ads per day)
         # Assume ads span the last 30 days for now
         velocity = round(total_ads / 30, 1)
 
         # Get top product category
-        product_counts = {}
-        for ad in ads:
-            category = ad.get('product_category')
-            if category:
-                product_counts[category] = product_counts.get(category, 0) + 1
-
         top_category = "Unknown"
         category_percent = 0
-        if product_counts:
-            top_category = max(product_counts.items(), key=lambda x: x[1])[0]
-            category_percent = round((product_counts[top_category] / total_ads) * 100, 1)
+        if counts['top_category']:
+            top_category = counts['top_category']
+            category_percent = round((counts['top_category_count'] / total_ads) * 100, 1)
 
         # Calculate REAL trend (compare last 7 days vs previous 7 days)
-        from datetime import datetime, timedelta
-        now = datetime.now()
-        seven_days_ago = now - timedelta(days=7)
-        fourteen_days_ago = now - timedelta(days=14)
-
-        # Helper function to convert first_seen_date to datetime for comparison
-        def to_datetime(date_val):
-            if isinstance(date_val, datetime):
-                return date_val
-            if isinstance(date_val, str):
-                try:
-                    return datetime.strptime(date_val, '%Y-%m-%d %H:%M:%S')
-                except:
-                    try:
-                        return datetime.strptime(date_val, '%Y-%m-%d')
-                    except:
-                        return datetime.min
-            return datetime.min
-
-        # Count ads in last 7 days
-        last_week_ads = [ad for ad in ads if to_datetime(ad.get('first_seen_date')) >= seven_days_ago]
-
-        # Count ads in previous 7 days (8-14 days ago)
-        previous_week_ads = [
-            ad for ad in ads
-            if fourteen_days_ago <= to_datetime(ad.get('first_seen_date')) < seven_days_ago
-        ]
-
-        last_week_count = len(last_week_ads)
-        previous_week_count = len(previous_week_ads)
+        last_week_count = counts['last_week']
+        previous_week_count = counts['previous_week']
 
         # Calculate trend
         if previous_week_count == 0:
@@ -941,20 +1190,9 @@ async def get_competitor_insights(advertiser_id: str):
                 trend = 'stable'
                 trend_percent = 0
 
-        # Calculate Share of Voice (% of ads in last 30 days only)
-        thirty_days_ago = now - timedelta(days=30)
-
-        # Get all ads from last 30 days
-        all_recent_ads = []
-        for ad in db.get_all_ads(active_only=True):
-            if to_datetime(ad.get('first_seen_date')) >= thirty_days_ago:
-                all_recent_ads.append(ad)
-
-        # Get this competitor's ads from last 30 days
-        competitor_recent_ads = [ad for ad in ads if to_datetime(ad.get('first_seen_date')) >= thirty_days_ago]
-
-        # Calculate share of voice (more accurate than "market share")
-        share_of_voice = round((len(competitor_recent_ads) / len(all_recent_ads)) * 100, 1) if all_recent_ads else 0
+        # Calculate share of voice (% of ads in last 30 days only)
+        all_recent = counts['all_recent']
+        share_of_voice = round((counts['competitor_recent'] / all_recent) * 100, 1) if all_recent else 0
 
         return {
             "advertiser_id": advertiser_id,
@@ -969,8 +1207,7 @@ async def get_competitor_insights(advertiser_id: str):
 
     except Exception as e:
         print(f"Error getting competitor insights: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/competitors/{advertiser_id}/ads")
@@ -979,10 +1216,12 @@ async def get_competitor_ads(
     advertiser_id: str,
     limit: int = 50,
     active_only: bool = True,
-    category: Optional[str] = None
+    category: Optional[str] = None,
+    offset: int = 0,
+    after: Optional[str] = None
 ):
     """
-    Get all ads for a specific competitor with images for carousel
+    Get all ads for a specific competitor with images for carousel (newest first)
     Powers: Competitor deep-dive page ad gallery
 
     Args:
@@ -990,6 +1229,9 @@ async def get_competitor_ads(
         limit: Max number of ads to return (default: 50)
         active_only: Only return active ads (default: True)
         category: Optional product category filter (e.g., "Burgers & Fast Food")
+        offset: Ads to skip, for paging past the first `limit` (default: 0)
+        after: Keyset cursor - the previous page's next_cursor. Seeks instead of
+               scanning past `offset` rows; total_ads is null on these pages
 
     Returns:
         {
@@ -1009,9 +1251,18 @@ async def get_competitor_ads(
                 ...
             ],
             "total_ads": 100,
+            "next_cursor": "2025-10-15 08:00:00:123",
             "advertiser_name": "Talabat"
         }
     """
+    # Cursor is "<first_seen_date>:<id>" of the last ad already shown
+    cursor_key = None
+    if after:
+        first_seen, _, last_id = after.rpartition(':')
+        if not first_seen or not last_id.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cursor_key = (first_seen, int(last_id))
+
     try:
         if not DB_AVAILABLE or not db:
             raise HTTPException(
@@ -1019,68 +1270,47 @@ async def get_competitor_ads(
                 detail="Database not available. Please scrape ads with --save-db flag first."
             )
 
-        # Get ads from database
-        ads = db.get_ads_by_competitor(advertiser_id, active_only=active_only)
-
-        # Filter by category if specified (BEFORE limiting!)
-        if category:
-            ads = [ad for ad in ads if ad.get('product_category') == category]
+        # Category filter and limit run in SQL; rows come back in the gallery's field set
+        page = await run_in_threadpool(
+            db.get_competitor_gallery, advertiser_id,
+            active_only=active_only, category=category, limit=limit, offset=offset,
+            after=cursor_key
+        )
+        formatted_ads = page['ads']
+        total_ads = page['total_ads']
 
-        # Limit results AFTER filtering
-        limited_ads = ads[:limit] if limit else ads
+        # A full page may have more behind it
+        next_cursor = None
+        if limit and len(formatted_ads) == limit and formatted_ads[-1]['first_seen_date'] is not None:
+            last = formatted_ads[-1]
+            next_cursor = f"{last['first_seen_date']}:{last['id']}"
 
-        # Format for frontend (include all fields needed for display)
         # IMPORTANT: Proxy image URLs to bypass ad blockers
-        from urllib.parse import quote
-
         # Get the host from the incoming request (works across network!)
         # This ensures images load on any device accessing the API
         base_url = str(request.base_url).rstrip('/')
+        proxy_prefix = f"{base_url}/api/proxy/image?url="
 
-        formatted_ads = []
-        for ad in limited_ads:
-            image_url = ad.get('image_url')
-            # Proxy the image URL through our backend to bypass ad blockers
-            if image_url:
-                proxied_url = f"{base_url}/api/proxy/image?url={quote(image_url)}"
-            else:
-                proxied_url = None
-
-            formatted_ads.append({
-                'id': ad.get('id'),
-                'image_url': proxied_url,
-                'ad_text': ad.get('ad_text', 'Unknown'),
-                'product_category': ad.get('product_category'),
-                'product_name': ad.get('product_name'),
-                'offer_type': ad.get('offer_type'),
-                'offer_details': ad.get('offer_details'),
-                'primary_theme': ad.get('primary_theme'),
-                'target_audience': ad.get('target_audience'),
-                'first_seen_date': ad.get('first_seen_date'),
-                'last_seen_date': ad.get('last_seen_date'),
-                'is_active': ad.get('is_active', True),
-                # Vision-enriched fields
-                'brand': ad.get('brand'),
-                'food_category': ad.get('food_category'),
-                'detected_region': ad.get('detected_region'),
-                'rejected_wrong_region': ad.get('rejected_wrong_region')
-            })
+        for ad in formatted_ads:
+            image_url = ad['image_url']
+            ad['image_url'] = proxy_prefix + quote(image_url) if image_url else None
 
         return {
             "ads": formatted_ads,
-            "total_ads": len(ads),
+            "total_ads": total_ads,
             "returned_ads": len(formatted_ads),
+            "next_cursor": next_cursor,
             "advertiser_name": get_advertiser_name(advertiser_id),
             "advertiser_id": advertiser_id
         }
 
     except Exception as e:
         print(f"Error getting competitor ads: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/offers")
+@cached_insights
 async def get_offers_breakdown():
     """
     Get active offers breakdown with % distribution
@@ -1119,7 +1349,7 @@ async def get_offers_breakdown():
             )
 
         # Get offers breakdown from database
-        offers = db.get_offers_breakdown()
+        offers = await run_in_threadpool(db.get_offers_breakdown)
 
         # Enrich with competitor names
         for offer in offers:
@@ -1138,11 +1368,11 @@ async def get_offers_breakdown():
 
     except Exception as e:
         print(f"Error getting offers breakdown: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/restaurants")
+@cached_insights
 async def get_restaurants_breakdown():
     """
     Get top restaurants being promoted with % distribution
@@ -1179,7 +1409,7 @@ async def get_restaurants_breakdown():
             )
 
         # Get restaurants breakdown from database
-        restaurants = db.get_restaurants_breakdown()
+        restaurants = await run_in_threadpool(db.get_restaurants_breakdown)
 
         # Enrich with competitor names
         for restaurant in restaurants:
@@ -1198,8 +1428,7 @@ async def get_restaurants_breakdown():
 
     except Exception as e:
         print(f"Error getting restaurants breakdown: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/brands")
@@ -1238,28 +1467,12 @@ async def get_brands_breakdown():
                 detail="Database not available. Please scrape ads with --save-db flag first."
             )
 
-        # Get brands breakdown from database
-        brands = db.get_brands_breakdown()
-
-        # Enrich with competitor names
-        for brand in brands:
-            brand['competitors'] = [get_advertiser_name(aid) for aid in brand['competitors']]
-
-        # Calculate totals
-        total_ads = sum(b['ad_count'] for b in brands)
-        total_brands = len(brands)
-
-        return {
-            "brands": brands,
-            "total_brands": total_brands,
-            "total_ads": total_ads,
-            "last_updated": datetime.now().isoformat()
-        }
+        # Stream brands breakdown from database (competitor names filled in per row)
+        return await run_in_threadpool(stream_breakdown, db.iter_brands_breakdown(), "brands", "total_brands")
 
     except Exception as e:
         print(f"Error getting brands breakdown: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/categories")
@@ -1300,28 +1513,12 @@ async def get_product_categories_breakdown():
                 detail="Database not available. Please scrape ads with --save-db flag first."
             )
 
-        # Get product categories breakdown from database
-        categories = db.get_product_categories_breakdown()
-
-        # Enrich with competitor names
-        for category in categories:
-            category['competitors'] = [get_advertiser_name(aid) for aid in category['competitors']]
-
-        # Calculate totals
-        total_ads = sum(c['ad_count'] for c in categories)
-        total_categories = len(categories)
-
-        return {
-            "categories": categories,
-            "total_categories": total_categories,
-            "total_ads": total_ads,
-            "last_updated": datetime.now().isoformat()
-        }
+        # Stream product categories breakdown from database (competitor names filled in per row)
+        return await run_in_threadpool(stream_breakdown, db.iter_product_categories_breakdown(), "categories", "total_categories")
 
     except Exception as e:
         print(f"Error getting product categories breakdown: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/food-categories")
@@ -1361,31 +1558,17 @@ async def get_food_categories_breakdown():
                 detail="Database not available. Please scrape ads with --save-db flag first."
             )
 
-        # Get food categories breakdown from database
-        categories = db.get_food_categories_breakdown()
-
-        # Enrich with competitor names
-        for category in categories:
-            category['competitors'] = [get_advertiser_name(aid) for aid in category['competitors']]
-
-        # Calculate totals
-        total_ads = sum(c['ad_count'] for c in categories)
-        total_categories = len(categories)
-
-        return {
-            "food_categories": categories,
-            "total_categories": total_categories,
-            "total_ads": total_ads,
-            "last_updated": datetime.now().isoformat()
-        }
+        # Stream food categories breakdown from database (competitor names filled in per row)
+        return await run_in_threadpool(stream_breakdown, db.iter_food_categories_breakdown(), "food_categories", "total_categories")
 
     except Exception as e:
         print(f"Error getting food categories breakdown: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/weekly")
+# Vision/LLM runs aren't cached: an unreachable Ollama yields fallback insights, not an error
+@cached_insights(bypass=lambda kwargs: kwargs["use_ai"])
 async def get_weekly_insights(use_ai: bool = False, sample_size: int = 3):
     """
     Generate AI-powered weekly insights comparing all competitors with Vision AI
@@ -1396,7 +1579,7 @@ async def get_weekly_insights(use_ai: bool = False, sample_size: int = 3):
     """
     try:
         # Get all competitors
-        competitors_data = await list_competitors()
+        competitors_data = await gather_competitors()
 
         if not competitors_data:
             return {"insights": []}
@@ -1410,17 +1593,19 @@ async def get_weekly_insights(use_ai: bool = False, sample_size: int = 3):
             from insights_engine import get_insights_engine
 
             print("🤖 Generating AI-powered insights with Vision analysis...")
-            engine = get_insights_engine()
+            engine = get_insights_engine(db)
 
-            # Get full analysis data including visual insights
-            analysis_data = engine._gather_analysis_data(
+            # Get full analysis data including visual insights (runs its own
+            # event loop for the image batch, so keep it off this one)
+            analysis_data = await run_in_threadpool(
+                engine._gather_analysis_data,
                 competitors_list,
                 data_dir,
                 sample_size=min(sample_size, 20)
             )
 
             # Generate insights
-            insights = engine._generate_ai_insights(analysis_data)
+            insights = await run_in_threadpool(engine._generate_ai_insights, analysis_data)
 
             # Aggregate visual data for charts
             all_categories = {}
@@ -1456,51 +1641,18 @@ async def get_weekly_insights(use_ai: bool = False, sample_size: int = 3):
             total_ads = sum(c.total_ads for c in competitors_data)
 
             # Aggregate basic data from CSVs for charts (no AI analysis needed)
-            all_formats = {}
             competitor_ad_counts = {}
 
             for comp in competitors_data:
-                csv_file = Path(comp.csv_file) if comp.csv_file else None
                 competitor_ad_counts[comp.name] = comp.total_ads
 
-                if csv_file and csv_file.exists():
-                    import csv as csv_module
-                    import re
-                    with open(csv_file, 'r') as f:
-                        reader = csv_module.DictReader(f)
-                        for ad in reader:
-                            # Extract format from html_content dimensions
-                            html = ad.get('html_content', '')
-                            if html:
-                                # Extract dimensions from HTML (e.g., height="250" width="300")
-                                height_match = re.search(r'height="(\d+)"', html)
-                                width_match = re.search(r'width="(\d+)"', html)
-
-                                if height_match and width_match:
-                                    h = int(height_match.group(1))
-                                    w = int(width_match.group(1))
-
-                                    # Categorize by common ad sizes
-                                    if w == 300 and h == 250:
-                                        ad_format = "Medium Rectangle (300x250)"
-                                    elif w == 728 and h == 90:
-                                        ad_format = "Leaderboard (728x90)"
-                                    elif w == 320 and h == 50:
-                                        ad_format = "Mobile Banner (320x50)"
-                                    elif w == 160 and h == 600:
-                                        ad_format = "Wide Skyscraper (160x600)"
-                                    elif w == 300 and h == 600:
-                                        ad_format = "Half Page (300x600)"
-                                    elif w == 970 and h == 250:
-                                        ad_format = "Billboard (970x250)"
-                                    elif h > w:
-                                        ad_format = "Vertical"
-                                    elif w > h * 2:
-                                        ad_format = "Banner"
-                                    else:
-                                        ad_format = "Square/Rectangle"
-
-                                    all_formats[ad_format] = all_formats.get(ad_format, 0) + 1
+            # Parse the competitor CSVs in parallel, off the event loop
+            csv_files = [Path(comp.csv_file) for comp in competitors_data if comp.csv_file]
+            format_counts = await asyncio.gather(*[
+                run_in_threadpool(csv_ad_formats, csv_file)
+                for csv_file in csv_files if csv_file.exists()
+            ])
+            all_formats = dict(sum((Counter(counts) for counts in format_counts), Counter()))
 
             insights = []
 
@@ -1615,9 +1767,8 @@ async def get_weekly_insights(use_ai: bool = False, sample_size: int = 3):
 
     except Exception as e:
         print(f"Error generating insights: {e}")
-        import traceback
-        traceback.print_exc()
-        return {"insights": []}
+        print_traceback()
+        raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/insights/{csv_file:path}")
 async def get_insights(csv_file: str):
@@ -1672,14 +1823,13 @@ async def get_strategic_insights(module: str):
         from api.strategic_analyst import get_strategic_analyst
 
         analyst = get_strategic_analyst()
-        actions = analyst.generate_quick_actions(db, module=module)
+        actions = await run_in_threadpool(analyst.generate_quick_actions, db, module=module)
 
         return {"actions": actions}
 
     except Exception as e:
         print(f"❌ Error generating strategic insights: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
 
         # Fallback to generic actions
         return {
@@ -1708,37 +1858,11 @@ async def delete_ad(ad_id: int):
                 detail="Database not available"
             )
 
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        ph = db._param_placeholder()
-
-        try:
-            # First check if ad exists
-            cursor.execute(f"SELECT id FROM ads WHERE id = {ph}", (ad_id,))
-            if not cursor.fetchone():
-                raise HTTPException(status_code=404, detail="Ad not found")
-
-            # Mark the ad as rejected (soft delete)
-            true_val = db._true_val()
-            cursor.execute(
-                f"UPDATE ad_enrichment SET rejected_wrong_region = {true_val} WHERE ad_id = {ph}",
-                (ad_id,)
-            )
-
-            # If no enrichment record exists, create one
-            cursor.execute(
-                f"SELECT ad_id FROM ad_enrichment WHERE ad_id = {ph}",
-                (ad_id,)
-            )
-            if not cursor.fetchone():
-                cursor.execute(
-                    f"INSERT INTO ad_enrichment (ad_id, rejected_wrong_region) VALUES ({ph}, {true_val})",
-                    (ad_id,)
-                )
-
-            conn.commit()
-        finally:
-            conn.close()
+        # Flag + roll-up refresh run as one transaction on the shared writer connection
+        advertiser_id = await run_in_threadpool(db.reject_ad, ad_id)
+        if advertiser_id is None:
+            raise HTTPException(status_code=404, detail="Ad not found")
+        clear_insights_cache()
 
         return {
             "success": True,
@@ -1750,8 +1874,7 @@ async def delete_ad(ad_id: int):
         raise
     except Exception as e:
         print(f"Error deleting ad: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.options("/api/ad-content/{ad_id}")
@@ -1768,57 +1891,21 @@ async def update_ad(ad_id: int, updates: Dict[str, Any] = Body(...)):
             print(f"❌ Database not available for ad {ad_id}")
             raise HTTPException(status_code=503, detail="Database not available")
 
-        conn = db._get_connection()
-        cursor = conn.cursor()
-        ph = db._param_placeholder()
+        # Only whitelisted enrichment columns can be edited
+        update_fields = {
+            field: value for field, value in updates.items()
+            if field in EDITABLE_ENRICHMENT_FIELDS
+        }
+        if not update_fields:
+            raise HTTPException(status_code=400, detail="No valid fields to update")
 
-        try:
-            # Check if ad exists
-            cursor.execute(f"SELECT id FROM ads WHERE id = {ph}", (ad_id,))
-            if not cursor.fetchone():
-                raise HTTPException(status_code=404, detail="Ad not found")
-
-            # Build update query for ad_enrichment table
-            allowed_fields = ['product_category', 'product_name']
-            update_fields = {}
-
-            for field, value in updates.items():
-                if field in allowed_fields:
-                    update_fields[field] = value
-
-            if not update_fields:
-                raise HTTPException(status_code=400, detail="No valid fields to update")
-
-            # Check if enrichment record exists
-            cursor.execute(f"SELECT ad_id FROM ad_enrichment WHERE ad_id = {ph}", (ad_id,))
-            enrichment_exists = cursor.fetchone() is not None
-
-            # Mark as manually edited to protect from AI overwrite
-            true_val = db._true_val()
-
-            if enrichment_exists:
-                # Update existing record and mark as manually edited
-                update_fields['manually_edited'] = true_val
-                set_clause = ", ".join([f"{field} = {ph}" for field in update_fields.keys()])
-                values = list(update_fields.values()) + [ad_id]
-                cursor.execute(
-                    f"UPDATE ad_enrichment SET {set_clause} WHERE ad_id = {ph}",
-                    values
-                )
-            else:
-                # Insert new record with manually_edited flag
-                fields = ['ad_id', 'manually_edited'] + list(update_fields.keys())
-                placeholders = ','.join([ph] * len(fields))
-                values = [ad_id, true_val] + list(update_fields.values())
-                cursor.execute(
-                    f"INSERT INTO ad_enrichment ({','.join(fields)}) VALUES ({placeholders})",
-                    values
-                )
-
-            conn.commit()
-            print(f"✅ Successfully updated ad {ad_id} with fields: {list(update_fields.keys())}")
-        finally:
-            conn.close()
+        # Edit (marked manually_edited to protect from AI overwrite) + roll-up refresh
+        # run as one transaction on the shared writer connection
+        advertiser_id = await run_in_threadpool(db.update_ad_enrichment, ad_id, update_fields)
+        if advertiser_id is None:
+            raise HTTPException(status_code=404, detail="Ad not found")
+        print(f"✅ Successfully updated ad {ad_id} with fields: {list(update_fields.keys())}")
+        clear_insights_cache()
 
         return {
             "success": True,
@@ -1830,8 +1917,7 @@ async def update_ad(ad_id: int, updates: Dict[str, Any] = Body(...)):
         raise
     except Exception as e:
         print(f"❌ Error updating ad {ad_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        print_traceback()
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/proxy/image")
@@ -1851,7 +1937,6 @@ async def proxy_image(url: str):
     try:
         # Validate URL is from Google's ad servers
         allowed_domains = ['tpc.googlesyndication.com', 's0.2mdn.net']
-        from urllib.parse import urlparse
         parsed = urlparse(url)
 
         if parsed.hostname not in allowed_domains:
@@ -6,7 +6,7 @@ Strategy:
 - Split ads into 2 batches (50/50)
 - Batch 1 → LLaVA (Ollama)
 - Batch 2 → DeepSeek-OCR
-- Process in parallel using multiprocessing
+- Process in parallel (concurrent async OCR requests, LLaVA threads)
 - Combine results
 
 Benefits:
@@ -16,15 +16,28 @@ Benefits:
 - Fault tolerance
 """
 
+import asyncio
 import os
 import time
 import json
+from functools import lru_cache
 from typing import List, Dict, Optional
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from multiprocessing import Queue, Process
 import queue
 
 
+@lru_cache(maxsize=None)
+def _deepseek_client(service_url: str = "http://localhost:8001", cache=None):
+    """
+    DeepSeek-OCR client shared by every ad handled in this process,
+    so its pooled keep-alive connections are reused across calls
+    (results are cached in `cache`, the caller's AdDatabase, so repeat creatives skip OCR)
+    """
+    from api.deepseek_client import DeepSeekOCRClient
+    return DeepSeekOCRClient(service_url=service_url, cache=cache)
+
+
 class ParallelVisionAnalyzer:
     """
     Orchestrates parallel vision analysis using multiple models
@@ -33,19 +46,22 @@ class ParallelVisionAnalyzer:
     def __init__(self,
                  llava_workers: int = 2,
                  deepseek_workers: int = 2,
-                 split_ratio: float = 0.5):
+                 split_ratio: float = 0.5,
+                 db=None):
         """
         Initialize parallel vision analyzer
 
         Args:
             llava_workers: Number of parallel LLaVA processes
-            deepseek_workers: Number of parallel DeepSeek processes
+            deepseek_workers: Maximum concurrent DeepSeek-OCR requests
             split_ratio: Fraction of ads to send to DeepSeek (0.0-1.0)
                         0.5 = 50/50 split, 0.7 = 70% DeepSeek, 30% LLaVA
+            db: Optional AdDatabase - DeepSeek-OCR results are cached in its ocr_cache
         """
         self.llava_workers = llava_workers
         self.deepseek_workers = deepseek_workers
         self.split_ratio = split_ratio
+        self.db = db
 
         # Stats tracking
         self.stats = {
@@ -121,12 +137,33 @@ class ParallelVisionAnalyzer:
         print(f"🔵 DeepSeek-OCR: Starting {len(ads)} ads...")
         results = []
 
-        # Use ProcessPoolExecutor for true parallelism
-        with ProcessPoolExecutor(max_workers=self.deepseek_workers) as executor:
-            # Submit all ads
+        from api.deepseek_client import DEEPSEEK_PROMPTS
+
+        # OCR is network-bound: one async batch keeps deepseek_workers
+        # requests in flight over pooled connections
+        start = time.time()
+        client = _deepseek_client("http://localhost:8001", self.db)
+
+        async def run_ocr():
+            # The AsyncClient is bound to this asyncio.run loop - close it before the loop goes
+            try:
+                return await client.extract_many(
+                    [
+                        {'image_url': ad.get('image_url', ''), 'prompt': DEEPSEEK_PROMPTS["general"], 'timeout': 60}
+                        for ad in ads
+                    ],
+                    concurrency=self.deepseek_workers
+                )
+            finally:
+                await client.aclose()
+
+        ocr_results = asyncio.run(run_ocr())
+
+        # Attach results (ads DeepSeek failed on fail over to LLaVA in parallel)
+        with ThreadPoolExecutor(max_workers=self.deepseek_workers) as executor:
             futures = {
-                executor.submit(self._process_single_deepseek, ad): ad
-                for ad in ads
+                executor.submit(self._finish_deepseek, ad, ocr_result, start): ad
+                for ad, ocr_result in zip(ads, ocr_results)
             }
 
             # Collect results as they complete
@@ -200,73 +237,56 @@ class ParallelVisionAnalyzer:
         return results
 
     @staticmethod
-    def _process_single_deepseek(ad: Dict) -> Dict:
+    def _finish_deepseek(ad: Dict, ocr_result, start: float) -> Dict:
         """
-        Process single ad with DeepSeek-OCR microservice
-        Falls back to LLaVA if DeepSeek fails
+        Attach a DeepSeek-OCR result (from extract_many) to its ad
+        Falls back to LLaVA if DeepSeek failed for this ad
 
-        NOTE: Runs in separate process, must re-import modules
+        Args:
+            ad: Ad dictionary
+            ocr_result: OCR result dict, or the Exception DeepSeek raised
+            start: When the DeepSeek batch started
         """
-        import time
-        start = time.time()
-
-        try:
-            # Import here (process-local)
-            from api.deepseek_client import DeepSeekOCRClient, DEEPSEEK_PROMPTS
-
-            # Create client
-            client = DeepSeekOCRClient(service_url="http://localhost:8001")
-
-            # Extract text
-            image_url = ad.get('image_url', '')
-            if not image_url:
-                raise ValueError("No image_url in ad")
-
-            result = client.extract_text(
-                image_url=image_url,
-                prompt=DEEPSEEK_PROMPTS["general"],
-                timeout=60
-            )
-
+        if not isinstance(ocr_result, Exception):
             # Add to ad
-            ad['_vision_text'] = result['raw_text']
-            ad['_vision_structured'] = result.get('structured', [])
+            ad['_vision_text'] = ocr_result['raw_text']
+            ad['_vision_structured'] = ocr_result.get('structured', [])
             ad['_vision_model'] = 'deepseek-ocr'
-            ad['_vision_time'] = time.time() - start
+            ad['_vision_time'] = ocr_result.get('processing_time', time.time() - start)
 
             return ad
 
-        except Exception as e:
-            # FAILOVER TO LLAVA
-            print(f"⚠️  DeepSeek failed for {ad.get('creative_id', 'unknown')}, failing over to LLaVA...")
+        e = ocr_result
 
-            try:
-                # Try LLaVA as backup
-                from api.ai_analyzer import AdIntelligence
+        # FAILOVER TO LLAVA
+        print(f"⚠️  DeepSeek failed for {ad.get('creative_id', 'unknown')}, failing over to LLaVA...")
 
-                analyzer = AdIntelligence(vision_model="llava:latest")
-                image_url = ad.get('image_url', '')
+        try:
+            # Try LLaVA as backup
+            from api.ai_analyzer import AdIntelligence
 
-                vision_text = analyzer._extract_text_from_image(image_url)
+            analyzer = AdIntelligence(vision_model="llava:latest")
+            image_url = ad.get('image_url', '')
 
-                # Add to ad
-                ad['_vision_text'] = vision_text
-                ad['_vision_model'] = 'llava-failover'
-                ad['_vision_time'] = time.time() - start
-                ad['_vision_failover'] = f"DeepSeek failed: {str(e)}"
+            vision_text = analyzer._extract_text_from_image(image_url)
 
-                print(f"   ✅ Failover successful for {ad.get('creative_id', 'unknown')}")
-                return ad
+            # Add to ad
+            ad['_vision_text'] = vision_text
+            ad['_vision_model'] = 'llava-failover'
+            ad['_vision_time'] = time.time() - start
+            ad['_vision_failover'] = f"DeepSeek failed: {str(e)}"
 
-            except Exception as llava_error:
-                # Both failed - return with errors
-                ad['_vision_error'] = f"DeepSeek: {str(e)}, LLaVA: {str(llava_error)}"
-                ad['_vision_model'] = 'both-failed'
-                ad['_vision_time'] = time.time() - start
-                raise Exception(f"Both models failed: DeepSeek={e}, LLaVA={llava_error}")
+            print(f"   ✅ Failover successful for {ad.get('creative_id', 'unknown')}")
+            return ad
 
-    @staticmethod
-    def _process_single_llava(ad: Dict) -> Dict:
+        except Exception as llava_error:
+            # Both failed - return with errors
+            ad['_vision_error'] = f"DeepSeek: {str(e)}, LLaVA: {str(llava_error)}"
+            ad['_vision_model'] = 'both-failed'
+            ad['_vision_time'] = time.time() - start
+            raise Exception(f"Both models failed: DeepSeek={e}, LLaVA={llava_error}")
+
+    def _process_single_llava(self, ad: Dict) -> Dict:
         """
         Process single ad with LLaVA
         Falls back to DeepSeek-OCR if LLaVA fails
@@ -303,9 +323,9 @@ class ParallelVisionAnalyzer:
 
             try:
                 # Try DeepSeek as backup
-                from api.deepseek_client import DeepSeekOCRClient, DEEPSEEK_PROMPTS
+                from api.deepseek_client import DEEPSEEK_PROMPTS
 
-                client = DeepSeekOCRClient(service_url="http://localhost:8001")
+                client = _deepseek_client("http://localhost:8001", self.db)
                 image_url = ad.get('image_url', '')
 
                 result = client.extract_text(
@@ -5,6 +5,7 @@ Uses DeepSeek/Llama to generate actionable intelligence based on real data
 """
 import json
 import requests
+from collections import Counter
 from typing import List, Dict, Any
 from datetime import datetime, timedelta
 
@@ -48,8 +49,11 @@ class StrategicAnalyst:
     def _gather_competitive_intel(self, db, module: str) -> Dict[str, Any]:
         """Gather real data from database comparing YOU vs competitors"""
 
-        # Get all competitors
-        all_ads = db.get_all_ads()
+        # Get all competitors (only the fields the _analyze_* helpers read)
+        all_ads = list(db.get_all_ads(columns=(
+            'advertiser_id', 'is_active', 'first_seen_date', 'product_category',
+            'offer_type', 'primary_theme', 'brand', 'food_category',
+        )))
 
         # Separate YOUR ads vs competitor ads
         your_ads = [ad for ad in all_ads if ad.get('advertiser_id') == self.YOUR_COMPANY_ID]
@@ -139,15 +143,13 @@ class StrategicAnalyst:
 
     def _analyze_products(self, ads: List[Dict]) -> Dict[str, Any]:
         """Analyze product categories"""
-        categories = {}
-        for ad in ads:
-            cat = ad.get('product_category')
-            if cat:
-                for c in cat.split(', '):
-                    categories[c] = categories.get(c, 0) + 1
+        categories = Counter(
+            c for cat in (ad.get('product_category') for ad in ads) if cat
+            for c in cat.split(', ')
+        )
 
         total = len(ads)
-        top_cat = max(categories.items(), key=lambda x: x[1]) if categories else (None, 0)
+        top_cat = categories.most_common(1)[0] if categories else (None, 0)
 
         return {
             "total_products": len(categories),
@@ -159,11 +161,10 @@ class StrategicAnalyst:
 
     def _analyze_promos(self, ads: List[Dict]) -> Dict[str, Any]:
         """Analyze promotional offers"""
-        promos = {}
-        for ad in ads:
-            offer = ad.get('offer_type')
-            if offer and offer.lower() != 'none':
-                promos[offer] = promos.get(offer, 0) + 1
+        promos = Counter(
+            offer for offer in (ad.get('offer_type') for ad in ads)
+            if offer and offer.lower() != 'none'
+        )
 
         total = len(ads)
         promo_ads = sum(promos.values())
@@ -176,14 +177,10 @@ class StrategicAnalyst:
 
     def _analyze_messaging(self, ads: List[Dict]) -> Dict[str, Any]:
         """Analyze messaging themes"""
-        themes = {}
-        for ad in ads:
-            theme = ad.get('primary_theme')
-            if theme:
-                themes[theme] = themes.get(theme, 0) + 1
+        themes = Counter(theme for theme in (ad.get('primary_theme') for ad in ads) if theme)
 
         total = len(ads)
-        top_theme = max(themes.items(), key=lambda x: x[1]) if themes else (None, 0)
+        top_theme = themes.most_common(1)[0] if themes else (None, 0)
 
         return {
             "top_theme": top_theme[0],
@@ -216,17 +213,11 @@ class StrategicAnalyst:
 
     def _analyze_brands(self, ads: List[Dict]) -> Dict[str, Any]:
         """Analyze brand mentions from vision extraction"""
-        brands = {}
-        ads_with_brands = 0
-
-        for ad in ads:
-            brand = ad.get('brand')
-            if brand and brand.strip():
-                brands[brand] = brands.get(brand, 0) + 1
-                ads_with_brands += 1
+        brands = Counter(brand for brand in (ad.get('brand') for ad in ads) if brand and brand.strip())
+        ads_with_brands = sum(brands.values())
 
         total = len(ads)
-        top_brand = max(brands.items(), key=lambda x: x[1]) if brands else (None, 0)
+        top_brand = brands.most_common(1)[0] if brands else (None, 0)
 
         return {
             "total_brands_mentioned": len(brands),
@@ -240,17 +231,14 @@ class StrategicAnalyst:
 
     def _analyze_food_categories(self, ads: List[Dict]) -> Dict[str, Any]:
         """Analyze food categories from vision extraction"""
-        categories = {}
-        ads_with_categories = 0
-
-        for ad in ads:
-            category = ad.get('food_category')
-            if category and category.strip():
-                categories[category] = categories.get(category, 0) + 1
-                ads_with_categories += 1
+        categories = Counter(
+            category for category in (ad.get('food_category') for ad in ads)
+            if category and category.strip()
+        )
+        ads_with_categories = sum(categories.values())
 
         total = len(ads)
-        top_category = max(categories.items(), key=lambda x: x[1]) if categories else (None, 0)
+        top_category = categories.most_common(1)[0] if categories else (None, 0)
 
         return {
             "total_food_categories": len(categories),
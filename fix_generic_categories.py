@@ -16,7 +16,7 @@ def main():
     analyzer = AdIntelligence()
 
     # Get all ads with generic categories
-    all_ads = db.get_all_ads(active_only=True)
+    all_ads = list(db.get_all_ads(active_only=True))
 
     # Filter ads with "Other" or "General" categories
     generic_ads = [
@@ -43,7 +43,7 @@ def migrate():
         for ad in ads:
             # Convert SQLite boolean (0/1) to Postgres boolean (True/False)
             ad_tuple = tuple(ad)
-            ad_list = list(ad_tuple)
+            ad_list = list(ad_tuple)[:10]  # image_url_hash is backfilled by the schema upgrade below
             ad_list[8] = bool(ad_list[8])  # is_active
             pg_cursor.execute('''
                 INSERT INTO ads (id, advertiser_id, ad_text, image_url, html_content, regions,
@@ -60,25 +60,39 @@ def migrate():
         enrichments = sqlite_cursor.fetchall()
 
         for enrich in enrichments:
-            # Convert boolean fields
-            enrich_list = list(enrich)
-            if len(enrich_list) > 11 and enrich_list[11] is not None:
-                enrich_list[11] = bool(enrich_list[11])  # is_qatar_only
-            if len(enrich_list) > 14 and enrich_list[14] is not None:
-                enrich_list[14] = bool(enrich_list[14])  # rejected_wrong_region
-
-            pg_cursor.execute('''
-                INSERT INTO ad_enrichment
-                (ad_id, product_category, product_name, messaging_themes, primary_theme,
-                 audience_segment, offer_type, offer_details, confidence_score, analysis_model,
-                 analyzed_at, is_qatar_only, brand, food_category, rejected_wrong_region, detected_region,
-                 embedding_vector)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            # Insert by column name (older SQLite files may lack newer columns)
+            enrich_dict = dict(enrich)
+            for flag in ('is_qatar_only', 'rejected_wrong_region', 'manually_edited', 'is_active'):
+                if enrich_dict.get(flag) is not None:
+                    enrich_dict[flag] = bool(enrich_dict[flag])  # Convert boolean fields
+
+            columns = ', '.join(enrich_dict)
+            placeholders = ', '.join(['%s'] * len(enrich_dict))
+            pg_cursor.execute(f'''
+                INSERT INTO ad_enrichment ({columns})
+                VALUES ({placeholders})
                 ON CONFLICT (ad_id) DO NOTHING
-            ''', tuple(enrich_list))
+            ''', tuple(enrich_dict.values()))
 
         print(f"   ✅ Migrated {len(enrichments)} enrichment records")
 
+        # Migrate ad_themes table (legacy messaging_themes JSON above is moved by the schema upgrade below)
+        print("🎯 Migrating messaging themes...")
+        sqlite_cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='ad_themes'")
+        themes = []
+        if sqlite_cursor.fetchone():
+            sqlite_cursor.execute("SELECT ad_id, theme, weight FROM ad_themes")
+            themes = sqlite_cursor.fetchall()
+
+        for theme in themes:
+            pg_cursor.execute('''
+                INSERT INTO ad_themes (ad_id, theme, weight)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (ad_id, theme) DO NOTHING
+            ''', tuple(theme))
+
+        print(f"   ✅ Migrated {len(themes)} theme scores")
+
         # Migrate scrape_runs table
         print("📊 Migrating scrape runs...")
         sqlite_cursor.execute("SELECT * FROM scrape_runs")
@@ -126,6 +140,13 @@ def migrate():
         # Commit all changes
         pg_conn.commit()
 
+        # Re-run the schema upgrade over the copied rows: backfills image_url_hash,
+        # moves legacy messaging_themes/embedding_vector JSON and builds the roll-ups
+        print("🔧 Upgrading migrated data...")
+        pg_cursor.execute("DELETE FROM schema_version")
+        pg_conn.commit()
+        AdDatabase()
+
         print("\n🎉 Migration completed successfully!")
         print(f"   Total ads: {len(ads)}")
         print(f"   Total enrichments: {len(enrichments)}")
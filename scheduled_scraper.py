@@ -18,7 +18,7 @@ import json
 sys.path.insert(0, str(Path(__file__).parent))
 
 from scrapers.api_scraper import GATCAPIScraper
-from api.database import AdDatabase
+from api.database import AdDatabase, ad_signature
 from api.ai_analyzer import AdIntelligence
 
 
@@ -49,8 +49,8 @@ COMPETITORS = [
 def is_initial_run(advertiser_id):
     """Check if this is the first time scraping this competitor"""
     db = AdDatabase()
-    ads = db.get_ads_by_competitor(advertiser_id, active_only=False)
-    return len(ads) == 0
+    ads = db.get_ads_by_competitor(advertiser_id, active_only=False, columns=('id',))
+    return next(ads, None) is None
 
 
 def incremental_scrape(advertiser_id, region, is_initial=False):
@@ -90,18 +90,19 @@ def incremental_scrape(advertiser_id, region, is_initial=False):
     print(f"\n✅ Scraped {len(scraped_ads)} ads")
 
     # Step 2: Check which ads are NEW vs existing
-    existing_ads = db.get_ads_by_competitor(advertiser_id, active_only=False)
+    existing_ads = db.get_ads_by_competitor(advertiser_id, active_only=False,
+                                            columns=('ad_text', 'image_url'))
 
     # Create set of existing ad signatures (ad_text + image_url)
     existing_signatures = set()
     for ad in existing_ads:
-        signature = f"{ad.get('ad_text', '')}||{ad.get('image_url', '')}"
+        signature = ad_signature(ad)
         existing_signatures.add(signature)
 
     # Identify new ads
     new_ads = []
     for ad in scraped_ads:
-        signature = f"{ad.get('ad_text', '')}||{ad.get('image_url', '')}"
+        signature = ad_signature(ad)
         if signature not in existing_signatures:
             new_ads.append(ad)
 
@@ -129,7 +130,7 @@ def incremental_scrape(advertiser_id, region, is_initial=False):
     # Get all ad signatures from current scrape
     current_signatures = []
     for ad in scraped_ads:
-        signature = f"{ad.get('ad_text', '')}||{ad.get('image_url', '')}"
+        signature = ad_signature(ad)
         current_signatures.append(signature)
 
     # Mark ads not in current scrape as inactive
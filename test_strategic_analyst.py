@@ -42,7 +42,7 @@ def main():
     analyst = StrategicAnalyst()
 
     # Get stats
-    all_ads = db.get_all_ads()
+    all_ads = list(db.get_all_ads())
     vision_ads = [ad for ad in all_ads if ad.get('brand') or ad.get('food_category')]
 
     print(f"\n📊 Database Stats:")
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from api.database import AdDatabase, EMBEDDING_DIM, ad_signature  # noqa: E402
+
+
+def make_db(tmp_path, monkeypatch) -> AdDatabase:
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    return AdDatabase(str(tmp_path / "adintel.db"))
+
+
+def make_ad(**fields) -> dict:
+    ad = {
+        "advertiser_id": "AR14306592000630063105",
+        "ad_text": "Free delivery on your first order",
+        "image_url": "https://example.com/creative.png",
+        "product_category": "Restaurant",
+        "messaging_themes": {"price": 0.8, "speed": 0.4},
+    }
+    ad.update(fields)
+    return ad
+
+
+def test_save_ads_batch_with_repeated_ad(tmp_path, monkeypatch):
+    db = make_db(tmp_path, monkeypatch)
+
+    stats = db.save_ads([
+        make_ad(),
+        make_ad(messaging_themes={"price": 0.2, "quality": 0.9}),
+    ])
+
+    assert stats["ads_new"] == 1
+    assert stats["ads_updated"] == 1
+    ads = list(db.get_all_ads())
+    assert len(ads) == 1
+    # Last copy in the batch wins
+    assert ads[0]["messaging_themes"] == {"price": 0.2, "quality": 0.9}
+
+
+def test_save_ads_batch_with_repeated_embedded_ad(tmp_path, monkeypatch):
+    db = make_db(tmp_path, monkeypatch)
+    if not db.vec_enabled:
+        pytest.skip("sqlite-vec not available")
+
+    embedding = [0.0] * (EMBEDDING_DIM - 1) + [1.0]
+    db.save_ads([make_ad(embedding=embedding), make_ad(embedding=embedding)])
+
+    with db._read() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM vec_ads")
+        assert cursor.fetchone()[0] == 1
+
+
+def test_ad_without_image_matches_its_signature(tmp_path, monkeypatch):
+    db = make_db(tmp_path, monkeypatch)
+    advertiser_id = "AR14306592000630063105"
+    scraped = make_ad(image_url=None)
+    db.save_ads([scraped])
+
+    stored = list(db.get_ads_by_competitor(advertiser_id, active_only=False,
+                                           columns=("ad_text", "image_url")))
+    assert {ad_signature(ad) for ad in stored} == {ad_signature(scraped)}
+
+    assert db.mark_ads_inactive(advertiser_id, [ad_signature(scraped)]) == 0
+    assert len(list(db.get_ads_by_competitor(advertiser_id, active_only=True))) == 1